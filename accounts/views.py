@@ -330,7 +330,8 @@ def logout_view(request):
 @login_required
 def dashboard_view(request):
     if request.user.is_doctor:
-        patients = Patient.objects.filter(doctor=request.user)
+        # Risk badges come from the nightly `score_cohort` snapshots; no inference here
+        patients = Patient.objects.filter(doctor=request.user).prefetch_related('risk_snapshots')
         
         if request.method == 'POST':
             form = PatientForm(request.POST)
@@ -0,0 +1,36 @@
+# gunicorn.conf.py
+# Production server settings: gunicorn -c gunicorn.conf.py
+import gc
+import multiprocessing
+import os
+
+wsgi_app = 'mediai.wsgi:application'
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+# Threaded workers: concurrent requests in one worker are what the
+# prediction micro-batcher (PREDICTOR_MICRO_BATCHING) coalesces. With the
+# sync worker each request would wait out the batch window alone.
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import Django (and with it every prediction model) once in the master
+# process. Workers are forked afterwards and share the model memory
+# copy-on-write instead of each loading its own copy.
+preload_app = True
+os.environ.setdefault('PREDICTOR_PRELOAD_MODELS', 'True')
+
+
+def when_ready(server):
+    # Move everything loaded so far into the permanent generation so the
+    # garbage collector in the workers never writes to (and copies) those pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # With PREDICTOR_INFERENCE_BACKEND=process each worker owns an inference
+    # pool; start it now so the first request does not pay for spawning it.
+    from predictor import inference_pool
+    if inference_pool.uses_process_pool():
+        inference_pool.get_pool().warm()
@@ -90,24 +90,6 @@ CORS_ALLOW_METHODS = [
     'PUT',
 ]
 
-# CORS Settings
-CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://localhost:8000,http://127.0.0.1:8000', cast=lambda v: [s.strip() for s in v.split(',')])
-CORS_ALLOW_CREDENTIALS = True
-CORS_ALLOW_METHODS = [
-    'DELETE',
-    'GET',
-    'OPTIONS',
-    'PATCH',
-    'POST',
-    'PUT',
-]
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'allauth.account.middleware.AccountMiddleware',
-]
-
 ROOT_URLCONF = 'mediai.urls'
 
 TEMPLATES = [
@@ -258,4 +240,64 @@ USE_TZ = True
 TIME_ZONE = 'Asia/Kolkata'
 
 # News API Configuration
-NEWS_API_KEY = os.environ.get('NEWS_API_KEY', '')
\ No newline at end of file
+NEWS_API_KEY = os.environ.get('NEWS_API_KEY', '')
+
+# Prediction models
+# Load every model in PredictorConfig.ready() (switched on by gunicorn.conf.py)
+PREDICTOR_PRELOAD_MODELS = config('PREDICTOR_PRELOAD_MODELS', default=False, cast=bool)
+# How often (seconds) each process checks ml_models/ for a rebuilt artifact and
+# hot-swaps it in; 0 disables the check
+PREDICTOR_MODEL_WATCH_INTERVAL = config('PREDICTOR_MODEL_WATCH_INTERVAL', default=5, cast=float)
+# Concurrent single-row predictions for the same model are coalesced for up
+# to PREDICTOR_BATCH_WINDOW_MS or PREDICTOR_MAX_BATCH_SIZE requests. This only
+# helps with threaded workers (gunicorn.conf.py uses gthread); under a sync
+# worker every request would wait out the window alone, so switch it off there.
+PREDICTOR_MICRO_BATCHING = config('PREDICTOR_MICRO_BATCHING', default=True, cast=bool)
+PREDICTOR_BATCH_WINDOW_MS = config('PREDICTOR_BATCH_WINDOW_MS', default=5, cast=float)
+PREDICTOR_MAX_BATCH_SIZE = config('PREDICTOR_MAX_BATCH_SIZE', default=32, cast=int)
+PREDICTOR_BATCH_MAX_ROWS = config('PREDICTOR_BATCH_MAX_ROWS', default=5000, cast=int)
+# Largest what-if grid /predictor/<type>/<id>/sweep/ will score
+PREDICTOR_SWEEP_MAX_POINTS = config('PREDICTOR_SWEEP_MAX_POINTS', default=2500, cast=int)
+# Threads scoring the models of one risk panel (/predictor/risk-panel/) concurrently
+PREDICTOR_PANEL_WORKERS = config('PREDICTOR_PANEL_WORKERS', default=3, cast=int)
+# Seconds a prediction's per-feature explanation stays cached (keyed by model version too)
+PREDICTOR_EXPLANATION_CACHE_TTL = config('PREDICTOR_EXPLANATION_CACHE_TTL', default=3600, cast=int)
+# Use the NumPy evaluators written by `manage.py compile_models` when present
+PREDICTOR_USE_COMPILED_MODELS = config('PREDICTOR_USE_COMPILED_MODELS', default=True, cast=bool)
+# Single-row prediction results, keyed by model version and feature vector (size 0 disables)
+PREDICTOR_RESULT_CACHE_SIZE = config('PREDICTOR_RESULT_CACHE_SIZE', default=1024, cast=int)
+PREDICTOR_RESULT_CACHE_TTL = config('PREDICTOR_RESULT_CACHE_TTL', default=600, cast=int)
+# 'inline' scores in the request thread; 'process' uses a pool of warm worker
+# processes with a bounded queue (saturation or timeout answers 503)
+PREDICTOR_INFERENCE_BACKEND = config('PREDICTOR_INFERENCE_BACKEND', default='inline')
+PREDICTOR_INFERENCE_WORKERS = config('PREDICTOR_INFERENCE_WORKERS', default=2, cast=int)
+PREDICTOR_INFERENCE_QUEUE_DEPTH = config('PREDICTOR_INFERENCE_QUEUE_DEPTH', default=16, cast=int)
+PREDICTOR_INFERENCE_TIMEOUT = config('PREDICTOR_INFERENCE_TIMEOUT', default=10, cast=float)
+# Models whose candidate artifact (<name>.candidate.artifact.joblib) is scored in
+# shadow after each response; a bounded background queue drops work when full
+PREDICTOR_SHADOW_MODELS = config('PREDICTOR_SHADOW_MODELS', default='', cast=lambda v: [m.strip() for m in v.split(',') if m.strip()])
+PREDICTOR_SHADOW_WORKERS = config('PREDICTOR_SHADOW_WORKERS', default=1, cast=int)
+PREDICTOR_SHADOW_QUEUE_DEPTH = config('PREDICTOR_SHADOW_QUEUE_DEPTH', default=32, cast=int)
+PREDICTOR_SHADOW_FLUSH_SECONDS = config('PREDICTOR_SHADOW_FLUSH_SECONDS', default=30, cast=float)
+# Feature drift: quantile bins per feature in a baseline (`manage.py drift_baseline`),
+# how often live counts are saved, and the window /predictor/models/drift/ compares
+PREDICTOR_DRIFT_BINS = config('PREDICTOR_DRIFT_BINS', default=10, cast=int)
+PREDICTOR_DRIFT_FLUSH_SECONDS = config('PREDICTOR_DRIFT_FLUSH_SECONDS', default=60, cast=float)
+PREDICTOR_DRIFT_WINDOW_DAYS = config('PREDICTOR_DRIFT_WINDOW_DAYS', default=7, cast=int)
+# Per-stage prediction timings: requests kept for /predictor/models/latency/
+# and the fraction also logged as JSON
+PREDICTOR_TIMING_BUFFER_SIZE = config('PREDICTOR_TIMING_BUFFER_SIZE', default=1000, cast=int)
+PREDICTOR_TIMING_LOG_SAMPLE_RATE = config('PREDICTOR_TIMING_LOG_SAMPLE_RATE', default=0.01, cast=float)
+# Report PDF/email jobs (processed by `manage.py run_report_jobs`); EAGER runs
+# them inside the request instead, for development without a worker
+PREDICTOR_REPORT_JOBS_EAGER = config('PREDICTOR_REPORT_JOBS_EAGER', default=False, cast=bool)
+PREDICTOR_REPORT_JOB_MAX_ATTEMPTS = config('PREDICTOR_REPORT_JOB_MAX_ATTEMPTS', default=5, cast=int)
+PREDICTOR_REPORT_JOB_BACKOFF_SECONDS = config('PREDICTOR_REPORT_JOB_BACKOFF_SECONDS', default=30, cast=int)
+PREDICTOR_REPORT_JOB_MAX_BACKOFF_SECONDS = config('PREDICTOR_REPORT_JOB_MAX_BACKOFF_SECONDS', default=3600, cast=int)
+PREDICTOR_REPORT_JOB_STALE_SECONDS = config('PREDICTOR_REPORT_JOB_STALE_SECONDS', default=600, cast=int)
+# A report whose job succeeded this recently is not queued (and emailed) again
+PREDICTOR_REPORT_JOB_DEDUPE_SECONDS = config('PREDICTOR_REPORT_JOB_DEDUPE_SECONDS', default=300, cast=int)
+# Worker processes that render missing PDFs for the bulk ZIP export (0 = in the request)
+PREDICTOR_EXPORT_WORKERS = config('PREDICTOR_EXPORT_WORKERS', default=2, cast=int)
+# Seconds a doctor's cached report statistics live (they are also dropped on new reports)
+PREDICTOR_REPORT_STATS_TTL = config('PREDICTOR_REPORT_STATS_TTL', default=300, cast=int)
@@ -4,12 +4,26 @@ import time
 import sys
 import os
 import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
 class PredictorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'predictor'
 
     def ready(self):
+        from django.conf import settings
+        import predictor.signals
+
+        # Load every model at startup instead of on the first request. Under
+        # gunicorn with preload_app this runs once in the master, and the
+        # forked workers share the model memory copy-on-write.
+        if getattr(settings, 'PREDICTOR_PRELOAD_MODELS', False):
+            from .registry import registry
+            status = registry.preload()
+            logger.info(f"Prediction models preloaded: {status}")
+
         if os.environ.get('RUN_MAIN') != 'true':
             return
 
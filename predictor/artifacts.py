@@ -0,0 +1,112 @@
+# artifacts.py
+"""
+Versioned model artifacts.
+
+An artifact is a single uncompressed joblib file holding everything needed to
+score one model: the estimator, its preprocessing (scaler), the compiled
+NumPy evaluator, the feature order, the input dtype and version metadata.
+
+Because the file is not compressed, ``joblib.load(path, mmap_mode='r')``
+maps the NumPy arrays inside it (scaler statistics and the compiled node
+arrays) straight from the page cache instead of copying them, so loading is
+fast and forked workers share the same physical pages.
+
+The schema is validated once when the artifact is loaded; after that the
+registry trusts it for every request.
+"""
+import os
+import time
+import logging
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 1
+
+ARTIFACT_SUFFIX = '.artifact.joblib'
+
+
+class ArtifactError(Exception):
+    """Raised when an artifact is missing pieces or inconsistent with itself"""
+
+
+def _n_features(obj):
+    n_features = getattr(obj, 'n_features_in_', None)
+    if n_features is None and hasattr(obj, 'get_booster'):
+        n_features = obj.get_booster().num_features()
+    return n_features
+
+
+class ModelArtifact:
+    def __init__(self, name, model, feature_names, scaler=None, compiled=None,
+                 dtype='float32', version=None, metadata=None):
+        self.name = name
+        self.model = model
+        self.scaler = scaler
+        self.compiled = compiled
+        self.feature_names = list(feature_names)
+        self.dtype = np.dtype(dtype)
+        self.version = version
+        self.metadata = metadata or {}
+
+    def validate(self):
+        """Check that every component agrees on the number of input features"""
+        if not self.version:
+            raise ArtifactError(f"Artifact '{self.name}' has no version")
+        if not hasattr(self.model, 'predict_proba'):
+            raise ArtifactError(f"Artifact '{self.name}' model has no predict_proba")
+        if self.dtype.kind != 'f':
+            raise ArtifactError(f"Artifact '{self.name}' dtype must be floating point, got {self.dtype}")
+
+        expected = len(self.feature_names)
+        parts = [('model', _n_features(self.model))]
+        if self.scaler is not None:
+            parts.append(('scaler', _n_features(self.scaler)))
+        if self.compiled is not None:
+            parts.append(('compiled evaluator', self.compiled.n_features))
+        for part, n_features in parts:
+            if n_features is not None and n_features != expected:
+                raise ArtifactError(
+                    f"Artifact '{self.name}': {part} expects {n_features} features, "
+                    f"feature order lists {expected}"
+                )
+
+    def save(self, path):
+        """Write the artifact atomically; the file is left uncompressed so it can be mapped"""
+        self.validate()
+        payload = {
+            'schema_version': SCHEMA_VERSION,
+            'name': self.name,
+            'version': self.version,
+            'feature_names': self.feature_names,
+            'dtype': self.dtype.str,
+            'model': self.model,
+            'scaler': self.scaler,
+            'compiled': self.compiled,
+            'metadata': dict(self.metadata, created_at=time.strftime('%Y-%m-%dT%H:%M:%S%z')),
+        }
+        tmp_path = f'{path}.tmp'
+        joblib.dump(payload, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        payload = joblib.load(path, mmap_mode=mmap_mode)
+        if not isinstance(payload, dict) or payload.get('schema_version') != SCHEMA_VERSION:
+            found = payload.get('schema_version') if isinstance(payload, dict) else type(payload).__name__
+            raise ArtifactError(f"Unsupported artifact schema in {path}: {found}")
+
+        artifact = cls(
+            name=payload['name'],
+            model=payload['model'],
+            feature_names=payload['feature_names'],
+            scaler=payload.get('scaler'),
+            compiled=payload.get('compiled'),
+            dtype=payload['dtype'],
+            version=payload['version'],
+            metadata=payload.get('metadata'),
+        )
+        artifact.validate()
+        return artifact
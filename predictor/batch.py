@@ -0,0 +1,203 @@
+# batch.py
+"""
+Batch (cohort) scoring for the four disease models.
+
+A batch is a CSV upload or a JSON array of rows, one row per patient. All
+rows for a model are turned into a single NumPy feature matrix, scored with
+one ``predict_proba`` call and persisted with ``bulk_create``.
+"""
+import csv
+import io
+import json
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from accounts.models import Patient
+from .forms import (BreastCancerPredictionForm, DiabetesPredictionForm, HeartDiseasePredictionForm,
+                    LiverDiseasePredictionForm, input_bounds)
+from .models import PredictionReport
+from .pipeline import PIPELINES
+from .report_stats import invalidate_report_stats
+
+
+# The single-prediction form of each model; batch rows get the same range checks
+BATCH_FORMS = {
+    'breast_cancer': BreastCancerPredictionForm,
+    'liver_disease': LiverDiseasePredictionForm,
+    'diabetes': DiabetesPredictionForm,
+    'heart_disease': HeartDiseasePredictionForm,
+}
+
+
+class BatchError(Exception):
+    """Raised when an uploaded batch cannot be scored"""
+
+
+def parse_rows(uploaded_file=None, body=None):
+    """Read batch rows from an uploaded CSV file or a JSON array body"""
+    if uploaded_file is not None:
+        text = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig')
+        rows = list(csv.DictReader(text))
+    elif body:
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise BatchError('Request body is not valid JSON')
+        if not isinstance(rows, list):
+            raise BatchError('Expected a JSON array of rows')
+    else:
+        raise BatchError('Upload a CSV file or send a JSON array')
+
+    if not rows:
+        raise BatchError('The batch is empty')
+
+    max_rows = getattr(settings, 'PREDICTOR_BATCH_MAX_ROWS', 5000)
+    if len(rows) > max_rows:
+        raise BatchError(f'A batch may contain at most {max_rows} rows')
+    return rows
+
+
+def _extract_columns(pipeline, rows):
+    """Pull every feature out of the rows as one array per column"""
+    if not all(isinstance(row, dict) for row in rows):
+        raise BatchError('Every row must be an object with named columns')
+    # Transformed fields (liver gender) map any unknown value silently, so check the raw values first
+    for field, choices in pipeline.encoder.invalid_choices(rows).items():
+        raise BatchError(f"Column '{field}' must be one of {', '.join(choices)}")
+    try:
+        columns = pipeline.columns(rows)
+    except KeyError as e:
+        raise BatchError(f"Missing column {e}")
+    except (TypeError, ValueError):
+        raise BatchError('Feature columns must contain numeric values')
+
+    for field, column in columns.items():
+        if not np.all(np.isfinite(column)):
+            raise BatchError(f"Column '{field}' contains missing or infinite values")
+    for field, vocabulary in pipeline.encoder.out_of_vocabulary(columns).items():
+        raise BatchError(f"Column '{field}' must be one of {', '.join(map(str, vocabulary))}")
+    _check_bounds(pipeline, columns)
+    return columns
+
+
+def _check_bounds(pipeline, columns):
+    """Apply the prediction form's min/max to whole columns and report the first row out of range"""
+    failures = []
+    for field, (low, high) in input_bounds(BATCH_FORMS[pipeline.name]()).items():
+        column = columns[field]
+        outside = np.zeros(len(column), dtype=bool)
+        if low is not None:
+            outside |= column < low
+        if high is not None:
+            outside |= column > high
+        if outside.any():
+            failures.append((int(np.argmax(outside)), field, low, high))
+    if failures:
+        row, field, low, high = min(failures, key=lambda failure: failure[0])
+        if high is None:
+            allowed = f'at least {low:g}'
+        elif low is None:
+            allowed = f'at most {high:g}'
+        else:
+            allowed = f'between {low:g} and {high:g}'
+        raise BatchError(f"Row {row + 1}: column '{field}' must be {allowed}")
+
+
+def _resolve_patients(rows, doctor):
+    try:
+        patient_ids = [int(row['patient_id']) for row in rows]
+    except KeyError:
+        raise BatchError("Missing column 'patient_id'")
+    except (TypeError, ValueError):
+        raise BatchError("Column 'patient_id' must contain integer ids")
+
+    patients = Patient.objects.in_bulk(set(patient_ids))
+    unknown = sorted(pid for pid in set(patient_ids)
+                     if pid not in patients or patients[pid].doctor_id != doctor.id)
+    if unknown:
+        raise BatchError(f"Unknown patient ids: {', '.join(map(str, unknown[:10]))}")
+    return [patients[pid] for pid in patient_ids]
+
+
+def run_batch(prediction_type, rows, doctor):
+    """
+    Score every row with a single predict_proba call and persist the results.
+    Returns the saved prediction objects (in input order) and the probabilities.
+    """
+    if prediction_type not in PIPELINES:
+        raise BatchError(f"Unknown prediction type '{prediction_type}'")
+    pipeline = PIPELINES[prediction_type]
+
+    patients = _resolve_patients(rows, doctor)
+    columns = _extract_columns(pipeline, rows)
+    proba, version = pipeline.score(pipeline.encoder.encode_columns(columns))
+    labels, _, confidence = pipeline.decide(proba)
+
+    predictions = []
+    for i, (row, patient) in enumerate(zip(rows, patients)):
+        values = {}
+        for field in pipeline.fields:
+            if field in pipeline.transforms:
+                values[field] = str(row[field]).strip()
+            elif field in pipeline.integer_fields:
+                values[field] = int(columns[field][i])
+            else:
+                values[field] = float(columns[field][i])
+        predictions.append(pipeline.prediction_model(
+            patient=patient,
+            doctor=doctor,
+            prediction=labels[i],
+            confidence=float(confidence[i]),
+            model_version=version or '',
+            **values
+        ))
+
+    with transaction.atomic():
+        pipeline.prediction_model.objects.bulk_create(predictions)
+        PredictionReport.objects.bulk_create([
+            PredictionReport(
+                patient=prediction.patient,
+                doctor=doctor,
+                prediction_type=prediction_type,
+                prediction_id=prediction.id,
+                model_version=prediction.model_version,
+                prediction_data={
+                    'prediction': prediction.prediction,
+                    'confidence': prediction.confidence,
+                    'prediction_id': prediction.id,
+                    'raw_probabilities': proba[i].tolist(),
+                    'features': pipeline.raw_features(prediction),
+                    'batch': True,
+                },
+            )
+            for i, prediction in enumerate(predictions)
+        ])
+        # bulk_create sends no post_save signals
+        transaction.on_commit(lambda: invalidate_report_stats(doctor.id))
+
+    return predictions, proba
+
+
+class _Echo:
+    """File-like object whose write() hands the value straight back"""
+
+    def write(self, value):
+        return value
+
+
+def stream_results_csv(predictions, proba):
+    """Yield the batch results as CSV lines"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['row', 'patient_id', 'prediction_id', 'prediction', 'confidence', 'positive_probability'])
+    for i, prediction in enumerate(predictions):
+        yield writer.writerow([
+            i + 1, prediction.patient_id, prediction.id, prediction.prediction,
+            prediction.confidence, round(float(proba[i, 1]), 6),
+        ])
+
+
+def template_csv(prediction_type):
+    """Header-only CSV that shows the expected upload columns"""
+    return ','.join(['patient_id'] + PIPELINES[prediction_type].fields) + '\n'
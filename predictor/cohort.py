@@ -0,0 +1,99 @@
+# cohort.py
+"""
+Batch risk scoring of every patient's most recent inputs.
+
+For each model, the latest prediction row per patient (highest id) is
+fetched in one query. Those rows are encoded into a single matrix and
+scored with one predict_proba call. The result is upserted into
+PatientRiskSnapshot, one row per patient and model, so the dashboard can
+show risk badges without running inference. Run nightly by
+``manage.py score_cohort``.
+
+Scoring goes straight to the inference backend. Re-scoring old inputs is
+not live traffic, so it bypasses the result cache, the drift monitor and
+shadow evaluation.
+"""
+import logging
+import time
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from . import inference_pool
+from .models import PatientRiskSnapshot
+from .pipeline import PIPELINES
+
+logger = logging.getLogger(__name__)
+
+
+def latest_inputs(pipeline, doctor_id=None):
+    """Input values of each patient's most recent prediction for ``pipeline``, one dict per patient"""
+    predictions = pipeline.prediction_model.objects.all()
+    if doctor_id is not None:
+        predictions = predictions.filter(patient__doctor_id=doctor_id)
+    latest = predictions.order_by().values('patient_id').annotate(latest=Max('id')).values('latest')
+    return list(pipeline.prediction_model.objects
+                .filter(id__in=latest)
+                .values('id', 'patient_id', 'patient__doctor_id', *pipeline.fields))
+
+
+def score_model(name, doctor_id=None):
+    """Rescore one model for every patient (of ``doctor_id``) and refresh their snapshots"""
+    pipeline = PIPELINES[name]
+    started = time.perf_counter()
+    rows = latest_inputs(pipeline, doctor_id)
+
+    snapshots = []
+    version = None
+    scored_at = timezone.now()
+    if rows:
+        proba, version = inference_pool.score(pipeline.model_name, pipeline.encode(rows))
+        labels, is_positive, _ = pipeline.decide(proba)
+        snapshots = [
+            PatientRiskSnapshot(
+                patient_id=row['patient_id'],
+                doctor_id=row['patient__doctor_id'],
+                model_name=name,
+                prediction_id=row['id'],
+                label=labels[i],
+                is_positive=bool(is_positive[i]),
+                probability=float(proba[i, 1]),
+                model_version=version or '',
+                scored_at=scored_at,
+            )
+            for i, row in enumerate(rows)
+        ]
+
+    with transaction.atomic():
+        PatientRiskSnapshot.objects.bulk_create(
+            snapshots, batch_size=1000, update_conflicts=True,
+            unique_fields=['patient', 'model_name'],
+            update_fields=['doctor', 'prediction_id', 'label', 'is_positive', 'probability',
+                           'model_version', 'scored_at'],
+        )
+        # Not refreshed by this run: the patient's predictions have all been deleted
+        stale = PatientRiskSnapshot.objects.filter(model_name=name, scored_at__lt=scored_at)
+        if doctor_id is not None:
+            stale = stale.filter(doctor_id=doctor_id)
+        removed = stale.delete()[0]
+
+    return {
+        'model': name,
+        'patients': len(rows),
+        'removed': removed,
+        'version': version,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def score_cohort(models=None, doctor_id=None):
+    """score_model() for each model; a model that cannot be loaded is logged and skipped"""
+    results = []
+    for name in models or PIPELINES:
+        try:
+            results.append(score_model(name, doctor_id))
+        except Exception as e:
+            logger.error(f"Cohort scoring for '{name}' failed: {str(e)}")
+            results.append({'model': name, 'error': str(e)})
+    return results
@@ -0,0 +1,426 @@
+# compiled.py
+"""
+Flattened tree ensembles evaluated with NumPy.
+
+``compile_model`` turns a fitted sklearn RandomForestClassifier or an
+XGBClassifier into a handful of contiguous arrays (one row per tree, one
+column per node):
+
+    feature       split feature index, -1 for leaves
+    threshold     split threshold
+    left, right   child node indices
+    default_left  where a missing (NaN) value goes
+    value         leaf output; for internal nodes the cover-weighted mean
+                  of the leaves below it
+    cover         training samples (or hessian sum) reaching the node
+
+``CompiledEnsemble.predict_proba`` walks every tree for every row at once,
+one tree level per step, which avoids the per-estimator Python overhead of
+sklearn and the DMatrix construction of XGBoost for small inputs.
+
+``CompiledEnsemble.contributions`` gives exact path-dependent TreeSHAP
+values. Every root-to-leaf path is listed once (LeafPaths). For a leaf with
+value v, each feature j on its path has z_j, the fraction of training cover
+that follows the path at j's splits, and o_j, 1 if the row follows them.
+The leaf's share of feature i's Shapley value is then
+
+    v * (o_i - z_i) * integral over t in [0, 1] of prod_{j != i} (z_j + t * (o_j - z_j))
+
+a polynomial in t that Gauss-Legendre quadrature integrates exactly. All
+leaves of all trees are evaluated together, one path slot at a time.
+"""
+import json
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+ARRAY_NAMES = ('feature', 'threshold', 'left', 'right', 'default_left', 'value', 'cover')
+
+
+class LeafPaths:
+    """
+    Root-to-leaf paths of every tree, for CompiledEnsemble.contributions().
+
+    Splits on the same feature are merged into one slot per path. Leaves are
+    ordered by their number of slots, longest first, and slots are stored
+    slot-major, so slot k of every leaf that has one is a contiguous run
+    ``offsets[k]:offsets[k + 1]`` covering the first ``counts[k]`` leaves.
+    """
+
+    def __init__(self, compiled):
+        feature, cover = compiled.feature, compiled.cover
+        n_trees, n_nodes = feature.shape
+        internal = feature >= 0
+        parent = np.full((n_trees, n_nodes), -1, dtype=np.intp)
+        tree, node = np.nonzero(internal)
+        parent[tree, compiled.left[internal]] = node
+        parent[tree, compiled.right[internal]] = node
+        # Padding columns look like leaves but are never reached
+        reachable = (parent >= 0) | (np.arange(n_nodes) == 0)
+        leaf_tree, leaf_node = np.nonzero(~internal & reachable)
+        n_leaves = len(leaf_tree)
+
+        # Walk every leaf up to its root at once, one split per step
+        steps = []
+        leaf, tree, child = np.arange(n_leaves), leaf_tree, leaf_node
+        up = parent[tree, child]
+        while True:
+            active = up >= 0
+            if not active.any():
+                break
+            leaf, tree, child, up = leaf[active], tree[active], child[active], up[active]
+            share = np.divide(cover[tree, child], cover[tree, up],
+                              out=np.zeros(len(up)), where=cover[tree, up] > 0)
+            steps.append((leaf, feature[tree, up], compiled.threshold[tree, up],
+                          compiled.left[tree, up] == child, compiled.default_left[tree, up], share))
+            child, up = up, parent[tree, up]
+        columns = [np.concatenate(column) for column in zip(*steps)] if steps else [np.empty(0, dtype=np.intp)] * 6
+        split_leaf, split_feature, threshold, went_left, default_left, share = columns
+
+        # One slot per (leaf, feature); its cover share is the product over those splits
+        order = np.lexsort((split_feature, split_leaf))
+        split_leaf, split_feature = split_leaf[order], split_feature[order]
+        is_start = np.r_[True, (split_leaf[1:] != split_leaf[:-1]) | (split_feature[1:] != split_feature[:-1])]
+        starts = np.flatnonzero(is_start) if len(order) else np.empty(0, dtype=np.intp)
+        split_slot = np.cumsum(is_start) - 1 if len(order) else np.empty(0, dtype=np.intp)
+        slot_leaf, slot_feature = split_leaf[starts], split_feature[starts]
+        slot_cover = np.multiply.reduceat(share[order], starts) if len(order) else np.empty(0)
+
+        width = np.bincount(slot_leaf, minlength=n_leaves)
+        rank = np.arange(len(starts)) - (np.cumsum(width) - width)[slot_leaf]
+        by_width = np.argsort(-width, kind='stable')
+        position = np.empty(n_leaves, dtype=np.intp)
+        position[by_width] = np.arange(n_leaves)
+        self.counts = (width[:, None] > np.arange(width.max(initial=0))).sum(axis=0)
+        self.offsets = np.r_[0, np.cumsum(self.counts)]
+        # Leaves below at least one split (a tree may be a single leaf)
+        self.n_split_leaves = int(self.counts[0]) if len(self.counts) else 0
+        flat = self.offsets[rank] + position[slot_leaf]
+
+        self.slot_feature = np.empty(len(flat), dtype=np.intp)
+        self.slot_feature[flat] = slot_feature
+        self.slot_cover = np.empty(len(flat), dtype=np.float64)
+        self.slot_cover[flat] = slot_cover
+        leaf_value = compiled.value[leaf_tree, leaf_node].astype(np.float64)
+        self.leaf_value = leaf_value[by_width]
+        # Expected output: each leaf weighted by the cover reaching it
+        reach = np.ones(n_leaves)
+        np.multiply.at(reach, slot_leaf, slot_cover)
+        self.expected_value = float(leaf_value @ reach)
+
+        # Splits ordered by slot, so each run reduces to that slot's o_j
+        split_order = np.argsort(flat[split_slot], kind='stable')
+        self.split_feature = split_feature[split_order]
+        self.split_threshold = threshold[order][split_order].astype(np.float64)
+        self.split_went_left = went_left[order][split_order].astype(bool)
+        self.split_default_left = default_left[order][split_order].astype(bool)
+        self.split_start = np.flatnonzero(np.r_[True, np.diff(flat[split_slot][split_order]) != 0]) \
+            if len(order) else np.empty(0, dtype=np.intp)
+
+        # The integrand has degree width - 1; n nodes integrate degree 2n - 1 exactly
+        nodes, weights = np.polynomial.legendre.leggauss(max(1, (len(self.counts) + 1) // 2))
+        self.quadrature_t = ((nodes + 1) / 2)[:, None]
+        self.quadrature_w = weights / 2
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in vars(self).values() if isinstance(array, np.ndarray))
+
+
+class CompiledEnsemble:
+    def __init__(self, kind, feature, threshold, left, right, default_left, value, cover,
+                 max_depth, n_features, base_margin=0.0, source_digest=None):
+        # 'random_forest': average of per-tree class-1 probabilities, x <= threshold goes left
+        # 'xgboost': sigmoid(base_margin + sum of leaf values), x < threshold goes left
+        self.kind = kind
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.cover = cover
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.base_margin = float(base_margin)
+        # sha256 of the pickled model this was compiled from
+        self.source_digest = source_digest
+        self._tree_index = np.arange(feature.shape[0])
+        self._paths = None
+
+    @property
+    def n_trees(self):
+        return self.feature.shape[0]
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in ARRAY_NAMES)
+
+    def apply(self, X):
+        """Leaf node index reached in every tree, shape (n_samples, n_trees)"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_samples = X.shape[0]
+        rows = np.arange(n_samples)[:, None]
+        trees = self._tree_index[None, :]
+        node = np.zeros((n_samples, self.n_trees), dtype=np.int32)
+
+        for _ in range(self.max_depth):
+            feature = self.feature[trees, node]
+            is_leaf = feature < 0
+            if is_leaf.all():
+                break
+            x = X[rows, np.where(is_leaf, 0, feature)].astype(np.float64)
+            threshold = self.threshold[trees, node]
+            if self.kind == 'xgboost':
+                go_left = x < threshold
+            else:
+                go_left = x <= threshold
+            go_left = np.where(np.isnan(x), self.default_left[trees, node], go_left)
+            child = np.where(go_left, self.left[trees, node], self.right[trees, node])
+            node = np.where(is_leaf, node, child)
+        return node
+
+    def leaf_values(self, X):
+        """Output of every tree for every row, shape (n_samples, n_trees)"""
+        return self.value[self._tree_index[None, :], self.apply(X)]
+
+    def predict_proba(self, X):
+        values = self.leaf_values(X)
+        if self.kind == 'xgboost':
+            margin = self.base_margin + values.sum(axis=1)
+            positive = 1.0 / (1.0 + np.exp(-margin))
+        else:
+            positive = values.mean(axis=1)
+        return np.column_stack([1.0 - positive, positive])
+
+    def __getstate__(self):
+        # Paths are rebuilt on demand rather than stored in artifacts
+        state = dict(self.__dict__)
+        state['_paths'] = None
+        return state
+
+    def __setstate__(self, state):
+        state.setdefault('_paths', None)
+        self.__dict__.update(state)
+
+    @property
+    def paths(self):
+        """LeafPaths for contributions(), built on first use"""
+        if self._paths is None:
+            self._paths = LeafPaths(self)
+        return self._paths
+
+    def contributions(self, x):
+        """
+        TreeSHAP values of one row: ``(base_value, per-feature contributions)``
+        whose sum is the model output, a probability for random forests and a
+        log-odds margin for XGBoost
+        """
+        paths = self.paths
+        x = np.asarray(x, dtype=np.float32).reshape(-1).astype(np.float64)
+        value = x[paths.split_feature]
+        if self.kind == 'xgboost':
+            go_left = value < paths.split_threshold
+        else:
+            go_left = value <= paths.split_threshold
+        go_left = np.where(np.isnan(value), paths.split_default_left, go_left)
+        followed = go_left == paths.split_went_left
+
+        z = paths.slot_cover
+        o = np.logical_and.reduceat(followed, paths.split_start) if followed.size else np.empty(0)
+        d = o - z
+
+        # Slot k's factor z + t * (o - z) at every quadrature node; each slot needs
+        # the product of the other slots' factors, from running prefix and suffix products
+        factors, before = [], []
+        running = np.ones((len(paths.quadrature_t), paths.n_split_leaves))
+        for start, stop in zip(paths.offsets[:-1], paths.offsets[1:]):
+            factors.append(z[start:stop] + d[start:stop] * paths.quadrature_t)
+            before.append(running[:, :stop - start])
+            running = before[-1] * factors[-1]
+        phi = np.empty(len(z))
+        after = np.ones((len(paths.quadrature_t), paths.n_split_leaves))
+        for k in reversed(range(len(factors))):
+            start, stop = paths.offsets[k], paths.offsets[k + 1]
+            n = stop - start
+            phi[start:stop] = paths.leaf_value[:n] * d[start:stop] * (paths.quadrature_w @ (before[k] * after[:, :n]))
+            after[:, :n] *= factors[k]
+
+        contributions = np.bincount(paths.slot_feature, weights=phi, minlength=self.n_features)
+        base_value = paths.expected_value
+        if self.kind == 'xgboost':
+            base_value += self.base_margin
+        else:
+            base_value /= self.n_trees
+            contributions /= self.n_trees
+        return base_value, contributions
+
+    def save(self, path):
+        """Write the arrays and metadata to an uncompressed .npz file"""
+        meta = {
+            'format_version': FORMAT_VERSION,
+            'kind': self.kind,
+            'max_depth': self.max_depth,
+            'n_features': self.n_features,
+            'base_margin': self.base_margin,
+            'source_digest': self.source_digest,
+        }
+        arrays = {name: getattr(self, name) for name in ARRAY_NAMES}
+        with open(path, 'wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('format_version') != FORMAT_VERSION:
+                raise ValueError(f"Unsupported compiled model format in {path}: {meta.get('format_version')}")
+            arrays = {name: data[name] for name in ARRAY_NAMES}
+        return cls(
+            kind=meta['kind'], max_depth=meta['max_depth'], n_features=meta['n_features'],
+            base_margin=meta['base_margin'], source_digest=meta.get('source_digest'), **arrays
+        )
+
+
+def _empty_arrays(n_trees, n_nodes):
+    return {
+        'feature': np.full((n_trees, n_nodes), -1, dtype=np.int32),
+        'threshold': np.zeros((n_trees, n_nodes), dtype=np.float64),
+        'left': np.zeros((n_trees, n_nodes), dtype=np.int32),
+        'right': np.zeros((n_trees, n_nodes), dtype=np.int32),
+        'default_left': np.zeros((n_trees, n_nodes), dtype=bool),
+        'value': np.zeros((n_trees, n_nodes), dtype=np.float64),
+        'cover': np.zeros((n_trees, n_nodes), dtype=np.float64),
+    }
+
+
+def compile_random_forest(model):
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    arrays = _empty_arrays(len(trees), max(tree.node_count for tree in trees))
+    positive_class = 1
+
+    for t, tree in enumerate(trees):
+        n = tree.node_count
+        is_leaf = tree.children_left == -1
+        arrays['feature'][t, :n] = np.where(is_leaf, -1, tree.feature)
+        arrays['threshold'][t, :n] = tree.threshold
+        arrays['left'][t, :n] = np.where(is_leaf, 0, tree.children_left)
+        arrays['right'][t, :n] = np.where(is_leaf, 0, tree.children_right)
+        # sklearn sends missing values to the right unless told otherwise
+        missing_left = getattr(tree, 'missing_go_to_left', None)
+        if missing_left is not None:
+            arrays['default_left'][t, :n] = missing_left.astype(bool)
+        class_weights = tree.value[:, 0, :]
+        arrays['value'][t, :n] = class_weights[:, positive_class] / class_weights.sum(axis=1)
+        arrays['cover'][t, :n] = tree.weighted_n_node_samples
+
+    return CompiledEnsemble(
+        'random_forest', max_depth=max(tree.max_depth for tree in trees) + 1,
+        n_features=model.n_features_in_, **arrays
+    )
+
+
+def _xgboost_base_margin(booster):
+    config = json.loads(booster.save_config())
+    base_score = config['learner']['learner_model_param']['base_score'].strip('[]')
+    base_score = float(base_score.split(',')[0])
+    # binary:logistic stores base_score as a probability
+    return float(np.log(base_score / (1.0 - base_score)))
+
+
+def compile_xgboost(model):
+    booster = model.get_booster()
+    feature_names = booster.feature_names
+    feature_index = {name: i for i, name in enumerate(feature_names)} if feature_names else None
+
+    best_iteration = getattr(model, 'best_iteration', None)
+    dumps = booster.get_dump(dump_format='json', with_stats=True)
+    if best_iteration is not None:
+        dumps = dumps[:best_iteration + 1]
+
+    parsed = []
+    for dump in dumps:
+        nodes = {}
+        stack = [json.loads(dump)]
+        while stack:
+            node = stack.pop()
+            nodes[node['nodeid']] = node
+            stack.extend(node.get('children', []))
+        parsed.append(nodes)
+
+    arrays = _empty_arrays(len(parsed), max(max(nodes) + 1 for nodes in parsed))
+    max_depth = 0
+
+    for t, nodes in enumerate(parsed):
+        for node_id, node in nodes.items():
+            arrays['cover'][t, node_id] = node['cover']
+            if 'leaf' in node:
+                arrays['value'][t, node_id] = node['leaf']
+                continue
+            split = node['split']
+            arrays['feature'][t, node_id] = feature_index[split] if feature_index else int(split.lstrip('f'))
+            # XGBoost compares in float32; keep the threshold exactly representable
+            arrays['threshold'][t, node_id] = np.float32(node['split_condition'])
+            arrays['left'][t, node_id] = node['yes']
+            arrays['right'][t, node_id] = node['no']
+            arrays['default_left'][t, node_id] = node['missing'] == node['yes']
+            max_depth = max(max_depth, node.get('depth', 0) + 1)
+
+        # Internal node value = cover-weighted mean of its children, bottom-up
+        for node_id in sorted(nodes, key=lambda i: -nodes[i].get('depth', 0)):
+            node = nodes[node_id]
+            if 'leaf' in node:
+                continue
+            left, right = node['yes'], node['no']
+            cover_left, cover_right = arrays['cover'][t, left], arrays['cover'][t, right]
+            total = cover_left + cover_right
+            if total > 0:
+                arrays['value'][t, node_id] = (
+                    arrays['value'][t, left] * cover_left + arrays['value'][t, right] * cover_right
+                ) / total
+
+    return CompiledEnsemble(
+        'xgboost', max_depth=max_depth + 1, n_features=booster.num_features(),
+        base_margin=_xgboost_base_margin(booster), **arrays
+    )
+
+
+def parity_samples(compiled, n_samples, seed=0):
+    """
+    Random rows drawn from the split thresholds themselves (exactly on, just
+    below and just above them), so every comparison in the ensemble is
+    exercised on both sides, plus a few missing values.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n_samples, compiled.n_features), dtype=np.float32)
+    for f in range(compiled.n_features):
+        thresholds = np.unique(compiled.threshold[compiled.feature == f]).astype(np.float32)
+        if thresholds.size == 0:
+            continue
+        picked = rng.choice(thresholds, n_samples)
+        nudge = rng.choice([-1, 0, 1], n_samples)
+        X[:, f] = np.where(nudge < 0, np.nextafter(picked, np.float32(-np.inf)),
+                           np.where(nudge > 0, np.nextafter(picked, np.float32(np.inf)), picked))
+    X[rng.random(X.shape) < 0.02] = np.nan
+    return X
+
+
+def parity_error(model, compiled, n_samples=2000):
+    """Largest absolute difference in positive-class probability on parity_samples()"""
+    X = parity_samples(compiled, n_samples)
+    expected = model.predict_proba(X)[:, 1]
+    actual = compiled.predict_proba(X)[:, 1]
+    return float(np.max(np.abs(expected - actual)))
+
+
+def compile_model(model):
+    """Compile a supported tree ensemble, raising TypeError for anything else"""
+    class_name = type(model).__name__
+    if class_name == 'RandomForestClassifier':
+        return compile_random_forest(model)
+    if class_name == 'XGBClassifier':
+        return compile_xgboost(model)
+    raise TypeError(f"Cannot compile models of type {class_name}")
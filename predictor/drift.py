@@ -0,0 +1,257 @@
+# drift.py
+"""
+Feature drift monitoring.
+
+Each model has a DriftBaseline built by ``manage.py drift_baseline`` from a
+reference sample (the training CSV, or the predictions stored so far). It
+holds up to PREDICTOR_DRIFT_BINS quantile bins per encoded feature and the
+reference count in each bin.
+
+Every scored feature matrix is binned against those edges and added to a
+fixed (features x bins) integer array per model. Memory therefore depends
+only on the number of features, not on how many predictions are made. At
+most every PREDICTOR_DRIFT_FLUSH_SECONDS, after the response to a request
+that scored something has been sent, the counts are added to that day's
+FeatureHistogram row and reset, and the baselines are re-read in one query
+so new or rebuilt ones are picked up. Scoring itself never touches the
+database: a model without a baseline is simply not counted. Requests that
+score nothing never touch it either.
+
+drift_report() compares the last few days of live counts with the
+baseline, giving the Population Stability Index and a binned
+Kolmogorov-Smirnov distance per feature. The model's score is the worst
+feature.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DriftBaseline, FeatureHistogram
+
+logger = logging.getLogger(__name__)
+
+# Conventional PSI bands: below 0.1 stable, above 0.25 a significant shift
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+
+
+def quantile_edges(sample, bins):
+    """Interior bin edges per column of ``sample``: up to ``bins`` quantile bins, ties merged"""
+    levels = np.linspace(0, 1, bins + 1)[1:-1]
+    return [np.unique(np.quantile(column, levels)).tolist() for column in np.asarray(sample, dtype=np.float64).T]
+
+
+def pad_edges(edges):
+    """Ragged per-feature edges as one (features, width - 1) array padded with +inf"""
+    width = max((len(e) for e in edges), default=0) + 1
+    padded = np.full((len(edges), width - 1), np.inf)
+    for i, e in enumerate(edges):
+        padded[i, :len(e)] = e
+    return padded
+
+
+def bin_counts(padded_edges, features):
+    """(features, width) counts of the rows of ``features``; bin i holds values with i edges at or below them"""
+    features = np.asarray(features, dtype=np.float64)
+    n_features, width = padded_edges.shape[0], padded_edges.shape[1] + 1
+    index = (features[:, :, None] >= padded_edges[None, :, :]).sum(axis=2)
+    flat = (index + np.arange(n_features) * width).ravel()
+    return np.bincount(flat, minlength=n_features * width).reshape(n_features, width)
+
+
+def psi(expected, actual, eps=1e-4):
+    e = np.maximum(np.asarray(expected, dtype=np.float64) / max(np.sum(expected), 1), eps)
+    a = np.maximum(np.asarray(actual, dtype=np.float64) / max(np.sum(actual), 1), eps)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks_distance(expected, actual):
+    """Largest gap between the two binned CDFs"""
+    e = np.cumsum(expected) / max(np.sum(expected), 1)
+    a = np.cumsum(actual) / max(np.sum(actual), 1)
+    return float(np.max(np.abs(a - e)))
+
+
+class _ModelCounts:
+    def __init__(self, baseline):
+        self.baseline_id = baseline.id
+        # Rebuilding a baseline keeps its id but changes this
+        self.built_at = baseline.created_at
+        self.widths = [len(e) + 1 for e in baseline.edges]
+        self.edges = pad_edges(baseline.edges)
+        self.counts = np.zeros((self.edges.shape[0], self.edges.shape[1] + 1), dtype=np.int64)
+        self.observations = 0
+
+
+class DriftMonitor:
+    def __init__(self, flush_seconds=60):
+        self.flush_seconds = flush_seconds
+        self._models = {}
+        self._lock = threading.Lock()
+        # None until the baselines have been read
+        self._last_flush = None
+        # Set by observe(); requests that scored nothing skip flush_if_due()
+        self._scored = False
+
+    def observe(self, model_name, features):
+        """Add a scored feature matrix to the model's live histogram (no database access)"""
+        self._scored = True
+        state = self._models.get(model_name)
+        if state is None:
+            return
+        counts = bin_counts(state.edges, features)
+        with self._lock:
+            state.counts += counts
+            state.observations += len(features)
+
+    def refresh(self):
+        """Read every baseline and track the new, rebuilt or removed ones"""
+        try:
+            baselines = {baseline.model_name: baseline for baseline in
+                         DriftBaseline.objects.only('id', 'model_name', 'edges', 'created_at')}
+        except Exception as e:
+            logger.error(f"Loading drift baselines failed: {str(e)}")
+            return
+        with self._lock:
+            for model_name in [name for name in self._models if name not in baselines]:
+                del self._models[model_name]
+            for model_name, baseline in baselines.items():
+                state = self._models.get(model_name)
+                if state is None or (state.baseline_id, state.built_at) != (baseline.id, baseline.created_at):
+                    self._models[model_name] = _ModelCounts(baseline)
+
+    def reset(self, model_name=None):
+        """Forget live counts and cached baselines, e.g. after a baseline is rebuilt"""
+        with self._lock:
+            if model_name is None:
+                self._models.clear()
+            else:
+                self._models.pop(model_name, None)
+            # Re-read the baselines after the next response
+            self._last_flush = None
+
+    def flush(self):
+        """Add the live counts to today's FeatureHistogram rows and start again from zero"""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            taken = []
+            for model_name, state in self._models.items():
+                if state.observations:
+                    taken.append((model_name, state, state.counts, state.observations))
+                    state.counts = np.zeros_like(state.counts)
+                    state.observations = 0
+        day = timezone.localdate()
+        for model_name, state, counts, observations in taken:
+            try:
+                self._save(state, day, counts, observations)
+            except DriftBaseline.DoesNotExist:
+                # Rebuilt or removed meanwhile: these counts are in stale bins
+                self.reset(model_name)
+            except Exception as e:
+                logger.error(f"Saving drift histogram for '{model_name}' failed: {str(e)}")
+
+    def _save(self, state, day, counts, observations):
+        with transaction.atomic():
+            DriftBaseline.objects.select_for_update().get(id=state.baseline_id, created_at=state.built_at)
+            FeatureHistogram.objects.get_or_create(
+                baseline_id=state.baseline_id, day=day,
+                defaults={'counts': [[0] * width for width in state.widths]})
+            histogram = FeatureHistogram.objects.select_for_update().get(baseline_id=state.baseline_id, day=day)
+            histogram.counts = [
+                [old + int(new) for old, new in zip(row, counts[i, :width])]
+                for i, (row, width) in enumerate(zip(histogram.counts, state.widths))
+            ]
+            histogram.observations += observations
+            histogram.save()
+
+    def flush_if_due(self, **kwargs):
+        if not self._scored:
+            return
+        if self._last_flush is None or time.monotonic() - self._last_flush >= self.flush_seconds:
+            self._scored = False
+            self.flush()
+            self.refresh()
+
+    def stats(self):
+        with self._lock:
+            return {name: {'baseline_id': state.baseline_id, 'unflushed': state.observations,
+                           'bytes': state.counts.nbytes + state.edges.nbytes}
+                    for name, state in self._models.items()}
+
+
+def build_baseline(model_name, feature_names, sample, bins, source=''):
+    """Replace the model's baseline with one binned from ``sample`` (rows x features)"""
+    sample = np.asarray(sample, dtype=np.float64)
+    edges = quantile_edges(sample, bins)
+    counts = bin_counts(pad_edges(edges), sample)
+    with transaction.atomic():
+        baseline, _ = DriftBaseline.objects.update_or_create(model_name=model_name, defaults={
+            'feature_names': list(feature_names),
+            'edges': edges,
+            'counts': [counts[i, :len(e) + 1].tolist() for i, e in enumerate(edges)],
+            'sample_size': len(sample),
+            'source': source[:255],
+        })
+        # Live counts were binned against the previous edges
+        baseline.histograms.all().delete()
+    # Servers in other processes pick it up at their next flush
+    monitor.refresh()
+    return baseline
+
+
+def drift_report(model_name, days=7):
+    """PSI and KS per feature for the last ``days`` days against the baseline, or None without one"""
+    baseline = DriftBaseline.objects.filter(model_name=model_name).first()
+    if baseline is None:
+        return None
+    since = timezone.localdate() - timedelta(days=days - 1)
+    live = [np.zeros(len(row), dtype=np.int64) for row in baseline.counts]
+    observations = 0
+    for histogram in baseline.histograms.filter(day__gte=since):
+        observations += histogram.observations
+        for i, row in enumerate(histogram.counts):
+            live[i] += row
+
+    features = []
+    if observations:
+        for name, expected, actual in zip(baseline.feature_names, baseline.counts, live):
+            features.append({
+                'feature': name,
+                'psi': round(psi(expected, actual), 4),
+                'ks': round(ks_distance(expected, actual), 4),
+            })
+        features.sort(key=lambda f: f['psi'], reverse=True)
+    worst = features[0]['psi'] if features else None
+    if worst is None:
+        status = 'no data'
+    elif worst >= PSI_SIGNIFICANT:
+        status = 'significant'
+    elif worst >= PSI_MODERATE:
+        status = 'moderate'
+    else:
+        status = 'stable'
+    return {
+        'model': model_name,
+        'baseline': {
+            'sample_size': baseline.sample_size,
+            'source': baseline.source,
+            'created_at': baseline.created_at.isoformat(),
+        },
+        'window_days': days,
+        'observations': observations,
+        'psi': worst,
+        'ks': max((f['ks'] for f in features), default=None),
+        'status': status,
+        'features': features,
+    }
+
+
+monitor = DriftMonitor(flush_seconds=getattr(settings, 'PREDICTOR_DRIFT_FLUSH_SECONDS', 60))
+request_finished.connect(monitor.flush_if_due)
@@ -0,0 +1,178 @@
+# encoding.py
+"""
+Feature encoders compiled from a declarative spec.
+
+A spec lists the model's input fields (InputField: name, input type,
+optional raw-value transform and the raw values it accepts, optional
+categorical vocabulary) and the order in which they appear in the encoded
+matrix. FeatureEncoder turns
+that into index arrays once, at import time, so encoding a batch of model
+instances or dicts is:
+
+  1. read the raw values into one (rows x inputs) float64 matrix, and
+  2. scatter it into the float32 output: numeric fields in a single
+     fancy-indexed copy, each categorical field as a one-hot block from
+     one broadcast comparison against its vocabulary.
+
+A field with ``drop_first`` has no column for its first code (the
+reference category, as in pandas.get_dummies(drop_first=True)), so that
+code encodes as an all-zero block. Values outside a vocabulary encode as
+zeros as well (see out_of_vocabulary() to reject them instead). The single-row case reads
+into a per-thread preallocated buffer. The output is always a fresh array,
+because callers keep it (result cache, drift monitor, shadow evaluation).
+"""
+import threading
+
+import numpy as np
+
+
+class InputField:
+    def __init__(self, name, kind='float', transform=None, choices=None, vocabulary=None, drop_first=False):
+        self.name = name
+        # 'int' fields are stored as integers (batch rows are converted accordingly)
+        self.kind = kind
+        # Raw value -> number, for inputs such as 'Male'/'Female'
+        self.transform = transform
+        # Raw values the transform accepts (None: any)
+        self.choices = None if choices is None else list(choices)
+        # Category codes, one-hot encoded in this order
+        self.vocabulary = None if vocabulary is None else list(vocabulary)
+        # The first code is the reference category and gets no column
+        self.drop_first = drop_first
+
+    @property
+    def encoded_vocabulary(self):
+        """The codes that get a one-hot column"""
+        return self.vocabulary[1:] if self.drop_first else self.vocabulary
+
+    @property
+    def width(self):
+        return 1 if self.vocabulary is None else len(self.encoded_vocabulary)
+
+    def feature_names(self):
+        if self.vocabulary is None:
+            return [self.name]
+        return [f'{self.name}_{value}' for value in self.encoded_vocabulary]
+
+
+class FeatureEncoder:
+    def __init__(self, fields, order=None, dtype=np.float32):
+        """
+        ``fields`` are the inputs in form/storage order; ``order`` lists their
+        names in the column order the model was trained on (default: the same)
+        """
+        self.fields = list(fields)
+        self.dtype = np.dtype(dtype)
+        self.input_names = [field.name for field in self.fields]
+        by_name = {field.name: field for field in self.fields}
+        position = {name: i for i, name in enumerate(self.input_names)}
+        order = list(order or self.input_names)
+        if sorted(order) != sorted(self.input_names):
+            raise ValueError(f"Column order {order} does not cover the inputs {self.input_names}")
+
+        self.feature_names = []
+        # Index of the input field each encoded column comes from
+        feature_fields = []
+        numeric_in, numeric_out = [], []
+        self._categorical = []
+        for name in order:
+            field = by_name[name]
+            start = len(self.feature_names)
+            self.feature_names.extend(field.feature_names())
+            feature_fields.extend([position[name]] * field.width)
+            if field.vocabulary is None:
+                numeric_in.append(position[name])
+                numeric_out.append(start)
+            else:
+                vocabulary = np.asarray(field.encoded_vocabulary, dtype=np.float64)
+                self._categorical.append((position[name], slice(start, start + field.width), vocabulary))
+        self.feature_fields = np.asarray(feature_fields, dtype=np.intp)
+        self._numeric_in = np.asarray(numeric_in, dtype=np.intp)
+        self._numeric_out = np.asarray(numeric_out, dtype=np.intp)
+        self._transforms = [(i, field.transform) for i, field in enumerate(self.fields) if field.transform]
+        self._local = threading.local()
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    @property
+    def transforms(self):
+        return {field.name: field.transform for field in self.fields if field.transform}
+
+    @property
+    def integer_fields(self):
+        return {field.name for field in self.fields if field.kind == 'int'}
+
+    def _row_buffer(self):
+        buffer = getattr(self._local, 'row', None)
+        if buffer is None:
+            buffer = self._local.row = np.empty((1, len(self.fields)), dtype=np.float64)
+        return buffer
+
+    def _raw_matrix(self, rows):
+        """
+        (rows x inputs) float64 matrix of the raw values, transforms applied. A
+        single row is read into a per-thread buffer that the next call reuses.
+        ``rows`` may be model instances or dicts; a missing key raises KeyError.
+        """
+        if isinstance(rows[0] if rows else None, dict):
+            get = dict.__getitem__
+        else:
+            get = getattr
+        if len(rows) == 1:
+            values = [get(rows[0], name) for name in self.input_names]
+            for i, transform in self._transforms:
+                values[i] = transform(values[i])
+            raw = self._row_buffer()
+            raw[0] = values
+            return raw
+
+        raw = np.empty((len(rows), len(self.fields)), dtype=np.float64)
+        for i, name in enumerate(self.input_names):
+            values = [get(row, name) for row in rows]
+            transform = self.fields[i].transform
+            raw[:, i] = values if transform is None else [transform(v) for v in values]
+        return raw
+
+    def columns(self, rows):
+        """One float64 array per input field"""
+        raw = self._raw_matrix(rows)
+        return {name: raw[:, i].copy() for i, name in enumerate(self.input_names)}
+
+    def encode_raw(self, raw):
+        """Model matrix from a (rows x inputs) raw matrix"""
+        out = np.zeros((raw.shape[0], self.n_features), dtype=self.dtype)
+        out[:, self._numeric_out] = raw[:, self._numeric_in]
+        for index, block, vocabulary in self._categorical:
+            out[:, block] = raw[:, index, None] == vocabulary
+        return out
+
+    def encode(self, rows):
+        """Model matrix for a list of model instances or dicts"""
+        return self.encode_raw(self._raw_matrix(rows))
+
+    def encode_columns(self, columns):
+        """Model matrix from the per-field arrays returned by columns()"""
+        return self.encode_raw(np.column_stack([columns[name] for name in self.input_names]))
+
+    def per_field(self, values):
+        """Sum per-encoded-column ``values`` (e.g. attributions) into one value per input field"""
+        return np.bincount(self.feature_fields, weights=values, minlength=len(self.fields))
+
+    def invalid_choices(self, rows):
+        """{field: choices} for each field with a raw value in ``rows`` (dicts) outside its choices"""
+        return {
+            field.name: field.choices
+            for field in self.fields
+            if field.choices is not None
+            and any(field.name in row and str(row[field.name]).strip() not in field.choices for row in rows)
+        }
+
+    def out_of_vocabulary(self, columns):
+        """{field: vocabulary} for each categorical field with a value outside its vocabulary"""
+        return {
+            field.name: field.vocabulary
+            for field in self.fields
+            if field.vocabulary is not None and not np.all(np.isin(columns[field.name], field.vocabulary))
+        }
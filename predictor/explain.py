@@ -0,0 +1,95 @@
+# explain.py
+"""
+Per-feature explanations of stored predictions.
+
+explain() encodes a prediction's inputs, applies the model's scaler and
+asks the compiled tree ensemble for TreeSHAP contributions (see
+compiled.py). Contributions of one-hot columns are summed back into their
+input field, so there is one entry per form field. A model that was not
+compiled by ``manage.py compile_models`` (or is served uncompiled) is
+compiled in memory on first use, once per model version.
+
+Explanations are cached for PREDICTOR_EXPLANATION_CACHE_TTL seconds under
+the prediction id and model version: stored inputs never change, and a new
+model version gets a fresh explanation.
+
+Only the model loaded now can be explained; replaced artifacts are not kept.
+When it is not the version stored with the prediction (a hot reload since),
+the explanation says so, because its output no longer matches the
+probability on the report.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .compiled import compile_model
+from .registry import registry
+
+
+class ExplanationUnavailable(Exception):
+    """Raised when the model cannot be explained (not a supported tree ensemble)"""
+
+
+_compiled = {}
+_compile_lock = threading.Lock()
+
+
+def _ensemble(loaded):
+    """The model's CompiledEnsemble, compiling and keeping it per version if it was loaded without one"""
+    if loaded.compiled is not None:
+        return loaded.compiled
+    key = (loaded.name, loaded.version)
+    with _compile_lock:
+        if key not in _compiled:
+            try:
+                _compiled[key] = compile_model(loaded.model)
+            except TypeError as e:
+                raise ExplanationUnavailable(str(e))
+        return _compiled[key]
+
+
+def _cache_key(pipeline, prediction_id, version):
+    return f'predictor:explanation:{pipeline.name}:{prediction_id}:{version}'
+
+
+def explain(pipeline, prediction):
+    """
+    Contribution of each input field to the positive-class output for a
+    stored prediction, largest first. ``base_value`` plus all contributions
+    equals ``output_value`` (a probability, or a log-odds margin for XGBoost).
+    """
+    loaded = registry.get(pipeline.model_name)
+    key = _cache_key(pipeline, prediction.id, loaded.version)
+    explanation = cache.get(key)
+    if explanation is not None:
+        return explanation
+
+    started = time.perf_counter()
+    ensemble = _ensemble(loaded)
+    features = np.asarray(pipeline.encode([prediction]), dtype=loaded.dtype)
+    if loaded.scaler is not None:
+        features = loaded.scaler.transform(features)
+    base_value, contributions = ensemble.contributions(features[0])
+    per_field = pipeline.encoder.per_field(contributions)
+    inputs = pipeline.raw_features(prediction)
+
+    explanation = {
+        'model_version': loaded.version,
+        'prediction_model_version': prediction.model_version or None,
+        'version_mismatch': prediction.model_version != loaded.version,
+        'units': 'log_odds' if ensemble.kind == 'xgboost' else 'probability',
+        'positive_label': pipeline.labels[1],
+        'base_value': round(base_value, 6),
+        'output_value': round(base_value + float(contributions.sum()), 6),
+        'contributions': sorted(
+            ({'field': field, 'value': inputs[field], 'contribution': round(float(per_field[i]), 6)}
+             for i, field in enumerate(pipeline.fields)),
+            key=lambda item: abs(item['contribution']), reverse=True,
+        ),
+        'compute_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
+    cache.set(key, explanation, getattr(settings, 'PREDICTOR_EXPLANATION_CACHE_TTL', 3600))
+    return explanation
@@ -0,0 +1,185 @@
+# export.py
+"""
+Bulk report export as a streamed ZIP archive.
+
+``stream_reports_zip`` yields the archive a piece at a time, so memory stays
+flat however many reports are selected. PDFs already in media storage are
+copied into the archive in chunks; reports without one are rendered in a
+small pool of worker processes (PREDICTOR_EXPORT_WORKERS, 0 renders in the
+request thread), stored on the report for next time and then added. At most
+a few renders are in flight at once. Reports that cannot be rendered are
+listed in ``errors.txt`` at the end of the archive.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ZipStream:
+    """Write-only file for ZipFile; take() returns what was written since the last call"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def render_missing_pdf(report_id):
+    """Render and store the PDF for a report that has none; returns (storage name, bytes)"""
+    # Imported here: spawned workers import this module before django.setup()
+    from .jobs import build_pdf, load_prediction
+    from .models import PredictionReport
+
+    report = PredictionReport.objects.get(id=report_id)
+    pdf_bytes = build_pdf(report, load_prediction(report))
+    return report.pdf_file.name, pdf_bytes
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The shared render pool, or None when PREDICTOR_EXPORT_WORKERS is 0"""
+    global _pool
+    workers = getattr(settings, 'PREDICTOR_EXPORT_WORKERS', 2)
+    if workers <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                )
+    return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _stored_pdf(report):
+    if report.pdf_file and default_storage.exists(report.pdf_file.name):
+        return report.pdf_file.name
+    return None
+
+
+class _Archive:
+    def __init__(self, stream):
+        self.zip = zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED)
+        self.names = set()
+        self.errors = []
+
+    def entry(self, report, storage_name):
+        name = f"{report.prediction_type}/{os.path.basename(storage_name)}"
+        if name in self.names:
+            name = f"{report.prediction_type}/{report.id}_{os.path.basename(storage_name)}"
+        self.names.add(name)
+        info = zipfile.ZipInfo(name, date_time=report.created_at.timetuple()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        return info
+
+    def failed(self, report, error):
+        logger.error(f"Exporting report {report.id} failed: {str(error)}")
+        self.errors.append(f"Report {report.id} ({report.prediction_type}, patient {report.patient_id}): {error}")
+
+    def close(self):
+        if self.errors:
+            self.zip.writestr('errors.txt', '\n'.join(self.errors) + '\n')
+        self.zip.close()
+
+
+def stream_reports_zip(reports):
+    """Yield a ZIP archive of the PDFs for the ``reports`` queryset"""
+    return (chunk for chunk in _zip_chunks(reports) if chunk)
+
+
+def _zip_chunks(reports):
+    stream = _ZipStream()
+    archive = _Archive(stream)
+    pool = get_pool()
+    max_pending = 2 * getattr(settings, 'PREDICTOR_EXPORT_WORKERS', 2)
+    pending = deque()
+
+    def add_rendered(report, result):
+        try:
+            storage_name, pdf_bytes = result()
+        except BrokenProcessPool as e:
+            _reset_pool()
+            archive.failed(report, e)
+            return
+        except Exception as e:
+            archive.failed(report, e)
+            return
+        archive.zip.writestr(archive.entry(report, storage_name), pdf_bytes)
+
+    for report in reports.iterator(chunk_size=200):
+        storage_name = _stored_pdf(report)
+        if storage_name is not None:
+            with default_storage.open(storage_name, 'rb') as source, \
+                    archive.zip.open(archive.entry(report, storage_name), 'w') as target:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    target.write(chunk)
+                    yield stream.take()
+            yield stream.take()
+            continue
+
+        if pool is None:
+            add_rendered(report, lambda: render_missing_pdf(report.id))
+            yield stream.take()
+            continue
+
+        try:
+            pending.append((report, pool.submit(render_missing_pdf, report.id)))
+        except BrokenProcessPool as e:
+            logger.error(f"Export render pool is broken, rendering in-process: {str(e)}")
+            _reset_pool()
+            pool = None
+            add_rendered(report, lambda: render_missing_pdf(report.id))
+            yield stream.take()
+            continue
+        if len(pending) >= max_pending:
+            report, future = pending.popleft()
+            add_rendered(report, future.result)
+            yield stream.take()
+
+    while pending:
+        report, future = pending.popleft()
+        add_rendered(report, future.result)
+        yield stream.take()
+
+    archive.close()
+    yield stream.take()
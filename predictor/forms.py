@@ -1,8 +1,29 @@
 # forms.py
 from django import forms
+from django.core.validators import MaxValueValidator, MinValueValidator
 from .models import BreastCancerPrediction, LiverDiseasePrediction,DiabetesPrediction
 from accounts.models import Patient
 
+
+def input_bounds(form):
+    """{field: (min, max)} from the min/max attributes of the form's number inputs (None when open)"""
+    bounds = {}
+    for name, field in form.fields.items():
+        attrs = field.widget.attrs
+        if 'min' in attrs or 'max' in attrs:
+            bounds[name] = tuple(float(attrs[key]) if key in attrs else None for key in ('min', 'max'))
+    return bounds
+
+
+def enforce_input_bounds(form):
+    """Validate the number inputs' min/max on the server too, not only in the browser"""
+    for name, (low, high) in input_bounds(form).items():
+        field = form.fields[name]
+        if low is not None:
+            field.validators.append(MinValueValidator(low))
+        if high is not None:
+            field.validators.append(MaxValueValidator(high))
+
 class PatientSelectionForm(forms.Form):
     patient = forms.ModelChoiceField(
         queryset=Patient.objects.none(),
@@ -104,6 +125,7 @@ class LiverDiseasePredictionForm(forms.ModelForm):
                     'min': '0',
                     'step': '0.01'
                 })
+        enforce_input_bounds(self)
 
 ## forms.py
 from django import forms
@@ -186,6 +208,7 @@ class DiabetesPredictionForm(forms.ModelForm):
             
         # Improve patient display format
         self.fields['patient'].label_from_instance = lambda obj: f"{obj.first_name} {obj.last_name} - {obj.email}"
+        enforce_input_bounds(self)
 
 # Add this to your forms.py file
 
@@ -346,6 +369,7 @@ class HeartDiseasePredictionForm(forms.ModelForm):
             
         # Improve patient display format
         self.fields['patient'].label_from_instance = lambda obj: f"{obj.first_name} {obj.last_name} - {obj.email}"
+        enforce_input_bounds(self)
         
         # Custom field labels
         field_labels = {
@@ -376,4 +400,26 @@ class HeartDiseasePredictionForm(forms.ModelForm):
                 field.label = field_labels[field_name]
             
             if field_name in field_help_texts:
-                field.help_text = field_help_texts[field_name]
\ No newline at end of file
+                field.help_text = field_help_texts[field_name]
+
+class RiskPanelForm(forms.Form):
+    """Patient and model selection for the combined risk panel; the inputs come from each model's form"""
+    patient = forms.ModelChoiceField(
+        queryset=Patient.objects.none(),
+        empty_label="Select a patient",
+        widget=forms.Select(attrs={'class': 'form-select form-select-lg', 'id': 'id_patient'})
+    )
+    models = forms.MultipleChoiceField(
+        label='Assessments',
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        doctor = kwargs.pop('doctor', None)
+        choices = kwargs.pop('models', [])
+        super().__init__(*args, **kwargs)
+        self.fields['models'].choices = list(choices)
+        self.fields['models'].initial = [code for code, _ in self.fields['models'].choices]
+        if doctor:
+            self.fields['patient'].queryset = Patient.objects.filter(doctor=doctor)
+        self.fields['patient'].label_from_instance = lambda obj: f"{obj.first_name} {obj.last_name} - {obj.email}"
@@ -0,0 +1,192 @@
+# inference_pool.py
+"""
+Optional process-pool inference backend.
+
+With ``PREDICTOR_INFERENCE_BACKEND = 'process'`` every probability pass runs
+in a small pool of dedicated worker processes that load the models once at
+start-up, so CPU-bound inference no longer holds the GIL of the process
+serving HTML. Submissions are bounded: at most ``PREDICTOR_INFERENCE_WORKERS
++ PREDICTOR_INFERENCE_QUEUE_DEPTH`` calls may be queued or running, and any
+call beyond that, or one that outlives ``PREDICTOR_INFERENCE_TIMEOUT``,
+raises InferenceUnavailable, which the views turn into a 503.
+
+The default 'inline' backend scores in the calling thread.
+"""
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .registry import registry
+from .timing import stage
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceUnavailable(Exception):
+    """Raised when the inference pool is saturated or a call times out"""
+
+
+def _init_worker():
+    import django
+    django.setup()
+    registry.preload()
+
+
+def _ping():
+    return True
+
+
+def _predict_in_worker(model_name, features):
+    loaded = registry.get(model_name)
+    return loaded.predict_proba(features), loaded.version, loaded.signature
+
+
+class InferencePool:
+    def __init__(self, workers=2, queue_depth=16, timeout=10):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._executor = None
+        self._lock = threading.Lock()
+
+        # {model name: (artifact signature, version)} last reported by a worker
+        self._served = {}
+
+        self.submitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: the workers must not inherit the server's threads or sockets
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_worker,
+                    )
+        return self._executor
+
+    def warm(self):
+        """Start every worker process and wait until their models are loaded"""
+        executor = self._get_executor()
+        for future in [executor.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def score(self, model_name, features):
+        """(probabilities, version of the model that produced them) from a worker"""
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise InferenceUnavailable('The prediction service is busy')
+        try:
+            future = self._get_executor().submit(_predict_in_worker, model_name, features)
+        except BrokenProcessPool as e:
+            self._slots.release()
+            self._reset()
+            logger.error(f"Inference pool is broken, restarting it: {str(e)}")
+            raise InferenceUnavailable('The prediction service is restarting')
+        except Exception:
+            self._slots.release()
+            raise
+        self.submitted += 1
+        # The slot is held until the work really finishes, even if we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            proba, version, signature = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.timed_out += 1
+            future.cancel()
+            raise InferenceUnavailable(f"Prediction for '{model_name}' timed out")
+        except BrokenProcessPool as e:
+            self._reset()
+            logger.error(f"Inference worker died: {str(e)}")
+            raise InferenceUnavailable('The prediction service is restarting')
+        self._served[model_name] = (signature, version)
+        return proba, version
+
+    def served_version(self, model_name):
+        """
+        Version the workers last scored ``model_name`` with, or None if the
+        artifact on disk has changed since (a worker may be about to reload it)
+        """
+        served = self._served.get(model_name)
+        if served is None or served[0] != registry.artifact_signature(model_name):
+            return None
+        return served[1]
+
+    def _reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        self._reset()
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'timeout_seconds': self.timeout,
+            'started': self._executor is not None,
+            'submitted': self.submitted,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+        }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = InferencePool(
+                    workers=getattr(settings, 'PREDICTOR_INFERENCE_WORKERS', 2),
+                    queue_depth=getattr(settings, 'PREDICTOR_INFERENCE_QUEUE_DEPTH', 16),
+                    timeout=getattr(settings, 'PREDICTOR_INFERENCE_TIMEOUT', 10),
+                )
+    return _pool
+
+
+def uses_process_pool():
+    return getattr(settings, 'PREDICTOR_INFERENCE_BACKEND', 'inline') == 'process'
+
+
+def score(model_name, features):
+    """
+    Probability matrix for ``features`` from the configured backend, with the
+    version of the model that produced it
+    """
+    if uses_process_pool():
+        return get_pool().score(model_name, features)
+    with stage('model_fetch'):
+        loaded = registry.get(model_name)
+    return loaded.predict_proba(features), loaded.version
+
+
+def model_version(model_name):
+    """
+    Version of the model that will score ``model_name``, or None when that is
+    not known. With the process backend the models live in the workers, so
+    this never loads one into the calling process.
+    """
+    if uses_process_pool():
+        return get_pool().served_version(model_name)
+    return registry.version(model_name)
+
+
+def stats():
+    if _pool is None:
+        return {'backend': getattr(settings, 'PREDICTOR_INFERENCE_BACKEND', 'inline')}
+    return dict(_pool.stats(), backend='process')
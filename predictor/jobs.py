@@ -0,0 +1,273 @@
+# jobs.py
+"""
+Database-backed queue for report PDFs and result emails.
+
+Views call ``enqueue_report`` and return straight away; ``manage.py
+run_report_jobs`` claims queued jobs, builds the PDF, stores it in media
+storage and sends the email. A failed attempt is retried with exponential
+backoff until ``max_attempts`` is reached. Progress is mirrored onto the
+report's ``pdf_status`` / ``email_status`` so the UI can poll it.
+
+A stored PDF is reused for as long as the digest of its inputs (the
+prediction row, patient and doctor names, layout version) still matches.
+
+Claiming is a conditional UPDATE (status='queued' -> 'running'), so several
+workers can share the table without double-processing a job on any backend.
+"""
+import hashlib
+import logging
+import os
+import random
+import socket
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import PredictionReport, ReportJob
+from .reports import REPORT_TYPES, save_pdf_to_media, source_digest
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def find_report(prediction_type, prediction):
+    """The report created alongside ``prediction``, creating one if it is missing"""
+    report = PredictionReport.objects.filter(
+        prediction_type=prediction_type,
+        prediction_id=prediction.id,
+    ).order_by('-created_at').first()
+    if report is None:
+        report = PredictionReport.objects.create(
+            patient=prediction.patient,
+            doctor=prediction.doctor,
+            prediction_type=prediction_type,
+            prediction_id=prediction.id,
+            prediction_data={
+                'prediction': prediction.prediction,
+                'confidence': prediction.confidence,
+                'prediction_id': prediction.id,
+            },
+        )
+    return report
+
+
+def load_prediction(report):
+    report_type = REPORT_TYPES[report.prediction_type]
+    return report_type.prediction_model.objects.select_related('patient', 'doctor').get(
+        id=report.prediction_id
+    )
+
+
+def enqueue_report(report):
+    """
+    Queue a PDF build (plus email, for report types that send one) for
+    ``report``. An unfinished job for the same report is reused, and so is one
+    that succeeded within PREDICTOR_REPORT_JOB_DEDUPE_SECONDS, so repeated
+    clicks do not send the email again.
+    """
+    recent = timezone.now() - timedelta(seconds=_setting('PREDICTOR_REPORT_JOB_DEDUPE_SECONDS', 300))
+    with transaction.atomic():
+        # Lock the report row so concurrent clicks cannot both create a job
+        PredictionReport.objects.select_for_update().filter(id=report.id).first()
+        job = (report.jobs
+               .filter(Q(status__in=['queued', 'running']) | Q(status='succeeded', finished_at__gte=recent))
+               .order_by('-created_at')
+               .first())
+        if job is not None:
+            return job
+
+        send_email = REPORT_TYPES[report.prediction_type].sends_email
+        job = ReportJob.objects.create(
+            report=report,
+            send_email=send_email,
+            max_attempts=_setting('PREDICTOR_REPORT_JOB_MAX_ATTEMPTS', 5),
+        )
+        report.pdf_status = 'queued'
+        report.email_status = 'queued' if send_email else 'none'
+        report.save(update_fields=['pdf_status', 'email_status'])
+
+    if _setting('PREDICTOR_REPORT_JOBS_EAGER', False):
+        # Claimed like any other job, so a worker polling the table cannot run it as well
+        claimed = claim(job.id)
+        if claimed is not None:
+            process_job(claimed)
+        job.refresh_from_db()
+    return job
+
+
+def claim(job_id, worker=None):
+    """Take the queued job ``job_id`` with a conditional UPDATE; None if someone else has it"""
+    claimed = ReportJob.objects.filter(id=job_id, status='queued').update(
+        status='running', locked_by=worker or worker_id(), locked_at=timezone.now(), attempts=F('attempts') + 1,
+    )
+    return ReportJob.objects.select_related('report').get(id=job_id) if claimed else None
+
+
+def claim_next(worker=None):
+    """Atomically take the oldest due job, or return None"""
+    worker = worker or worker_id()
+    candidates = (ReportJob.objects
+                  .filter(status='queued', run_after__lte=timezone.now())
+                  .order_by('run_after', 'id')
+                  .values_list('id', flat=True)[:10])
+    for job_id in candidates:
+        job = claim(job_id, worker)
+        if job is not None:
+            return job
+    return None
+
+
+def requeue_stale(stale_after=None):
+    """Put back jobs whose worker died mid-run"""
+    stale_after = stale_after or _setting('PREDICTOR_REPORT_JOB_STALE_SECONDS', 600)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return ReportJob.objects.filter(status='running', locked_at__lt=cutoff).update(
+        status='queued', locked_by='', locked_at=None, run_after=timezone.now(),
+    )
+
+
+def backoff_delay(attempts):
+    """Seconds to wait before the next attempt: exponential, capped, with jitter"""
+    base = _setting('PREDICTOR_REPORT_JOB_BACKOFF_SECONDS', 30)
+    cap = _setting('PREDICTOR_REPORT_JOB_MAX_BACKOFF_SECONDS', 3600)
+    delay = min(base * 2 ** max(attempts - 1, 0), cap)
+    return delay * random.uniform(1.0, 1.25)
+
+
+def doctor_name(prediction):
+    return prediction.doctor.get_full_name() or prediction.doctor.username
+
+
+def has_current_pdf(report, prediction):
+    """True when the stored PDF was built from the prediction as it is now"""
+    return bool(
+        report.pdf_file and report.pdf_source_digest
+        and report.pdf_source_digest == source_digest(report.prediction_type, prediction, doctor_name(prediction))
+        and default_storage.exists(report.pdf_file.name)
+    )
+
+
+def build_pdf(report, prediction):
+    """
+    The report's PDF bytes. The stored file is reused while the prediction
+    is unchanged; otherwise the PDF is rendered once and saved straight from
+    the rendered bytes.
+    """
+    report_type = REPORT_TYPES[report.prediction_type]
+    if has_current_pdf(report, prediction):
+        if report.pdf_status != 'ready':
+            report.pdf_status = 'ready'
+            report.save(update_fields=['pdf_status'])
+        with default_storage.open(report.pdf_file.name, 'rb') as f:
+            return f.read()
+
+    PredictionReport.objects.filter(id=report.id).update(pdf_status='running')
+    name = doctor_name(prediction)
+    pdf_bytes = report_type.generate_pdf(prediction, name).getvalue()
+
+    stale = report.pdf_file.name
+    report.pdf_file.name = save_pdf_to_media(pdf_bytes, report_type.filename(prediction), report_type.subfolder)
+    report.pdf_source_digest = source_digest(report.prediction_type, prediction, name)
+    report.pdf_sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+    report.pdf_generated_at = timezone.now()
+    report.pdf_generated = True
+    report.pdf_status = 'ready'
+    report.save(update_fields=['pdf_file', 'pdf_source_digest', 'pdf_sha256', 'pdf_generated_at',
+                               'pdf_generated', 'pdf_status'])
+    if stale and stale != report.pdf_file.name:
+        try:
+            default_storage.delete(stale)
+        except Exception as e:
+            logger.error(f"Could not delete outdated PDF {stale}: {str(e)}")
+    return pdf_bytes
+
+
+def _send_email(report, report_type, prediction, pdf_bytes):
+    if not prediction.patient.email:
+        report.email_status = 'skipped'
+        report.save(update_fields=['email_status'])
+        return
+
+    email = EmailMessage(
+        subject=report_type.email_subject(prediction),
+        body=report_type.email_html(prediction, doctor_name(prediction)),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[prediction.patient.email],
+    )
+    email.content_subtype = "html"
+    email.attach(os.path.basename(report.pdf_file.name), pdf_bytes, 'application/pdf')
+    email.send()
+
+    report.email_sent = True
+    report.email_status = 'sent'
+    report.save(update_fields=['email_sent', 'email_status'])
+
+
+def process_job(job):
+    """Run one claimed job; failures are recorded and rescheduled"""
+    report = job.report
+    report_type = REPORT_TYPES[report.prediction_type]
+    try:
+        prediction = load_prediction(report)
+        pdf_bytes = build_pdf(report, prediction)
+        if job.send_email:
+            _send_email(report, report_type, prediction, pdf_bytes)
+    except Exception as e:
+        logger.error(f"Report job {job.id} attempt {job.attempts} failed: {str(e)}")
+        _record_failure(job, report, e)
+        return False
+
+    job.status = 'succeeded'
+    job.last_error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'last_error', 'finished_at', 'updated_at'])
+    return True
+
+
+def _record_failure(job, report, error):
+    job.last_error = f'{type(error).__name__}: {error}'
+    if job.attempts >= job.max_attempts:
+        job.status = 'failed'
+        job.finished_at = timezone.now()
+        report.refresh_from_db(fields=['pdf_status', 'email_status'])
+        if report.pdf_status != 'ready':
+            report.pdf_status = 'failed'
+        if report.email_status == 'queued':
+            report.email_status = 'failed'
+        report.save(update_fields=['pdf_status', 'email_status'])
+    else:
+        job.status = 'queued'
+        job.run_after = timezone.now() + timedelta(seconds=backoff_delay(job.attempts))
+        PredictionReport.objects.filter(id=report.id, pdf_status='running').update(pdf_status='queued')
+    job.locked_by = ''
+    job.locked_at = None
+    job.save(update_fields=['status', 'last_error', 'finished_at', 'run_after',
+                            'locked_by', 'locked_at', 'updated_at'])
+
+
+def job_status(job):
+    """JSON-friendly progress for the polling endpoint"""
+    report = job.report
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'next_attempt_at': job.run_after.isoformat() if job.status == 'queued' else None,
+        'last_error': job.last_error or None,
+        'report_id': report.id,
+        'pdf_status': report.pdf_status,
+        'email_status': report.email_status,
+    }
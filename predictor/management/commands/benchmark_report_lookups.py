@@ -0,0 +1,74 @@
+import random
+import time
+import uuid
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.models import Patient
+from predictor.models import PredictionReport
+
+PREDICTION_TYPES = [code for code, _ in PredictionReport.PREDICTION_TYPES]
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Time report lookups by prediction_data JSON path against the indexed prediction_id '
+            'on synthetic reports; everything is created inside a transaction that is rolled back')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reports', type=int, default=1_000_000)
+        parser.add_argument('--lookups', type=int, default=100)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.benchmark(options)
+                raise Rollback
+        except Rollback:
+            self.stdout.write('Synthetic reports rolled back')
+
+    def benchmark(self, options):
+        doctor = get_user_model().objects.create(username=f'benchmark-{uuid.uuid4().hex[:12]}')
+        patient = Patient.objects.create(
+            doctor=doctor, first_name='Benchmark', last_name='Patient', date_of_birth=date(1970, 1, 1),
+            gender='O', contact_number='0', address='-',
+        )
+
+        count = options['reports']
+        started = time.perf_counter()
+        for offset in range(0, count, options['batch_size']):
+            PredictionReport.objects.bulk_create([
+                PredictionReport(
+                    patient=patient, doctor=doctor,
+                    prediction_type=PREDICTION_TYPES[i % len(PREDICTION_TYPES)],
+                    prediction_id=i // len(PREDICTION_TYPES) + 1,
+                    prediction_data={'prediction': 'Benchmark', 'confidence': 50.0,
+                                     'prediction_id': i // len(PREDICTION_TYPES) + 1},
+                )
+                for i in range(offset, min(offset + options['batch_size'], count))
+            ], batch_size=options['batch_size'])
+        self.stdout.write(f"Inserted {count} reports in {time.perf_counter() - started:.1f}s")
+
+        targets = [
+            (random.choice(PREDICTION_TYPES), random.randint(1, max(count // len(PREDICTION_TYPES), 1)))
+            for _ in range(options['lookups'])
+        ]
+        lookups = {
+            'json path': lambda t, i: PredictionReport.objects.filter(
+                prediction_type=t, prediction_data__prediction_id=i),
+            'indexed': lambda t, i: PredictionReport.objects.filter(prediction_type=t, prediction_id=i),
+        }
+        for label, lookup in lookups.items():
+            self.stdout.write(f"{label} plan: {lookup(*targets[0]).explain()}")
+            started = time.perf_counter()
+            for prediction_type, prediction_id in targets:
+                lookup(prediction_type, prediction_id).order_by('-created_at').first()
+            elapsed = (time.perf_counter() - started) / len(targets) * 1000
+            self.stdout.write(self.style.SUCCESS(f"{label}: {elapsed:.3f} ms per lookup"))
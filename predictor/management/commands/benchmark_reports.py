@@ -0,0 +1,63 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from predictor.models import Patient
+from predictor.report_templates import TEMPLATES
+from predictor.reports import REPORT_TYPES
+
+# Favourable / unfavourable outcome and the extra fields each report prints
+SAMPLES = {
+    'breast_cancer': (('Benign', 'Malignant'), {}),
+    'liver_disease': (('No Disease', 'Disease'), {'age': 45, 'gender': 'Female'}),
+    'diabetes': (('No Diabetes', 'Diabetes'), {'age': 45, 'bmi': 27.4}),
+    'heart_disease': (('No Heart Disease', 'Heart Disease'), {'age': 45, 'sex': 1, 'thalach': 150, 'chol': 230}),
+}
+
+
+def sample_predictions(prediction_type):
+    """One unsaved prediction per outcome; nothing touches the database"""
+    outcomes, fields = SAMPLES[prediction_type]
+    patient = Patient(id=1, first_name='Benchmark', last_name='Patient')
+    model = REPORT_TYPES[prediction_type].prediction_model
+    return [
+        model(id=i + 1, patient=patient, prediction=outcome, confidence=87.5,
+              created_at=timezone.now(), **fields)
+        for i, outcome in enumerate(outcomes)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Measure report PDF throughput with cold (rebuilt per PDF) and cached report templates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('types', nargs='*', help='Report types to benchmark (default: all)')
+        parser.add_argument('--count', type=int, default=100, help='PDFs to build per type and mode')
+
+    def handle(self, *args, **options):
+        types = options['types'] or list(REPORT_TYPES)
+        unknown = set(types) - set(REPORT_TYPES)
+        if unknown:
+            raise CommandError(f"Unknown report types: {', '.join(sorted(unknown))}")
+
+        for prediction_type in types:
+            template = TEMPLATES[prediction_type]
+            generate = REPORT_TYPES[prediction_type].generate_pdf
+            predictions = sample_predictions(prediction_type)
+
+            rates = {}
+            for mode in ('cold', 'cached'):
+                template.clear()
+                generate(predictions[0], 'Benchmark')  # imports and font loading are not what we measure
+                started = time.perf_counter()
+                for i in range(options['count']):
+                    if mode == 'cold':
+                        template.clear()
+                    generate(predictions[i % len(predictions)], 'Benchmark')
+                rates[mode] = options['count'] / (time.perf_counter() - started)
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{prediction_type}: cold {rates['cold']:.1f} PDFs/s, cached {rates['cached']:.1f} PDFs/s "
+                f"({rates['cached'] / rates['cold']:.2f}x)"
+            ))
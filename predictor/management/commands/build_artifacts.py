@@ -0,0 +1,98 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.artifacts import ModelArtifact
+from predictor.compiled import compile_model, parity_error
+from predictor.pipeline import PIPELINES
+from predictor.registry import candidates, registry
+
+
+class Command(BaseCommand):
+    help = 'Bundle each legacy model pickle into a versioned, memory-mappable artifact'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='Models to build (default: all)')
+        parser.add_argument('--model-version', help='Version string to record (default: content hash)')
+        parser.add_argument('--tolerance', type=float, default=1e-5)
+        parser.add_argument('--candidate', action='store_true',
+                            help='Write <name>.candidate.artifact.joblib for shadow evaluation instead')
+        parser.add_argument('--model-path',
+                            help="Pickle to build from instead of the live one (required with --candidate)")
+        parser.add_argument('--scaler-path',
+                            help="Scaler pickle to go with --model-path (default: the live model's)")
+
+    def handle(self, *args, **options):
+        names = options['models'] or list(registry.specs)
+        unknown = set(names) - set(registry.specs)
+        if unknown:
+            raise CommandError(f"Unknown models: {', '.join(sorted(unknown))}")
+        if options['candidate'] and not options['model_path']:
+            # The live pickle would just give a copy of the primary model
+            raise CommandError('--candidate needs --model-path pointing at the retrained model')
+        if options['model_path'] and len(names) != 1:
+            raise CommandError('--model-path builds exactly one model; name it')
+        if options['scaler_path'] and not options['model_path']:
+            raise CommandError('--scaler-path is only used with --model-path')
+        if options['model_path'] and not os.path.exists(options['model_path']):
+            raise CommandError(f"No such file: {options['model_path']}")
+        pipelines = {pipeline.model_name: pipeline for pipeline in PIPELINES.values()}
+
+        built = 0
+        for name in names:
+            try:
+                loaded = registry.load_legacy(name, options['model_path'], options['scaler_path'])
+            except Exception as e:
+                self.stderr.write(f"{name}: skipped ({e})")
+                continue
+
+            feature_names = pipelines[name].feature_names
+            metadata = {
+                'source': os.path.relpath(loaded.path, registry.model_path(name).rsplit('ml_models', 1)[0]),
+                'model_class': type(loaded.model).__name__,
+            }
+            trained_names = getattr(loaded.model, 'feature_names_in_', None)
+            if trained_names is not None:
+                trained_names = [str(n) for n in trained_names]
+                metadata['trained_feature_names'] = trained_names
+                if [n.replace(' ', '_') for n in trained_names] != feature_names:
+                    self.stderr.write(self.style.WARNING(
+                        f"{name}: model was fitted on columns {trained_names}, "
+                        f"but the pipeline encodes {feature_names}"
+                    ))
+
+            try:
+                compiled = compile_model(loaded.model)
+            except TypeError:
+                compiled = None
+            if compiled is not None:
+                max_diff = parity_error(loaded.model, compiled)
+                if max_diff > options['tolerance']:
+                    raise CommandError(f"{name}: compiled evaluator differs by {max_diff:.2e}")
+
+            artifact = ModelArtifact(
+                name=name,
+                model=loaded.model,
+                scaler=loaded.scaler,
+                compiled=compiled,
+                feature_names=feature_names,
+                dtype='float32',
+                version=options['model_version'] or loaded.version,
+                metadata=metadata,
+            )
+            path = (candidates if options['candidate'] else registry).artifact_path(name)
+            artifact.save(path)
+
+            started = time.perf_counter()
+            ModelArtifact.load(path)
+            load_ms = (time.perf_counter() - started) * 1000
+            built += 1
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: wrote {path} (version {artifact.version}, "
+                f"{os.path.getsize(path)} bytes, loads in {load_ms:.1f} ms)"
+            ))
+
+        registry.unload()
+        if not built:
+            raise CommandError('No artifacts were built')
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.compiled import compile_model, parity_error
+from predictor.registry import registry, file_digest
+
+
+class Command(BaseCommand):
+    help = 'Flatten the tree-ensemble models into NumPy arrays and verify them against the originals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='Models to compile (default: all)')
+        parser.add_argument('--check', action='store_true',
+                            help='Only verify existing compiled files, do not write anything')
+        parser.add_argument('--samples', type=int, default=2000)
+        parser.add_argument('--tolerance', type=float, default=1e-5)
+
+    def handle(self, *args, **options):
+        names = options['models'] or list(registry.specs)
+        unknown = set(names) - set(registry.specs)
+        if unknown:
+            raise CommandError(f"Unknown models: {', '.join(sorted(unknown))}")
+
+        failures = []
+        for name in names:
+            try:
+                loaded = registry.get(name)
+            except Exception as e:
+                self.stderr.write(f"{name}: skipped ({e})")
+                continue
+
+            if options['check']:
+                compiled = loaded.compiled
+                if compiled is None:
+                    self.stderr.write(f"{name}: no compiled model loaded")
+                    failures.append(name)
+                    continue
+            else:
+                try:
+                    compiled = compile_model(loaded.model)
+                except TypeError as e:
+                    self.stderr.write(f"{name}: skipped ({e})")
+                    continue
+
+            # Compare on the model's own (already scaled) input space
+            max_diff = parity_error(loaded.model, compiled, options['samples'])
+            if max_diff > options['tolerance']:
+                self.stderr.write(f"{name}: parity check failed, max difference {max_diff:.2e}")
+                failures.append(name)
+                continue
+
+            if not options['check']:
+                compiled.source_digest = file_digest(registry.model_path(name))
+                path = registry.compiled_path(name)
+                compiled.save(path)
+                self.stdout.write(f"{name}: wrote {path}")
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {compiled.n_trees} trees, {compiled.nbytes} bytes, max difference {max_diff:.2e}"
+            ))
+
+        if failures:
+            raise CommandError(f"Parity check failed for: {', '.join(failures)}")
+        if not options['check']:
+            registry.unload()
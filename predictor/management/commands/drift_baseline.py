@@ -0,0 +1,55 @@
+import csv
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.drift import build_baseline
+from predictor.pipeline import PIPELINES
+
+
+class Command(BaseCommand):
+    help = ('Bin a reference sample of each model\'s inputs as the baseline that live feature '
+            'drift is measured against (a training CSV, or the predictions stored so far)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='Prediction types (default: all)')
+        parser.add_argument('--csv', help='CSV with one column per input field; requires a single model')
+        parser.add_argument('--bins', type=int, default=getattr(settings, 'PREDICTOR_DRIFT_BINS', 10))
+        parser.add_argument('--min-rows', type=int, default=100)
+
+    def handle(self, *args, **options):
+        names = options['models'] or list(PIPELINES)
+        unknown = set(names) - set(PIPELINES)
+        if unknown:
+            raise CommandError(f"Unknown models: {', '.join(sorted(unknown))}")
+        if options['csv'] and len(names) != 1:
+            raise CommandError('--csv needs exactly one model')
+
+        built = 0
+        for name in names:
+            pipeline = PIPELINES[name]
+            if options['csv']:
+                with open(options['csv'], newline='') as f:
+                    rows = list(csv.DictReader(f))
+                source = options['csv']
+            else:
+                rows = list(pipeline.prediction_model.objects.values(*pipeline.fields))
+                source = f'{pipeline.prediction_model._meta.db_table} ({len(rows)} predictions)'
+
+            if len(rows) < options['min_rows']:
+                self.stderr.write(f"{name}: skipped, {len(rows)} rows is below --min-rows {options['min_rows']}")
+                continue
+            try:
+                sample = pipeline.encode(rows)
+            except (KeyError, ValueError) as e:
+                raise CommandError(f"{name}: could not read the sample: {e}")
+
+            baseline = build_baseline(name, pipeline.feature_names, sample, options['bins'], source=source)
+            built += 1
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: baseline from {baseline.sample_size} rows, "
+                f"{sum(len(e) + 1 for e in baseline.edges)} bins over {len(baseline.edges)} features"
+            ))
+
+        if not built:
+            raise CommandError('No baselines were built')
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from predictor.jobs import claim_next, process_job, requeue_stale, worker_id
+
+
+class Command(BaseCommand):
+    help = 'Process queued report PDF/email jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Process every due job and exit instead of polling')
+        parser.add_argument('--poll-interval', type=float, default=2.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--max-jobs', type=int, default=0,
+                            help='Exit after this many jobs (0 = no limit)')
+
+    def handle(self, *args, **options):
+        worker = worker_id()
+        processed = 0
+        self.stdout.write(f"Report worker {worker} started")
+
+        while True:
+            requeued = requeue_stale()
+            if requeued:
+                self.stderr.write(f"Requeued {requeued} stale job(s)")
+
+            job = claim_next(worker)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            ok = process_job(job)
+            processed += 1
+            job.refresh_from_db()
+            line = f"Job {job.id} (report {job.report_id}): {job.status}, attempt {job.attempts}/{job.max_attempts}"
+            self.stdout.write(self.style.SUCCESS(line) if ok else self.style.WARNING(line))
+
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+
+        self.stdout.write(f"Processed {processed} job(s)")
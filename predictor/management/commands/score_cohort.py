@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from predictor.cohort import score_cohort
+from predictor.pipeline import PIPELINES
+
+
+class Command(BaseCommand):
+    help = ("Rescore every patient's latest inputs with one predict_proba call per model and "
+            "refresh the PatientRiskSnapshot rows shown on the dashboard (run nightly)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('models', nargs='*', help='Prediction types (default: all)')
+        parser.add_argument('--doctor', type=int, help='Only the patients of this doctor (user id)')
+
+    def handle(self, *args, **options):
+        unknown = set(options['models']) - set(PIPELINES)
+        if unknown:
+            raise CommandError(f"Unknown models: {', '.join(sorted(unknown))}")
+
+        results = score_cohort(options['models'] or None, doctor_id=options['doctor'])
+        for result in results:
+            if 'error' in result:
+                self.stderr.write(f"{result['model']}: failed ({result['error']})")
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{result['model']}: scored {result['patients']} patient(s) with version "
+                    f"{result['version']} in {result['seconds']}s, removed {result['removed']} stale"
+                ))
+        if all('error' in result for result in results):
+            raise CommandError('No model could be scored')
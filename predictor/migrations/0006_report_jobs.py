@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_appointment'),
+        ('predictor', '0005_heartdiseaseprediction'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('send_email', models.BooleanField(default=False)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='predictionreport',
+            name='email_status',
+            field=models.CharField(choices=[('none', 'Not requested'), ('queued', 'Queued'), ('sent', 'Sent'), ('skipped', 'No email address'), ('failed', 'Failed')], default='none', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='predictionreport',
+            name='pdf_status',
+            field=models.CharField(choices=[('none', 'Not generated'), ('queued', 'Queued'), ('running', 'Generating'), ('ready', 'Ready'), ('failed', 'Failed')], default='none', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='predictionreport',
+            name='prediction_type',
+            field=models.CharField(choices=[('breast_cancer', 'Breast Cancer'), ('heart_disease', 'Heart Disease'), ('diabetes', 'Diabetes'), ('liver_disease', 'Liver Disease')], max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='breastcancerprediction',
+            index=models.Index(fields=['created_at'], name='predictor_b_created_d433e1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='breastcancerprediction',
+            index=models.Index(fields=['prediction'], name='predictor_b_predict_5b64dd_idx'),
+        ),
+        migrations.AddField(
+            model_name='reportjob',
+            name='report',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to='predictor.predictionreport'),
+        ),
+        migrations.AddIndex(
+            model_name='reportjob',
+            index=models.Index(fields=['status', 'run_after'], name='predictor_r_status_05e0c2_idx'),
+        ),
+    ]
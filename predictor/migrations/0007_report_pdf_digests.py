@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictor', '0006_report_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionreport',
+            name='pdf_generated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='predictionreport',
+            name='pdf_sha256',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='predictionreport',
+            name='pdf_source_digest',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_appointment'),
+        ('predictor', '0007_report_pdf_digests'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='predictionreport',
+            name='prediction_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='predictionreport',
+            index=models.Index(fields=['prediction_type', 'prediction_id'], name='predictor_p_predict_8aae38_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+import json
+
+from django.db import migrations
+
+BATCH_SIZE = 2000
+
+
+def backfill_prediction_id(apps, schema_editor):
+    """
+    Copy prediction_data['prediction_id'] into the indexed column. Breast
+    cancer reports used to store prediction_data as a JSON-encoded string;
+    those are decoded and stored as the object they describe.
+    """
+    PredictionReport = apps.get_model('predictor', 'PredictionReport')
+    pending = (PredictionReport.objects
+               .filter(prediction_id__isnull=True)
+               .only('id', 'prediction_data')
+               .order_by('id'))
+
+    batch = []
+    for report in pending.iterator(chunk_size=BATCH_SIZE):
+        data = report.prediction_data
+        if isinstance(data, str):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                continue
+            report.prediction_data = data
+        if not isinstance(data, dict):
+            continue
+        try:
+            report.prediction_id = int(data['prediction_id'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        batch.append(report)
+        if len(batch) >= BATCH_SIZE:
+            PredictionReport.objects.bulk_update(batch, ['prediction_id', 'prediction_data'])
+            batch = []
+    if batch:
+        PredictionReport.objects.bulk_update(batch, ['prediction_id', 'prediction_data'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictor', '0008_report_prediction_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_prediction_id, migrations.RunPython.noop),
+    ]
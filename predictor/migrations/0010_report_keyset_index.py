@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:08
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_appointment'),
+        ('predictor', '0009_backfill_report_prediction_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='predictionreport',
+            index=models.Index(fields=['doctor', 'created_at', 'id'], name='predictor_p_doctor__cb71c8_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictor', '0011_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShadowEvaluation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50)),
+                ('primary_version', models.CharField(max_length=64)),
+                ('candidate_version', models.CharField(max_length=64)),
+                ('calls', models.PositiveIntegerField(default=0)),
+                ('comparisons', models.PositiveIntegerField(default=0)),
+                ('agreements', models.PositiveIntegerField(default=0)),
+                ('abs_delta_sum', models.FloatField(default=0)),
+                ('abs_delta_max', models.FloatField(default=0)),
+                ('primary_ms_sum', models.FloatField(default=0)),
+                ('candidate_ms_sum', models.FloatField(default=0)),
+                ('candidate_ms_max', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('model_name', 'primary_version', 'candidate_version'), name='unique_shadow_pair')],
+            },
+        ),
+    ]
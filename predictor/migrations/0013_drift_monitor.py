@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('predictor', '0012_shadow_evaluation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriftBaseline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50, unique=True)),
+                ('feature_names', models.JSONField()),
+                ('edges', models.JSONField()),
+                ('counts', models.JSONField()),
+                ('sample_size', models.PositiveIntegerField()),
+                ('source', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='FeatureHistogram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('observations', models.PositiveIntegerField(default=0)),
+                ('counts', models.JSONField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('baseline', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='histograms', to='predictor.driftbaseline')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('baseline', 'day'), name='unique_histogram_day')],
+            },
+        ),
+    ]
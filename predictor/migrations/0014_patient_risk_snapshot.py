@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_appointment'),
+        ('predictor', '0013_drift_monitor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatientRiskSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(choices=[('breast_cancer', 'Breast Cancer'), ('heart_disease', 'Heart Disease'), ('diabetes', 'Diabetes'), ('liver_disease', 'Liver Disease')], max_length=50)),
+                ('prediction_id', models.PositiveIntegerField()),
+                ('label', models.CharField(max_length=20)),
+                ('is_positive', models.BooleanField()),
+                ('probability', models.FloatField()),
+                ('model_version', models.CharField(blank=True, default='', max_length=64)),
+                ('scored_at', models.DateTimeField()),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='risk_snapshots', to='accounts.patient')),
+            ],
+            options={
+                'ordering': ['model_name'],
+                'indexes': [models.Index(fields=['doctor', 'model_name'], name='predictor_p_doctor__ad059f_idx')],
+                'constraints': [models.UniqueConstraint(fields=('patient', 'model_name'), name='unique_patient_risk')],
+            },
+        ),
+    ]
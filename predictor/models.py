@@ -1,6 +1,7 @@
 # models.py
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 import json
 from accounts.models import Patient
 import os
@@ -54,6 +55,8 @@ class BreastCancerPrediction(models.Model):
     # Prediction results
     prediction = models.CharField(max_length=20)  # 'Benign' or 'Malignant'
     confidence = models.FloatField()
+    # Version of the model artifact that produced the prediction
+    model_version = models.CharField(max_length=64, blank=True, default='')
     
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -115,6 +118,8 @@ class LiverDiseasePrediction(models.Model):
     # Prediction results
     prediction = models.CharField(max_length=20)  # 'No Disease' or 'Disease'
     confidence = models.FloatField()
+    # Version of the model artifact that produced the prediction
+    model_version = models.CharField(max_length=64, blank=True, default='')
     
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -145,20 +150,85 @@ class PredictionReport(models.Model):
         ('breast_cancer', 'Breast Cancer'),
         ('heart_disease', 'Heart Disease'),
         ('diabetes', 'Diabetes'),
+        ('liver_disease', 'Liver Disease'),
         # Add more as needed
     ]
+    PDF_STATUSES = [
+        ('none', 'Not generated'),
+        ('queued', 'Queued'),
+        ('running', 'Generating'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    EMAIL_STATUSES = [
+        ('none', 'Not requested'),
+        ('queued', 'Queued'),
+        ('sent', 'Sent'),
+        ('skipped', 'No email address'),
+        ('failed', 'Failed'),
+    ]
     
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='prediction_reports')
     doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     prediction_type = models.CharField(max_length=50, choices=PREDICTION_TYPES)
     prediction_data = models.JSONField()  # Store prediction details
+    # Row of the prediction model for prediction_type (also in prediction_data, but indexed here)
+    prediction_id = models.PositiveIntegerField(null=True, blank=True)
+    model_version = models.CharField(max_length=64, blank=True, default='')
     pdf_generated = models.BooleanField(default=False)
     email_sent = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     pdf_file=models.FileField(upload_to='reports/',blank=True,null=True)
+    # Progress of the background report job (see ReportJob)
+    pdf_status = models.CharField(max_length=10, choices=PDF_STATUSES, default='none')
+    email_status = models.CharField(max_length=10, choices=EMAIL_STATUSES, default='none')
+    # Digest of the inputs the stored PDF was built from (reused while they match),
+    # and of the PDF itself (served as the download ETag)
+    pdf_source_digest = models.CharField(max_length=64, blank=True, default='')
+    pdf_sha256 = models.CharField(max_length=64, blank=True, default='')
+    pdf_generated_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['prediction_type', 'prediction_id']),
+            # Keyset pagination of a doctor's reports, newest first
+            models.Index(fields=['doctor', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.patient} - {self.prediction_type} - {self.created_at.date()}"
+
+
+class ReportJob(models.Model):
+    """A queued PDF build (and optional email) for one PredictionReport"""
+    STATUSES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    report = models.ForeignKey(PredictionReport, on_delete=models.CASCADE, related_name='jobs')
+    send_email = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=STATUSES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # Not picked up before this time; pushed back after each failed attempt
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"Report job {self.id} ({self.status}) for report {self.report_id}"
     
     # Add this to your existing models.py
 
@@ -179,6 +249,8 @@ class DiabetesPrediction(models.Model):
     # Prediction results
     prediction = models.CharField(max_length=20)  # 'No Diabetes' or 'Diabetes'
     confidence = models.FloatField()
+    # Version of the model artifact that produced the prediction
+    model_version = models.CharField(max_length=64, blank=True, default='')
     
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -222,6 +294,8 @@ class HeartDiseasePrediction(models.Model):
     # Prediction results
     prediction = models.CharField(max_length=20)  # 'No Heart Disease' or 'Heart Disease'
     confidence = models.FloatField()
+    # Version of the model artifact that produced the prediction
+    model_version = models.CharField(max_length=64, blank=True, default='')
     
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -244,4 +318,106 @@ class HeartDiseasePrediction(models.Model):
             'slope': self.slope,
             'ca': self.ca,
             'thal': self.thal,
-        }
\ No newline at end of file
+        }
+
+class ShadowEvaluation(models.Model):
+    """Running comparison of a candidate model against the live one (see shadow.py)"""
+    model_name = models.CharField(max_length=50)
+    primary_version = models.CharField(max_length=64)
+    candidate_version = models.CharField(max_length=64)
+    # Scoring calls compared (a batch is one call) and the rows they held
+    calls = models.PositiveIntegerField(default=0)
+    comparisons = models.PositiveIntegerField(default=0)
+    # Rows where both models reached the same decision
+    agreements = models.PositiveIntegerField(default=0)
+    # Absolute difference in positive-class probability
+    abs_delta_sum = models.FloatField(default=0)
+    abs_delta_max = models.FloatField(default=0)
+    # Latency per call
+    primary_ms_sum = models.FloatField(default=0)
+    candidate_ms_sum = models.FloatField(default=0)
+    candidate_ms_max = models.FloatField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model_name', 'primary_version', 'candidate_version'],
+                                    name='unique_shadow_pair'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name}: {self.primary_version} vs {self.candidate_version}"
+
+    def summary(self):
+        n, calls = self.comparisons, self.calls
+        return {
+            'model': self.model_name,
+            'primary_version': self.primary_version,
+            'candidate_version': self.candidate_version,
+            'calls': calls,
+            'comparisons': n,
+            'agreement_rate': round(self.agreements / n, 4) if n else None,
+            'mean_abs_delta': round(self.abs_delta_sum / n, 6) if n else None,
+            'max_abs_delta': round(self.abs_delta_max, 6),
+            'primary_mean_ms': round(self.primary_ms_sum / calls, 3) if calls else None,
+            'candidate_mean_ms': round(self.candidate_ms_sum / calls, 3) if calls else None,
+            'candidate_max_ms': round(self.candidate_ms_max, 3),
+            'updated_at': self.updated_at.isoformat(),
+        }
+
+
+class DriftBaseline(models.Model):
+    """Reference feature distribution of a model, binned (see drift.py)"""
+    model_name = models.CharField(max_length=50, unique=True)
+    feature_names = models.JSONField()
+    # Per feature, the interior bin edges (ascending)
+    edges = models.JSONField()
+    # Per feature, the reference count in each bin (len(edges) + 1 values)
+    counts = models.JSONField()
+    sample_size = models.PositiveIntegerField()
+    source = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Drift baseline for {self.model_name} ({self.sample_size} rows)"
+
+
+class FeatureHistogram(models.Model):
+    """Live feature counts for one baseline and day, in the baseline's bins"""
+    baseline = models.ForeignKey(DriftBaseline, on_delete=models.CASCADE, related_name='histograms')
+    day = models.DateField()
+    observations = models.PositiveIntegerField(default=0)
+    counts = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['baseline', 'day'], name='unique_histogram_day'),
+        ]
+
+
+class PatientRiskSnapshot(models.Model):
+    """Latest batch-scored risk of one patient for one model (see cohort.py)"""
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='risk_snapshots')
+    doctor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    model_name = models.CharField(max_length=50, choices=PredictionReport.PREDICTION_TYPES)
+    # Prediction row whose inputs were rescored
+    prediction_id = models.PositiveIntegerField()
+    label = models.CharField(max_length=20)
+    is_positive = models.BooleanField()
+    probability = models.FloatField()
+    model_version = models.CharField(max_length=64, blank=True, default='')
+    scored_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['model_name']
+        constraints = [
+            models.UniqueConstraint(fields=['patient', 'model_name'], name='unique_patient_risk'),
+        ]
+        indexes = [
+            models.Index(fields=['doctor', 'model_name']),
+        ]
+
+    def __str__(self):
+        return f"{self.patient} - {self.model_name}: {self.label} ({self.probability:.0%})"
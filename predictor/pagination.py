@@ -0,0 +1,100 @@
+# pagination.py
+"""
+Keyset (cursor) pagination for newest-first lists.
+
+OFFSET pagination makes the database walk past every earlier row, so deep
+pages slow down as a doctor's report count grows. A KeysetPage instead
+remembers the (created_at, id) of its first and last rows and fetches the
+neighbouring page with a range condition the composite index can answer
+directly. Cursors are opaque URL-safe strings.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+def encode_parts(*parts):
+    raw = '|'.join(str(part) for part in parts)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_parts(cursor, count):
+    """The ``count`` string parts of a cursor, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        parts = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode().split('|')
+    except ValueError:
+        return None
+    return parts if len(parts) == count else None
+
+
+def encode_cursor(obj):
+    return encode_parts(obj.created_at.isoformat(), obj.pk)
+
+
+def decode_cursor(cursor):
+    """(created_at, id) from a cursor, or None if it is missing or malformed"""
+    parts = decode_parts(cursor, 2)
+    if parts is None:
+        return None
+    try:
+        return datetime.fromisoformat(parts[0]), int(parts[1])
+    except ValueError:
+        return None
+
+
+class KeysetPage:
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.object_list[-1]) if self.has_next else None
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.object_list[0]) if self.has_previous else None
+
+
+def keyset_page(queryset, per_page, after=None, before=None):
+    """
+    One page of ``queryset`` ordered newest first by (created_at, id).
+    ``after`` continues past the last row of a page, ``before`` goes back
+    from its first row; with neither the newest page is returned.
+    """
+    after, before = decode_cursor(after), decode_cursor(before)
+
+    if before is not None:
+        created_at, pk = before
+        # The plain bound on created_at lets the index seek; the Q settles ties
+        rows = list(queryset
+                    .filter(created_at__gte=created_at)
+                    .filter(Q(created_at__gt=created_at) | Q(pk__gt=pk))
+                    .order_by('created_at', 'pk')[:per_page + 1])
+        has_previous = len(rows) > per_page
+        return KeysetPage(rows[:per_page][::-1], has_next=True, has_previous=has_previous)
+
+    if after is not None:
+        created_at, pk = after
+        queryset = (queryset
+                    .filter(created_at__lte=created_at)
+                    .filter(Q(created_at__lt=created_at) | Q(pk__lt=pk)))
+    rows = list(queryset.order_by('-created_at', '-pk')[:per_page + 1])
+    return KeysetPage(rows[:per_page], has_next=len(rows) > per_page, has_previous=after is not None)
@@ -0,0 +1,190 @@
+# panel.py
+"""
+Combined risk panel: one set of inputs, several models.
+
+The panel form asks for the union of the panel models' inputs once (age is
+shared, and the liver model's gender is taken from the heart model's sex).
+Each selected model's own prediction form validates its share of the
+submission, so the ranges and choices are exactly those of the single-model
+pages.
+
+The models are then scored concurrently on a small thread pool
+(PREDICTOR_PANEL_WORKERS): the compiled evaluators spend most of their
+time in NumPy, which releases the GIL, and with the process backend each
+thread just waits on its worker. Each task runs in a copy of the request's
+context, so stage timings and deferred shadow work still belong to the
+request. The predictions that succeeded and their
+reports are saved in a single transaction. A model that fails is reported
+as such and the others are still saved.
+"""
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.urls import reverse
+
+from .forms import DiabetesPredictionForm, HeartDiseasePredictionForm, LiverDiseasePredictionForm
+from .inference_pool import InferenceUnavailable
+from .models import PredictionReport
+from .pipeline import PIPELINES
+from .reports import REPORT_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Screening models whose inputs come from routine vitals and blood work, in display order
+PANEL_FORMS = {
+    'diabetes': DiabetesPredictionForm,
+    'heart_disease': HeartDiseasePredictionForm,
+    'liver_disease': LiverDiseasePredictionForm,
+}
+
+PANEL_LABELS = {code: label for code, label in PredictionReport.PREDICTION_TYPES if code in PANEL_FORMS}
+
+# Inputs filled in from another panel input: {field: (source field, conversion)}
+DERIVED_INPUTS = {
+    'gender': ('sex', lambda sex: {'1': 'Male', '0': 'Female'}.get(sex)),
+}
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=getattr(settings, 'PREDICTOR_PANEL_WORKERS', 3),
+                                       thread_name_prefix='panel')
+    return _executor
+
+
+def panel_data(data):
+    """Submitted panel inputs with the derived inputs filled in"""
+    data = data.copy()
+    for field, (source, convert) in DERIVED_INPUTS.items():
+        if not data.get(field) and data.get(source) is not None:
+            value = convert(data.get(source))
+            if value is not None:
+                data[field] = value
+    return data
+
+
+def model_forms(doctor, data=None, selected=()):
+    """
+    The prediction form of every panel model. Forms of the ``selected``
+    models are bound to ``data``; the others only show it as initial values.
+    Inputs are not marked required in the browser, since a model can be
+    unticked; the bound forms still require them on the server.
+    """
+    forms = {}
+    for name, form_class in PANEL_FORMS.items():
+        kwargs = {'doctor': doctor} if 'patient' in form_class.base_fields else {}
+        kwargs['use_required_attribute'] = False
+        if data is not None and name in selected:
+            forms[name] = form_class(data=data, **kwargs)
+        else:
+            forms[name] = form_class(initial=data.dict() if data is not None else None, **kwargs)
+    return forms
+
+
+def form_sections(forms):
+    """
+    (label, bound fields) per model for the template, each input shown once
+    (in the first section whose form is bound, so its errors are visible);
+    the patient and derived inputs are left out
+    """
+    owner = {}
+    for name, form in forms.items():
+        for field in form.fields:
+            if field in DERIVED_INPUTS or field == 'patient':
+                continue
+            if field not in owner or (form.is_bound and not forms[owner[field]].is_bound):
+                owner[field] = name
+    return [(PANEL_LABELS[name], [form[field] for field in form.fields if owner.get(field) == name])
+            for name, form in forms.items()]
+
+
+def _predict(name, instance):
+    try:
+        return PIPELINES[name].predict(instance)
+    finally:
+        # Pool threads outlive the request; do not leave a connection open in them
+        connections.close_all()
+
+
+def score_panel(instances):
+    """
+    Score every instance on the panel pool at once. Returns
+    {model: PipelineResult or the exception it raised}.
+    """
+    executor = _get_executor()
+    # A context can only be entered by one thread at a time, so every task gets its own copy
+    futures = {name: executor.submit(contextvars.copy_context().run, _predict, name, instance)
+               for name, instance in instances.items()}
+    results = {}
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            if isinstance(e, InferenceUnavailable):
+                logger.warning(f"Risk panel {name} prediction rejected: {str(e)}")
+            else:
+                logger.error(f"Risk panel {name} prediction failed: {str(e)}")
+            results[name] = e
+    return results
+
+
+def save_panel(instances, results, doctor):
+    """Save the successful predictions and their reports in one transaction; returns the saved instances"""
+    saved = {}
+    with transaction.atomic():
+        for name, instance in instances.items():
+            result = results[name]
+            if isinstance(result, Exception):
+                continue
+            pipeline = PIPELINES[name]
+            instance.prediction = result.label
+            instance.confidence = result.confidence
+            instance.model_version = result.model_version or ''
+            instance.save()
+            PredictionReport.objects.create(
+                patient=instance.patient,
+                doctor=doctor,
+                prediction_type=name,
+                prediction_id=instance.id,
+                model_version=instance.model_version,
+                prediction_data={
+                    'prediction': str(instance.prediction),
+                    'confidence': float(instance.confidence),
+                    'prediction_id': instance.id,
+                    'raw_probabilities': result.probabilities.tolist(),
+                    'features': pipeline.raw_features(instance),
+                    'panel': list(instances),
+                }
+            )
+            saved[name] = instance
+    return saved
+
+
+def panel_report(predictions, failed=()):
+    """
+    The consolidated report: one entry per panel model that was run, in
+    panel order. ``predictions`` maps model to saved prediction.
+    """
+    entries = []
+    for name in PANEL_FORMS:
+        if name in predictions:
+            prediction = predictions[name]
+            entries.append({
+                'model': name,
+                'label': PANEL_LABELS[name],
+                'prediction_id': prediction.id,
+                'prediction': prediction.prediction,
+                'confidence': prediction.confidence,
+                'is_positive': prediction.prediction == PIPELINES[name].labels[1],
+                'model_version': prediction.model_version,
+                'url': reverse(REPORT_TYPES[name].result_url, kwargs={'prediction_id': prediction.id}),
+            })
+        elif name in failed:
+            entries.append({'model': name, 'label': PANEL_LABELS[name], 'error': 'Could not be scored. Please try again.'})
+    return entries
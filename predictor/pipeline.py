@@ -0,0 +1,253 @@
+# pipeline.py
+"""
+Declarative prediction pipelines for the four disease models.
+
+A DiseasePipeline ties together everything a prediction needs: the ordered
+input fields, the encoder that turns them into the model's feature matrix,
+the optional scaler, the model itself and the threshold policy that maps
+probabilities to a label. Every prediction makes exactly one
+``predict_proba`` pass; the label is derived from those probabilities.
+"""
+import logging
+import time
+
+import numpy as np
+
+from .models import (
+    BreastCancerPrediction, LiverDiseasePrediction, DiabetesPrediction,
+    HeartDiseasePrediction,
+)
+from .encoding import FeatureEncoder, InputField
+from .registry import registry
+from .drift import monitor as drift_monitor
+from .result_cache import result_cache
+from .shadow import shadow
+from .timing import stage
+from . import inference_pool
+from . import scheduler as inference_scheduler
+
+logger = logging.getLogger(__name__)
+
+
+BREAST_CANCER_FIELDS = [
+    'mean_radius', 'mean_texture', 'mean_perimeter', 'mean_area', 'mean_smoothness',
+    'mean_compactness', 'mean_concavity', 'mean_concave_points', 'mean_symmetry',
+    'mean_fractal_dimension',
+    'radius_error', 'texture_error', 'perimeter_error', 'area_error', 'smoothness_error',
+    'compactness_error', 'concavity_error', 'concave_points_error', 'symmetry_error',
+    'fractal_dimension_error',
+    'worst_radius', 'worst_texture', 'worst_perimeter', 'worst_area', 'worst_smoothness',
+    'worst_compactness', 'worst_concavity', 'worst_concave_points', 'worst_symmetry',
+    'worst_fractal_dimension',
+]
+
+LIVER_FIELDS = [
+    'age', 'gender', 'total_bilirubin', 'direct_bilirubin', 'alkaline_phosphotase',
+    'alamine_aminotransferase', 'aspartate_aminotransferase', 'total_protiens',
+    'albumin', 'albumin_and_globulin_ratio',
+]
+
+DIABETES_FIELDS = [
+    'pregnancies', 'glucose', 'blood_pressure', 'skin_thickness', 'insulin', 'bmi',
+    'diabetes_pedigree_function', 'age',
+]
+
+HEART_DISEASE_FIELDS = [
+    'age', 'sex', 'cp', 'trestbps', 'chol', 'fbs', 'restecg', 'thalach', 'exang',
+    'oldpeak', 'slope', 'ca', 'thal',
+]
+
+# Numeric columns first, then the one-hot blocks without their first code
+# (get_dummies(drop_first=True)), exactly as the model was trained
+HEART_DISEASE_NUMERIC = ['age', 'trestbps', 'chol', 'thalach', 'oldpeak']
+HEART_DISEASE_ONE_HOT = {'sex': 2, 'cp': 4, 'fbs': 2, 'restecg': 3, 'exang': 2, 'slope': 3, 'ca': 5, 'thal': 4}
+HEART_DISEASE_INTEGERS = {'age', 'sex', 'cp', 'fbs', 'restecg', 'exang', 'slope', 'ca', 'thal'}
+
+
+GENDER_CHOICES = ['Male', 'Female']
+
+
+def _gender_to_float(value):
+    return 1.0 if str(value).strip() == 'Male' else 0.0
+
+
+BREAST_CANCER_ENCODER = FeatureEncoder([InputField(name) for name in BREAST_CANCER_FIELDS])
+
+LIVER_ENCODER = FeatureEncoder([
+    InputField(name, kind='int' if name == 'age' else 'float',
+               transform=_gender_to_float if name == 'gender' else None,
+               choices=GENDER_CHOICES if name == 'gender' else None)
+    for name in LIVER_FIELDS
+])
+
+DIABETES_ENCODER = FeatureEncoder([
+    InputField(name, kind='int' if name in ('pregnancies', 'age') else 'float')
+    for name in DIABETES_FIELDS
+])
+
+HEART_DISEASE_ENCODER = FeatureEncoder(
+    [
+        InputField(name, kind='int' if name in HEART_DISEASE_INTEGERS else 'float',
+                   vocabulary=range(HEART_DISEASE_ONE_HOT[name]) if name in HEART_DISEASE_ONE_HOT else None,
+                   drop_first=name in HEART_DISEASE_ONE_HOT)
+        for name in HEART_DISEASE_FIELDS
+    ],
+    order=HEART_DISEASE_NUMERIC + list(HEART_DISEASE_ONE_HOT),
+)
+
+
+class ThresholdPolicy:
+    """
+    The 0.6/0.4 rule: a class wins outright once its probability reaches the
+    threshold, otherwise the more likely class is reported. Confidence is the
+    probability of the reported class.
+    """
+
+    def __init__(self, threshold=0.6):
+        self.threshold = threshold
+
+    def decide(self, proba):
+        """Return (is_positive, confidence_percent) arrays for an (n, 2) matrix"""
+        negative, positive = proba[:, 0], proba[:, 1]
+        is_positive = np.where(positive >= self.threshold, True,
+                               np.where(negative >= self.threshold, False, positive > negative))
+        confidence = np.round(proba.max(axis=1).astype(np.float64) * 100, 2)
+        return is_positive, confidence
+
+
+class PipelineResult:
+    """Outcome of one prediction"""
+
+    def __init__(self, label, is_positive, confidence, probabilities, features, model_version=None):
+        self.label = label
+        self.is_positive = is_positive
+        self.confidence = confidence
+        self.probabilities = probabilities
+        self.features = features
+        self.model_version = model_version
+
+    def percent(self, index):
+        return float(round(float(self.probabilities[index]) * 100, 2))
+
+
+class DiseasePipeline:
+    def __init__(self, name, model_name, prediction_model, encoder, labels,
+                 threshold_policy=None, micro_batched=False):
+        self.name = name
+        self.model_name = model_name
+        self.prediction_model = prediction_model
+        self.encoder = encoder
+        self.fields = encoder.input_names
+        # Per-field conversions applied before encoding (e.g. 'Male' -> 1.0)
+        self.transforms = encoder.transforms
+        self.integer_fields = encoder.integer_fields
+        self.labels = labels
+        self.threshold_policy = threshold_policy or ThresholdPolicy()
+        self.micro_batched = micro_batched
+        # Names of the encoded columns; a model artifact must list the same order
+        self.feature_names = encoder.feature_names
+        registry.expect_features(model_name, self.feature_names)
+
+    def columns(self, rows):
+        """
+        One float64 array per input field. ``rows`` may be model instances or
+        dicts keyed by field name; a missing key raises KeyError.
+        """
+        return self.encoder.columns(rows)
+
+    def encode(self, rows):
+        """Feature matrix for ``rows`` in the column order the model expects"""
+        features = self.encoder.encode(rows)
+        if not np.all(np.isfinite(features)):
+            logger.warning(f"Missing values detected in {self.name} features; replacing with 0")
+            features = np.nan_to_num(features, nan=0.0, posinf=0.0, neginf=0.0)
+        return features
+
+    def score(self, features):
+        """
+        The single probability pass, with the scaler applied if the model has
+        one, and the version of the model that produced it. Single rows are
+        answered from the result cache when possible.
+        """
+        drift_monitor.observe(self.model_name, features)
+        if features.shape[0] != 1 or not result_cache.enabled:
+            return self._score(features)
+
+        with stage('model_fetch'):
+            version = inference_pool.model_version(self.model_name)
+        proba = result_cache.get(self.model_name, version, features[0]) if version is not None else None
+        if proba is None:
+            # The model may be swapped meanwhile; file the result under the version that scored it
+            proba, version = self._score(features)
+            result_cache.put(self.model_name, version, features[0], proba)
+        return proba, version
+
+    def _score(self, features):
+        if not shadow.wants(self.model_name):
+            return self._score_primary(features)
+        started = time.perf_counter()
+        proba, version = self._score_primary(features)
+        shadow.observe(self, features, proba, version, (time.perf_counter() - started) * 1000)
+        return proba, version
+
+    def _score_primary(self, features):
+        if self.micro_batched and features.shape[0] == 1:
+            proba, version = inference_scheduler.score(self.model_name, features[0])
+            return proba.reshape(1, -1), version
+
+        return inference_pool.score(self.model_name, features)
+
+    def decide(self, proba):
+        """Labels and confidences for a probability matrix"""
+        is_positive, confidence = self.threshold_policy.decide(proba)
+        negative_label, positive_label = self.labels
+        labels = [positive_label if positive else negative_label for positive in is_positive]
+        return labels, is_positive, confidence
+
+    def predict(self, instance):
+        """Score a single model instance (or dict of inputs)"""
+        with stage('feature_build'):
+            features = self.encode([instance])
+        with stage('inference'):
+            proba, version = self.score(features)
+        labels, is_positive, confidence = self.decide(proba)
+        return PipelineResult(labels[0], bool(is_positive[0]), float(confidence[0]), proba[0], features[0],
+                              model_version=version)
+
+    def raw_features(self, instance):
+        """Input values keyed by field name, as stored in report data"""
+        return {field: getattr(instance, field) for field in self.fields}
+
+
+PIPELINES = {
+    'breast_cancer': DiseasePipeline(
+        name='breast_cancer',
+        model_name='breast_cancer',
+        prediction_model=BreastCancerPrediction,
+        encoder=BREAST_CANCER_ENCODER,
+        labels=('Benign', 'Malignant'),
+    ),
+    'liver_disease': DiseasePipeline(
+        name='liver_disease',
+        model_name='liver_disease',
+        prediction_model=LiverDiseasePrediction,
+        encoder=LIVER_ENCODER,
+        labels=('No Disease', 'Disease'),
+    ),
+    'diabetes': DiseasePipeline(
+        name='diabetes',
+        model_name='diabetes',
+        prediction_model=DiabetesPrediction,
+        encoder=DIABETES_ENCODER,
+        labels=('No Diabetes', 'Diabetes'),
+        micro_batched=True,
+    ),
+    'heart_disease': DiseasePipeline(
+        name='heart_disease',
+        model_name='heart_disease',
+        prediction_model=HeartDiseasePrediction,
+        encoder=HEART_DISEASE_ENCODER,
+        labels=('No Heart Disease', 'Heart Disease'),
+        micro_batched=True,
+    ),
+}
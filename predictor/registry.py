@@ -0,0 +1,392 @@
+# registry.py
+"""
+In-process registry for the disease prediction models.
+
+Each model is loaded from ``ml_models/`` at most once per process and kept as
+a plain Python object, so every request gets the very same estimator back
+without the pickle round-trip a Django cache backend would impose.
+
+Models are read from a versioned artifact (see artifacts.py, built with
+``manage.py build_artifacts``) when one exists, otherwise from the legacy
+pickle files listed in MODEL_SPECS.
+
+Artifacts are hot-reloaded: at most every PREDICTOR_MODEL_WATCH_INTERVAL
+seconds get() and version() compare a model's artifact file with the one it
+was loaded from, and when a new one has been written the replacement is
+loaded on a background thread while requests keep using the current
+model. The new LoadedModel is swapped in with a single assignment once it
+is complete, so a request holds either the old model or the new one, never
+a partial load. A failed load is logged and the old model stays in service.
+"""
+import hashlib
+import os
+import pickle
+import threading
+import time
+import logging
+
+import joblib
+import numpy as np
+from django.conf import settings
+
+from .artifacts import ARTIFACT_SUFFIX, ArtifactError, ModelArtifact
+from .compiled import CompiledEnsemble
+
+logger = logging.getLogger(__name__)
+
+
+# name -> location of the legacy pickle under ml_models/ and how to unpack it.
+# "bundle" pickles are dicts holding the estimator under "model" and an
+# optional fitted "scaler"; "scaler" points at a separately pickled scaler.
+MODEL_SPECS = {
+    'breast_cancer': {
+        'path': ('breast_cancer', 'breast_cancer_prediction_xgb_model.pkl'),
+        'bundle': False,
+        'scaler': ('breast_cancer', 'breast_cancer_scaler.pkl'),
+    },
+    'liver_disease': {
+        'path': ('liver_disease_predictor', 'predictor_done.pkl'),
+        'bundle': True,
+    },
+    'diabetes': {
+        'path': ('diabetes predictor', 'diabetes_prediction_xgb_model.pkl'),
+        'bundle': False,
+    },
+    'heart_disease': {
+        'path': ('heart_disease', 'heart_disease_random_forest_model.pkl'),
+        'bundle': False,
+    },
+}
+
+
+def file_digest(path):
+    """sha256 of a file, used to tie derived artifacts to the model they came from"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def legacy_version(*paths):
+    """Version string for pickles without metadata, derived from their contents"""
+    return hashlib.sha256(''.join(file_digest(p) for p in paths if p).encode()).hexdigest()[:12]
+
+
+class LoadedModel:
+    """A model held in memory together with its bookkeeping"""
+
+    def __init__(self, name, model, scaler, path, load_seconds, size_bytes, compiled=None,
+                 version=None, feature_names=None, dtype=np.float32, source='legacy', signature=None):
+        self.name = name
+        self.model = model
+        self.scaler = scaler
+        self.path = path
+        self.load_seconds = load_seconds
+        self.size_bytes = size_bytes
+        # NumPy evaluator produced by `manage.py compile_models`, if available
+        self.compiled = compiled
+        self.version = version
+        self.feature_names = feature_names
+        self.dtype = np.dtype(dtype)
+        self.source = source
+        # (inode, size, mtime) of the artifact this was loaded against, None if there was none
+        self.signature = signature
+        self.loaded_at = time.time()
+        self.next_check = time.monotonic()
+        self.hits = 0
+
+    def predict_proba(self, features):
+        """Class probabilities for a feature matrix, scaler applied"""
+        features = np.asarray(features, dtype=self.dtype)
+        if self.scaler is not None:
+            features = self.scaler.transform(features)
+        if self.compiled is not None:
+            return self.compiled.predict_proba(features)
+        return self.model.predict_proba(features)
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'source': self.source,
+            'version': self.version,
+            'model_class': type(self.model).__name__,
+            'has_scaler': self.scaler is not None,
+            'compiled': self.compiled is not None,
+            'compiled_bytes': self.compiled.nbytes if self.compiled is not None else None,
+            'load_ms': round(self.load_seconds * 1000, 2),
+            'size_bytes': self.size_bytes,
+            'loaded_at': self.loaded_at,
+            'hits': self.hits,
+        }
+
+
+class ModelRegistry:
+    """Loads each configured model once and hands out the same instance"""
+
+    def __init__(self, specs, artifact_suffix=ARTIFACT_SUFFIX, legacy_fallback=True, expected_features=None):
+        self.specs = specs
+        self.artifact_suffix = artifact_suffix
+        # Without it a model that has no artifact is simply unavailable
+        self.legacy_fallback = legacy_fallback
+        # Feature order each consumer encodes, checked against artifacts at load
+        self._expected_features = {} if expected_features is None else expected_features
+        # Called with the model name (None for all) whenever models are dropped
+        self._unload_listeners = []
+        self._models = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+        # Models with a background reload in progress, and artifacts that failed to load
+        self._reloading = set()
+        self._rejected = {}
+        self.reloads = 0
+
+    def model_path(self, name):
+        return os.path.join(settings.BASE_DIR, 'ml_models', *self.specs[name]['path'])
+
+    def compiled_path(self, name):
+        return os.path.splitext(self.model_path(name))[0] + '.compiled.npz'
+
+    def scaler_path(self, name):
+        scaler = self.specs[name].get('scaler')
+        return os.path.join(settings.BASE_DIR, 'ml_models', *scaler) if scaler else None
+
+    def artifact_path(self, name):
+        directory = self.specs[name]['path'][0]
+        return os.path.join(settings.BASE_DIR, 'ml_models', directory, name + self.artifact_suffix)
+
+    def expect_features(self, name, feature_names):
+        """Declare the feature order a caller will send for model ``name``"""
+        self._expected_features[name] = list(feature_names)
+
+    def artifact_signature(self, name):
+        """Identity of the artifact file currently on disk for ``name``, None if there is none"""
+        try:
+            st = os.stat(self.artifact_path(name))
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def get(self, name):
+        """Return the LoadedModel for ``name``, loading it on first use"""
+        entry = self._current(name)
+        entry.hits += 1
+        return entry
+
+    def _current(self, name):
+        entry = self._models.get(name) or self._ensure_loaded(name)
+        if time.monotonic() >= entry.next_check:
+            self._watch(name, entry)
+        return entry
+
+    def _watch(self, name, entry):
+        interval = getattr(settings, 'PREDICTOR_MODEL_WATCH_INTERVAL', 5)
+        if interval <= 0:
+            entry.next_check = float('inf')
+            return
+        entry.next_check = time.monotonic() + interval
+        signature = self.artifact_signature(name)
+        if signature is None or signature == entry.signature or signature == self._rejected.get(name):
+            return
+        with self._lock:
+            if name in self._reloading:
+                return
+            self._reloading.add(name)
+        threading.Thread(target=self._reload_in_background, args=(name, signature),
+                         name=f'model-reload-{name}', daemon=True).start()
+
+    def _reload_in_background(self, name, signature):
+        try:
+            self.reload(name)
+        except Exception:
+            self._rejected[name] = signature
+        finally:
+            with self._lock:
+                self._reloading.discard(name)
+
+    def reload(self, name):
+        """
+        Load ``name`` afresh and swap it in. The current model keeps serving
+        until the new one is fully loaded; if loading fails it stays in place.
+        """
+        old = self._models.get(name)
+        entry = self._load(name)
+        with self._lock:
+            self._models[name] = entry
+            self._errors.pop(name, None)
+            self._rejected.pop(name, None)
+            self.reloads += 1
+        logger.info(f"Model '{name}' swapped from version {old.version if old else None} to {entry.version}")
+        for listener in self._unload_listeners:
+            listener(name)
+        return entry
+
+    def preload(self):
+        """
+        Load every registered model up front. Failures are logged and recorded
+        so one missing artifact does not stop the others from warming up.
+        Compiled ensembles also build their explanation paths, so the first
+        explanation is as fast as the rest and forked workers share them.
+        """
+        for name in self.specs:
+            try:
+                entry = self._ensure_loaded(name)
+            except Exception:
+                continue
+            if entry.compiled is not None:
+                entry.compiled.paths
+        return self.status()
+
+    def status(self):
+        """'warm', 'cold' (not loaded yet) or 'unavailable' (loading failed) per model"""
+        status = {}
+        for name in self.specs:
+            if name in self._models:
+                status[name] = 'warm'
+            elif name in self._errors:
+                status[name] = 'unavailable'
+            else:
+                status[name] = 'cold'
+        return status
+
+    def errors(self):
+        return dict(self._errors)
+
+    def _ensure_loaded(self, name):
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is None:
+                try:
+                    entry = self._load(name)
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+                self._errors.pop(name, None)
+                self._models[name] = entry
+        return entry
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def unload(self, name=None):
+        """Drop one (or every) model so the next get() reads it from disk again"""
+        with self._lock:
+            if name is None:
+                self._models.clear()
+            else:
+                self._models.pop(name, None)
+        for listener in self._unload_listeners:
+            listener(name)
+
+    def add_unload_listener(self, listener):
+        self._unload_listeners.append(listener)
+
+    def version(self, name):
+        """
+        Version of the loaded model ``name`` (loading it if needed), without
+        counting a hit. Like get() it checks for a rebuilt artifact, so a cache
+        keyed by this version follows a hot reload even when nothing calls get().
+        """
+        return self._current(name).version
+
+    def stats(self):
+        return {
+            name: self._models[name].stats() if name in self._models else None
+            for name in self.specs
+        }
+
+    def _load(self, name):
+        if name not in self.specs:
+            raise KeyError(f"Unknown model '{name}'")
+        if os.path.exists(self.artifact_path(name)):
+            return self._load_artifact(name)
+        if not self.legacy_fallback:
+            raise FileNotFoundError(f"No artifact for '{name}' at {self.artifact_path(name)}")
+        return self.load_legacy(name)
+
+    def _load_artifact(self, name):
+        path = self.artifact_path(name)
+        # Taken before reading: build_artifacts replaces the file atomically, so a
+        # newer artifact written meanwhile shows up as a different signature
+        signature = self.artifact_signature(name)
+        started = time.perf_counter()
+        try:
+            artifact = ModelArtifact.load(path)
+        except Exception as e:
+            logger.error(f"Loading artifact for '{name}' from {path} failed: {str(e)}")
+            raise
+        load_seconds = time.perf_counter() - started
+
+        expected = self._expected_features.get(name)
+        if expected is not None and expected != artifact.feature_names:
+            message = f"Artifact for '{name}' has feature order {artifact.feature_names}, expected {expected}"
+            logger.error(message)
+            raise ArtifactError(message)
+        if not getattr(settings, 'PREDICTOR_USE_COMPILED_MODELS', True):
+            artifact.compiled = None
+
+        logger.info(f"Model '{name}' version {artifact.version} mapped in {load_seconds * 1000:.1f} ms")
+        return LoadedModel(
+            name, artifact.model, artifact.scaler, path, load_seconds, os.path.getsize(path),
+            compiled=artifact.compiled, version=artifact.version,
+            feature_names=artifact.feature_names, dtype=artifact.dtype, source='artifact',
+            signature=signature,
+        )
+
+    def load_legacy(self, name, path=None, scaler_path=None):
+        """
+        Load ``name`` from its legacy pickle(s) without caching it. ``path`` and
+        ``scaler_path`` read another pickle in the same layout (a retrained
+        model); its compiled evaluator is not looked up then.
+        """
+        compiled_lookup = path is None
+        path = path or self.model_path(name)
+        scaler_path = scaler_path or self.scaler_path(name)
+        started = time.perf_counter()
+        try:
+            data = joblib.load(path)
+            scaler = joblib.load(scaler_path) if scaler_path else None
+        except Exception as e:
+            logger.error(f"Loading model '{name}' from {path} failed: {str(e)}")
+            raise
+        load_seconds = time.perf_counter() - started
+
+        if self.specs[name]['bundle']:
+            model = data['model']
+            scaler = data.get('scaler', scaler)
+        else:
+            model = data
+
+        # Serialized size is a cheap, stable estimate of the in-memory footprint
+        size_bytes = len(pickle.dumps((model, scaler), protocol=pickle.HIGHEST_PROTOCOL))
+        version = legacy_version(path, scaler_path)
+
+        logger.info(f"Model '{name}' loaded in {load_seconds * 1000:.1f} ms ({size_bytes} bytes)")
+        return LoadedModel(name, model, scaler, path, load_seconds, size_bytes,
+                           compiled=self._load_compiled(name, path) if compiled_lookup else None, version=version,
+                           feature_names=self._expected_features.get(name))
+
+    def _load_compiled(self, name, model_path):
+        if not getattr(settings, 'PREDICTOR_USE_COMPILED_MODELS', True):
+            return None
+        path = self.compiled_path(name)
+        if not os.path.exists(path):
+            return None
+        try:
+            compiled = CompiledEnsemble.load(path)
+        except Exception as e:
+            logger.error(f"Loading compiled model {path} failed: {str(e)}")
+            return None
+        if compiled.source_digest != file_digest(model_path):
+            logger.warning(f"Compiled model {path} was built from a different {model_path}; ignoring it")
+            return None
+        return compiled
+
+
+registry = ModelRegistry(MODEL_SPECS)
+
+# Retrained models under evaluation (see shadow.py), read only from
+# ``<name>.candidate.artifact.joblib`` next to the live artifact
+CANDIDATE_SUFFIX = '.candidate' + ARTIFACT_SUFFIX
+candidates = ModelRegistry(MODEL_SPECS, artifact_suffix=CANDIDATE_SUFFIX, legacy_fallback=False,
+                           expected_features=registry._expected_features)
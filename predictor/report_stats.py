@@ -0,0 +1,57 @@
+# report_stats.py
+"""
+Report statistics for the reports page.
+
+Per-type counts come from one grouped aggregate, and the patient dropdown
+from a semi-join on the doctor's reports. A doctor's unfiltered figures are
+cached (PREDICTOR_REPORT_STATS_TTL seconds) and dropped when one of their
+reports is created or deleted (see signals.py; batch scoring invalidates
+explicitly since bulk_create sends no signals). With a per-process cache
+backend other processes see the change once their entry expires; a shared
+backend such as Redis makes invalidation immediate everywhere.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from accounts.models import Patient
+from .models import PredictionReport
+
+TYPE_LABELS = dict(PredictionReport.PREDICTION_TYPES)
+
+
+def _cache_key(doctor_id):
+    return f'predictor:report_stats:{doctor_id}'
+
+
+def count_by_type(reports):
+    """(total, {type label: count}) for a report queryset in a single grouped query"""
+    rows = reports.order_by().values('prediction_type').annotate(count=Count('id'))
+    counts = {row['prediction_type']: row['count'] for row in rows}
+    by_type = {label: counts[code] for code, label in PredictionReport.PREDICTION_TYPES if counts.get(code)}
+    return sum(counts.values()), by_type
+
+
+def doctor_report_stats(doctor_id):
+    """Cached totals, per-type counts and dropdown patients for all of a doctor's reports"""
+    key = _cache_key(doctor_id)
+    stats = cache.get(key)
+    if stats is None:
+        reports = PredictionReport.objects.filter(doctor_id=doctor_id)
+        total, by_type = count_by_type(reports)
+        patients = list(Patient.objects
+                        .filter(id__in=reports.values('patient_id'))
+                        .order_by('first_name', 'last_name')
+                        .values('id', 'first_name', 'last_name'))
+        stats = {
+            'total_reports': total,
+            'reports_by_type': by_type,
+            'patients': patients,
+            'total_patients': len(patients),
+        }
+        cache.set(key, stats, getattr(settings, 'PREDICTOR_REPORT_STATS_TTL', 300))
+    return stats
+
+
+def invalidate_report_stats(doctor_id):
+    cache.delete(_cache_key(doctor_id))
@@ -0,0 +1,460 @@
+# reports.py
+"""
+PDF reports and result emails for each prediction type.
+
+The ReportLab builders and email bodies live here, outside the views, so
+the report job worker (jobs.py) can produce them without an HTTP request.
+REPORT_TYPES ties each prediction type to its model, PDF builder, file
+naming and (optionally) email. Styles and static text come from
+report_templates, which builds them once per process.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from reportlab.platypus import Spacer
+
+from . import report_templates
+from .models import (
+    BreastCancerPrediction, LiverDiseasePrediction, DiabetesPrediction,
+    HeartDiseasePrediction,
+)
+
+# {favourable result: recommendations}
+BREAST_CANCER_RECOMMENDATIONS = {
+    True: [
+        "Continue regular screening as per standard guidelines",
+        "Maintain healthy lifestyle with balanced diet and exercise",
+        "Follow up with routine mammography as recommended by your physician",
+        "Monitor for any changes and report unusual symptoms promptly"
+    ],
+    False: [
+        "URGENT: Schedule immediate consultation with oncologist",
+        "Additional imaging studies (MRI, CT) may be required",
+        "Multidisciplinary team evaluation recommended",
+        "Discuss treatment options including surgery, chemotherapy, or radiation",
+        "Genetic counseling may be beneficial",
+        "Emotional support and counseling services available"
+    ],
+}
+
+LIVER_RECOMMENDATIONS = {
+    True: [
+        "Continue maintaining healthy lifestyle with balanced diet",
+        "Regular monitoring of liver function as per physician's advice",
+        "Avoid excessive alcohol consumption and hepatotoxic substances",
+        "Maintain healthy weight and regular exercise routine",
+        "Follow up with routine liver function tests as recommended"
+    ],
+    False: [
+        "URGENT: Schedule immediate consultation with hepatologist/gastroenterologist",
+        "Additional liver function tests and imaging studies may be required",
+        "Avoid alcohol and hepatotoxic medications until further evaluation",
+        "Consider dietary modifications and lifestyle changes",
+        "Monitor for symptoms like jaundice, abdominal pain, or fatigue",
+        "Family history and genetic counseling may be beneficial"
+    ],
+}
+
+
+# Bump when the layout or wording of the PDFs changes, so stored PDFs are rebuilt
+REPORT_LAYOUT_VERSION = 1
+
+
+def save_pdf_to_media(pdf_bytes, filename, subfolder='reports'):
+    """
+    Save PDF bytes into MEDIA_ROOT/subfolder and return the relative file path.
+    """
+    file_path = os.path.join(subfolder, filename)
+    return default_storage.save(file_path, ContentFile(pdf_bytes))
+
+
+def source_digest(prediction_type, prediction, doctor_name):
+    """Digest of everything a report PDF is built from; equal digests give the same report"""
+    fields = {field.attname: field.value_from_object(prediction) for field in prediction._meta.concrete_fields}
+    patient = prediction.patient
+    payload = [REPORT_LAYOUT_VERSION, prediction_type, fields,
+               [patient.id, patient.first_name, patient.last_name], doctor_name]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _patient_rows(prediction, doctor_name, test_type, report_id):
+    return [
+        ['Patient Name:', f"{prediction.patient.first_name} {prediction.patient.last_name}"],
+        ['Patient ID:', f"DC-{prediction.patient.id:06d}"],
+        ['Date of Analysis:', prediction.created_at.strftime('%B %d, %Y at %I:%M %p')],
+        ['Attending Physician:', f"Dr. {doctor_name}"],
+        ['Test Type:', test_type],
+        ['Report ID:', report_id],
+    ]
+
+
+def _result_rows(prediction, risk_category):
+    return [
+        ['Assessment Result:', prediction.prediction],
+        ['Confidence Level:', f"{prediction.confidence:.1f}%"],
+        ['Risk Category:', risk_category],
+    ]
+
+
+def _footer(template):
+    return [
+        template.footer_rule(),
+        template.paragraph(
+            f"Report generated by Dr. Charaka AI System • {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} • "
+            f"This report should be interpreted by qualified medical professionals only",
+            'footer'
+        ),
+    ]
+
+
+def generate_dr_charaka_pdf(prediction, doctor_name):
+    """Generate comprehensive Dr. Charaka themed medical report"""
+    template = report_templates.BREAST_CANCER
+    benign = prediction.prediction == 'Benign'
+
+    # Header with Dr. Charaka branding
+    story = template.masthead()
+
+    # Patient Information
+    story.append(template.section("PATIENT INFORMATION"))
+    story.append(template.patient_table(_patient_rows(
+        prediction, doctor_name, 'Breast Cancer Risk Assessment', f"BC-{prediction.id:08d}"
+    )))
+    story.append(Spacer(1, 20))
+
+    # About Breast Cancer
+    story.append(template.section("UNDERSTANDING BREAST CANCER"))
+    story.append(template.about_paragraph())
+    story.append(Spacer(1, 15))
+
+    # Analysis Results
+    story.append(template.section("ANALYSIS RESULTS"))
+    story.append(template.result_table(_result_rows(
+        prediction, 'Low Risk' if benign else 'High Risk - Requires Further Evaluation'
+    ), favourable=benign))
+    story.append(Spacer(1, 20))
+
+    # Clinical Interpretation
+    story.append(template.section("CLINICAL INTERPRETATION"))
+
+    if benign:
+        interpretation = (
+            f"Based on the comprehensive analysis of cellular characteristics, the tissue sample shows "
+            f"<b>benign patterns</b> with {prediction.confidence:.1f}% confidence. The analyzed parameters "
+            f"including nuclear morphology, cellular texture, and structural features are consistent with "
+            f"non-malignant tissue. This indicates a lower likelihood of cancerous cells."
+        )
+    else:
+        interpretation = (
+            f"The analysis reveals <b>malignant characteristics</b> with {prediction.confidence:.1f}% confidence. "
+            f"The cellular parameters show patterns associated with cancerous tissue, including irregular "
+            f"nuclear features and abnormal cellular architecture. <b>Immediate consultation with an oncologist "
+            f"is strongly recommended for further evaluation and treatment planning.</b>"
+        )
+
+    story.append(template.paragraph(interpretation))
+    story.append(Spacer(1, 15))
+
+    # Recommendations
+    story.append(template.section("RECOMMENDATIONS"))
+    story.extend(template.recommendations(BREAST_CANCER_RECOMMENDATIONS[benign]))
+    story.append(Spacer(1, 30))
+
+    # Footer
+    story.extend(_footer(template))
+
+    return template.build(story)
+
+
+def generate_liver_pdf(prediction, doctor_name):
+    """Generate comprehensive Dr. Charaka themed liver disease report"""
+    template = report_templates.LIVER_DISEASE
+    healthy = prediction.prediction == 'No Disease'
+
+    # Header with Dr. Charaka branding
+    story = template.masthead()
+
+    # Patient Information
+    story.append(template.section("PATIENT INFORMATION"))
+    story.append(template.patient_table(_patient_rows(
+        prediction, doctor_name, 'Liver Disease Risk Assessment', f"LD-{prediction.id:08d}"
+    ) + [
+        ['Age:', f"{prediction.age} years"],
+        ['Gender:', prediction.gender]
+    ]))
+    story.append(Spacer(1, 20))
+
+    # About Liver Disease
+    story.append(template.section("UNDERSTANDING LIVER DISEASE"))
+    story.append(template.about_paragraph())
+    story.append(Spacer(1, 15))
+
+    # Analysis Results
+    story.append(template.section("ANALYSIS RESULTS"))
+    story.append(template.result_table(_result_rows(
+        prediction, 'Normal Liver Function' if healthy else 'Abnormal - Requires Medical Attention'
+    ), favourable=healthy))
+    story.append(Spacer(1, 20))
+
+    # Clinical Interpretation
+    story.append(template.section("CLINICAL INTERPRETATION"))
+
+    if healthy:
+        interpretation = (
+            f"Based on the comprehensive analysis of liver function parameters, the results indicate "
+            f"<b>normal liver function</b> with {prediction.confidence:.1f}% confidence. The analyzed "
+            f"laboratory values including bilirubin levels, liver enzymes, and protein markers are "
+            f"within expected ranges, suggesting healthy liver function."
+        )
+    else:
+        interpretation = (
+            f"The analysis reveals <b>abnormal liver function patterns</b> with {prediction.confidence:.1f}% confidence. "
+            f"The laboratory parameters show deviations from normal ranges that may indicate liver disease "
+            f"or dysfunction. <b>Immediate medical consultation is strongly recommended for further "
+            f"evaluation, additional testing, and appropriate treatment planning.</b>"
+        )
+
+    story.append(template.paragraph(interpretation))
+    story.append(Spacer(1, 15))
+
+    # Recommendations
+    story.append(template.section("RECOMMENDATIONS"))
+    story.extend(template.recommendations(LIVER_RECOMMENDATIONS[healthy]))
+    story.append(Spacer(1, 30))
+
+    # Footer
+    story.extend(_footer(template))
+
+    return template.build(story)
+
+
+def generate_diabetes_pdf(prediction, doctor_name):
+    """Generate comprehensive Dr. Charaka themed diabetes report"""
+    template = report_templates.DIABETES
+    healthy = prediction.prediction == 'No Diabetes'
+
+    # Header with Dr. Charaka branding
+    story = template.masthead()
+
+    # Patient Information
+    story.append(template.section("PATIENT INFORMATION"))
+    story.append(template.patient_table(_patient_rows(
+        prediction, doctor_name, 'Diabetes Risk Assessment', f"DB-{prediction.id:08d}"
+    ) + [
+        ['Age:', f"{prediction.age} years"],
+        ['BMI:', f"{prediction.bmi}"]
+    ]))
+    story.append(Spacer(1, 20))
+
+    # Analysis Results
+    story.append(template.section("ANALYSIS RESULTS"))
+    story.append(template.result_table(_result_rows(
+        prediction, 'Normal - Low Risk' if healthy else 'High Risk - Medical Attention Required'
+    ), favourable=healthy))
+    story.append(Spacer(1, 20))
+
+    return template.build(story)
+
+
+def generate_heart_disease_pdf(prediction, doctor_name):
+    """Generate comprehensive Dr. Charaka themed heart disease report"""
+    template = report_templates.HEART_DISEASE
+    healthy = prediction.prediction == 'No Heart Disease'
+
+    # Header with Dr. Charaka branding
+    story = template.masthead()
+
+    # Patient Information
+    story.append(template.section("PATIENT INFORMATION"))
+    story.append(template.patient_table(_patient_rows(
+        prediction, doctor_name, 'Heart Disease Risk Assessment', f"HD-{prediction.id:08d}"
+    ) + [
+        ['Age:', f"{prediction.age} years"],
+        ['Gender:', 'Male' if prediction.sex == 1 else 'Female'],
+        ['Max Heart Rate:', f"{prediction.thalach} bpm"],
+        ['Cholesterol:', f"{prediction.chol} mg/dl"]
+    ]))
+    story.append(Spacer(1, 20))
+
+    # Analysis Results
+    story.append(template.section("ANALYSIS RESULTS"))
+    story.append(template.result_table(_result_rows(
+        prediction, 'Normal - Low Risk' if healthy else 'High Risk - Medical Attention Required'
+    ), favourable=healthy))
+    story.append(Spacer(1, 20))
+
+    return template.build(story)
+
+
+def breast_cancer_email_html(prediction, doctor_name):
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <style>
+            body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height: 1.6; color: #333; }}
+            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+            .header {{ background: linear-gradient(135deg, #2E8B57, #228B22); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
+            .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
+            .result-box {{ background: {'#e8f5e8' if prediction.prediction == 'Benign' else '#ffe8e8'}; 
+                          border-left: 5px solid {'#228B22' if prediction.prediction == 'Benign' else '#DC143C'}; 
+                          padding: 20px; margin: 20px 0; }}
+            .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 30px; }}
+            .logo {{ font-size: 24px; font-weight: bold; }}
+            .highlight {{ color: {'#228B22' if prediction.prediction == 'Benign' else '#DC143C'}; font-weight: bold; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <div class="logo">DR. CHARAKA</div>
+                <p>Medical AI Diagnostics</p>
+            </div>
+            <div class="content">
+                <h2>Dear {prediction.patient.first_name},</h2>
+                <p>Your breast cancer screening analysis has been completed by our advanced AI diagnostic system.</p>
+                
+                <div class="result-box">
+                    <h3>Analysis Results</h3>
+                    <p><strong>Result:</strong> <span class="highlight">{prediction.prediction}</span></p>
+                    <p><strong>Confidence:</strong> {prediction.confidence:.1f}%</p>
+                    <p><strong>Analysis Date:</strong> {prediction.created_at.strftime('%B %d, %Y')}</p>
+                    <p><strong>Attending Physician:</strong> Dr. {doctor_name}</p>
+                </div>
+                
+                <p>Please find your detailed medical report attached to this email. The report contains comprehensive analysis of all parameters and clinical recommendations.</p>
+                
+                <p>{'We are pleased to inform you that the analysis indicates benign tissue characteristics.' if prediction.prediction == 'Benign' else 'The analysis requires immediate attention. Please contact your physician urgently to discuss the results and next steps.'}</p>
+                
+                <p><strong>Important:</strong> This analysis should be reviewed with your healthcare provider for proper medical interpretation and follow-up care.</p>
+                
+                <p>If you have any questions, please don't hesitate to contact our clinic.</p>
+                
+                <p>Best regards,<br>
+                <strong>Dr. {doctor_name}</strong><br>
+                Dr. Charaka Medical AI Diagnostics</p>
+            </div>
+            <div class="footer">
+                <p>This is an automated message from Dr. Charaka AI System.<br>
+                Please do not reply to this email. Contact your healthcare provider for medical questions.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    return html_content
+
+
+def liver_email_html(prediction, doctor_name):
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <style>
+            body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height: 1.6; color: #333; }}
+            .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+            .header {{ background: linear-gradient(135deg, #4169E1, #1E90FF); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
+            .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
+            .result-box {{ background: {'#e8f5e8' if prediction.prediction == 'No Disease' else '#ffe8e8'}; 
+                          border-left: 5px solid {'#228B22' if prediction.prediction == 'No Disease' else '#DC143C'}; 
+                          padding: 20px; margin: 20px 0; }}
+            .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 30px; }}
+            .logo {{ font-size: 24px; font-weight: bold; }}
+            .highlight {{ color: {'#228B22' if prediction.prediction == 'No Disease' else '#DC143C'}; font-weight: bold; }}
+        </style>
+    </head>
+    <body>
+        <div class="container">
+            <div class="header">
+                <div class="logo">🏥 DR. CHARAKA</div>
+                <p>Medical AI Diagnostics - Liver Health Assessment</p>
+            </div>
+            <div class="content">
+                <h2>Dear {prediction.patient.first_name},</h2>
+                <p>Your liver function screening analysis has been completed by our advanced AI diagnostic system.</p>
+                
+                <div class="result-box">
+                    <h3>Analysis Results</h3>
+                    <p><strong>Result:</strong> <span class="highlight">{prediction.prediction}</span></p>
+                    <p><strong>Confidence:</strong> {prediction.confidence:.1f}%</p>
+                    <p><strong>Analysis Date:</strong> {prediction.created_at.strftime('%B %d, %Y')}</p>
+                    <p><strong>Attending Physician:</strong> Dr. {doctor_name}</p>
+                </div>
+                
+                <p>Please find your detailed liver function report attached to this email. The report contains comprehensive analysis of all laboratory parameters and clinical recommendations.</p>
+                
+                <p>{'Your liver function appears to be normal based on the analyzed parameters.' if prediction.prediction == 'No Disease' else 'The analysis indicates abnormal liver function patterns that require immediate medical attention. Please contact your physician urgently.'}</p>
+                
+                <p><strong>Important:</strong> This analysis should be reviewed with your healthcare provider for proper medical interpretation and follow-up care.</p>
+                
+                <p>If you have any questions, please don't hesitate to contact our clinic.</p>
+                
+                <p>Best regards,<br>
+                <strong>Dr. {doctor_name}</strong><br>
+                Dr. Charaka Medical AI Diagnostics</p>
+            </div>
+            <div class="footer">
+                <p>This is an automated message from Dr. Charaka AI System.<br>
+                Please do not reply to this email. Contact your healthcare provider for medical questions.</p>
+            </div>
+        </div>
+    </body>
+    </html>
+    """
+    return html_content
+
+
+class ReportType:
+    def __init__(self, prediction_model, generate_pdf, filename, subfolder='reports',
+                 email_subject=None, email_html=None, result_url='predictor:prediction_result'):
+        self.prediction_model = prediction_model
+        self.generate_pdf = generate_pdf
+        # Callables taking the prediction
+        self.filename = filename
+        self.subfolder = subfolder
+        self.email_subject = email_subject
+        self.email_html = email_html
+        self.result_url = result_url
+
+    @property
+    def sends_email(self):
+        return self.email_html is not None
+
+
+REPORT_TYPES = {
+    'breast_cancer': ReportType(
+        prediction_model=BreastCancerPrediction,
+        generate_pdf=generate_dr_charaka_pdf,
+        filename=lambda p: f'DrCharaka_Report_{p.patient.last_name}_{p.id}.pdf',
+        email_subject=lambda p: f'Dr. Charaka - Medical Analysis Report for {p.patient.first_name}',
+        email_html=breast_cancer_email_html,
+        result_url='predictor:prediction_result',
+    ),
+    'liver_disease': ReportType(
+        prediction_model=LiverDiseasePrediction,
+        generate_pdf=generate_liver_pdf,
+        filename=lambda p: f'DrCharaka_LiverReport_{p.patient.last_name}_{p.id}.pdf',
+        subfolder='liver_reports',
+        email_subject=lambda p: f'Dr. Charaka - Liver Function Analysis Report for {p.patient.first_name}',
+        email_html=liver_email_html,
+        result_url='predictor:liver_prediction_result',
+    ),
+    'diabetes': ReportType(
+        prediction_model=DiabetesPrediction,
+        generate_pdf=generate_diabetes_pdf,
+        filename=lambda p: f"diabetes_report_{p.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+        result_url='predictor:diabetes_prediction_result',
+    ),
+    'heart_disease': ReportType(
+        prediction_model=HeartDiseasePrediction,
+        generate_pdf=generate_heart_disease_pdf,
+        filename=lambda p: f"heart_disease_report_{p.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+        result_url='predictor:heart_disease_prediction_result',
+    ),
+}
@@ -0,0 +1,93 @@
+# result_cache.py
+"""
+Bounded LRU/TTL cache of prediction probabilities.
+
+Entries are keyed by model name, model version and a hash of the feature
+vector in canonical form (contiguous float32, -0.0 folded into 0.0), so the
+same labs entered twice hit the cache while any change to the inputs or to
+the model produces a new key. The registry drops a model's entries whenever
+that model is unloaded or reloaded.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+from .registry import registry
+
+
+def feature_key(features):
+    """Digest of one feature row in canonical float32 form"""
+    canonical = np.ascontiguousarray(features, dtype=np.float32).ravel() + np.float32(0.0)
+    return hashlib.blake2b(canonical.tobytes(), digest_size=16).digest()
+
+
+class ResultCache:
+    def __init__(self, max_size=1024, ttl=600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    def get(self, model_name, version, features):
+        """Cached probability row for ``features``, or None"""
+        key = (model_name, version, feature_key(features))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1].copy()
+
+    def put(self, model_name, version, features, proba):
+        key = (model_name, version, feature_key(features))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, np.array(proba, copy=True))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, model_name=None):
+        """Drop every entry for ``model_name`` (or all entries)"""
+        with self._lock:
+            if model_name is None:
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries if key[0] == model_name]:
+                    del self._entries[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0,
+        }
+
+
+result_cache = ResultCache(
+    max_size=getattr(settings, 'PREDICTOR_RESULT_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'PREDICTOR_RESULT_CACHE_TTL', 600),
+)
+registry.add_unload_listener(result_cache.invalidate)
@@ -0,0 +1,163 @@
+# scheduler.py
+"""
+Micro-batching inference scheduler.
+
+Concurrent prediction requests for the same model are collected for a short
+window (or until the batch is full) and scored with one ``predict_proba``
+call over the stacked feature matrix. Every caller then gets its own row.
+"""
+import os
+import queue
+import threading
+import time
+import logging
+
+import numpy as np
+from django.conf import settings
+
+from . import inference_pool
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingPrediction:
+    __slots__ = ('features', 'done', 'result', 'version', 'error')
+
+    def __init__(self, features):
+        self.features = features
+        self.done = threading.Event()
+        self.result = None
+        self.version = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Coalesces single-row predictions for one model into batched calls"""
+
+    def __init__(self, model_name, window_ms=5, max_batch_size=32, timeout=10):
+        self.model_name = model_name
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        self.batches = 0
+        self.requests = 0
+        # Batch size histogram with power-of-two buckets: 1, 2, 3-4, 5-8, ...
+        self.histogram = {}
+
+    def score(self, features):
+        """Score one feature row (1-D array); returns its probability row and the model version"""
+        self._ensure_worker()
+        pending = _PendingPrediction(np.asarray(features, dtype=np.float32).ravel())
+        self._queue.put(pending)
+        if not pending.done.wait(self.timeout):
+            raise inference_pool.InferenceUnavailable(f"Prediction for '{self.model_name}' timed out")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result, pending.version
+
+    def stats(self):
+        return {
+            'window_ms': self.window * 1000,
+            'max_batch_size': self.max_batch_size,
+            'batches': self.batches,
+            'requests': self.requests,
+            'mean_batch_size': round(self.requests / self.batches, 2) if self.batches else 0,
+            'histogram': dict(sorted(self.histogram.items(), key=lambda item: int(item[0].split('-')[-1]))),
+        }
+
+    def _ensure_worker(self):
+        # Threads do not survive fork(), so a preloaded batcher has to be
+        # restarted inside each worker process.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(
+                    target=self._run, name=f'micro-batcher-{self.model_name}', daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                features = np.vstack([pending.features for pending in batch])
+                proba, version = inference_pool.score(self.model_name, features)
+                for pending, row in zip(batch, proba):
+                    pending.result = row
+                    pending.version = version
+            except Exception as e:
+                logger.error(f"Batched prediction for '{self.model_name}' failed: {str(e)}")
+                for pending in batch:
+                    pending.error = e
+            finally:
+                self._record(len(batch))
+                for pending in batch:
+                    pending.done.set()
+
+    def _record(self, size):
+        upper = 1
+        while upper < size:
+            upper *= 2
+        bucket = str(upper) if upper <= 2 else f'{upper // 2 + 1}-{upper}'
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+        self.batches += 1
+        self.requests += size
+
+
+_batchers = {}
+_batchers_lock = threading.Lock()
+
+
+def get_batcher(model_name):
+    """Return the process-wide MicroBatcher for ``model_name``"""
+    batcher = _batchers.get(model_name)
+    if batcher is None:
+        with _batchers_lock:
+            batcher = _batchers.get(model_name)
+            if batcher is None:
+                batcher = MicroBatcher(
+                    model_name,
+                    window_ms=getattr(settings, 'PREDICTOR_BATCH_WINDOW_MS', 5),
+                    max_batch_size=getattr(settings, 'PREDICTOR_MAX_BATCH_SIZE', 32),
+                    timeout=getattr(settings, 'PREDICTOR_INFERENCE_TIMEOUT', 10),
+                )
+                _batchers[model_name] = batcher
+    return batcher
+
+
+def score(model_name, features):
+    """
+    Probability row for a single feature vector and the version of the model
+    that scored it, coalesced with concurrent requests when micro-batching is
+    enabled.
+    """
+    if not getattr(settings, 'PREDICTOR_MICRO_BATCHING', True):
+        features = np.asarray(features, dtype=np.float32).reshape(1, -1)
+        proba, version = inference_pool.score(model_name, features)
+        return proba[0], version
+    return get_batcher(model_name).score(features)
+
+
+def stats():
+    return {name: batcher.stats() for name, batcher in _batchers.items()}
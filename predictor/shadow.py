@@ -0,0 +1,225 @@
+# shadow.py
+"""
+Shadow evaluation of candidate models against live traffic.
+
+For every model in PREDICTOR_SHADOW_MODELS that has a candidate artifact
+(``<name>.candidate.artifact.joblib``, see registry.candidates), each
+scoring call that reaches the primary model is noted with its feature
+matrix, probabilities and latency. Inside a request the note is held until
+Django's request_finished signal, i.e. after the response has been sent;
+outside one (management commands) it is queued at once.
+
+The candidate then scores the same features on a small thread pool. The
+pool has a bounded number of slots (PREDICTOR_SHADOW_WORKERS +
+PREDICTOR_SHADOW_QUEUE_DEPTH) and work arriving while they are all taken is
+dropped and counted, so shadowing never queues up behind live traffic.
+
+Results are accumulated per (model, primary version, candidate version)
+and added to the ShadowEvaluation row for that pair at most every
+PREDICTOR_SHADOW_FLUSH_SECONDS.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import ShadowEvaluation
+from .registry import candidates
+from .timing import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+class _PairTotals:
+    """Comparisons for one model pair not yet written to the database"""
+
+    def __init__(self):
+        self.calls = 0
+        self.comparisons = 0
+        self.agreements = 0
+        self.abs_delta_sum = 0.0
+        self.abs_delta_max = 0.0
+        self.primary_ms_sum = 0.0
+        self.candidate_ms_sum = 0.0
+        self.candidate_ms_max = 0.0
+
+    def add(self, agreements, abs_delta, primary_ms, candidate_ms):
+        self.calls += 1
+        self.comparisons += len(abs_delta)
+        self.agreements += agreements
+        self.abs_delta_sum += float(abs_delta.sum())
+        self.abs_delta_max = max(self.abs_delta_max, float(abs_delta.max()))
+        self.primary_ms_sum += primary_ms
+        self.candidate_ms_sum += candidate_ms
+        self.candidate_ms_max = max(self.candidate_ms_max, candidate_ms)
+
+    def merge(self, other):
+        for field in ('calls', 'comparisons', 'agreements', 'abs_delta_sum', 'primary_ms_sum', 'candidate_ms_sum'):
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        self.abs_delta_max = max(self.abs_delta_max, other.abs_delta_max)
+        self.candidate_ms_max = max(self.candidate_ms_max, other.candidate_ms_max)
+
+
+class ShadowEvaluator:
+    def __init__(self, models, workers=1, queue_depth=32, flush_seconds=30):
+        self.models = set(models)
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.flush_seconds = flush_seconds
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # A context variable rather than a thread local, so work scored on
+        # helper threads that run in a copy of the request's context (the risk
+        # panel) is still held until the response has been sent
+        self._deferred = contextvars.ContextVar(f'shadow_deferred_{id(self)}', default=None)
+        self._pending = {}
+        # Candidate latency per pair for this process's lifetime
+        self._latency = {}
+        self._last_flush = time.monotonic()
+
+        self.submitted = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def wants(self, model_name):
+        return model_name in self.models
+
+    def observe(self, pipeline, features, proba, version, primary_ms):
+        """Note a primary scoring call; the candidate runs after the current response is sent"""
+        job = (pipeline, features, proba, version, primary_ms)
+        deferred = self._deferred.get()
+        if deferred is None:
+            self._submit(job)
+        else:
+            deferred.append(job)
+
+    def request_started(self, **kwargs):
+        if self.models:
+            self._deferred.set([])
+
+    def request_finished(self, **kwargs):
+        if not self.models:
+            return
+        deferred = self._deferred.get()
+        self._deferred.set(None)
+        for job in deferred or ():
+            self._submit(job)
+
+    def _get_executor(self):
+        # Threads do not survive fork(), so each worker process starts its own pool
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._slots = threading.BoundedSemaphore(self.workers + self.queue_depth)
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='shadow')
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _submit(self, job):
+        executor = self._get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            self.dropped += 1
+            return
+        try:
+            future = executor.submit(self._compare, *job)
+        except RuntimeError:
+            slots.release()
+            self.dropped += 1
+            return
+        self.submitted += 1
+        future.add_done_callback(lambda _: slots.release())
+
+    def _compare(self, pipeline, features, proba, version, primary_ms):
+        name = pipeline.model_name
+        try:
+            if candidates.artifact_signature(name) is None:
+                return
+            candidate = candidates.get(name)
+            started = time.perf_counter()
+            candidate_proba = np.asarray(candidate.predict_proba(features))
+            candidate_ms = (time.perf_counter() - started) * 1000
+
+            _, primary_positive, _ = pipeline.decide(proba)
+            _, candidate_positive, _ = pipeline.decide(candidate_proba)
+            abs_delta = np.abs(candidate_proba[:, 1].astype(np.float64) - np.asarray(proba)[:, 1])
+            key = (name, version or '', candidate.version or '')
+            with self._lock:
+                self._pending.setdefault(key, _PairTotals()).add(
+                    int(np.count_nonzero(primary_positive == candidate_positive)), abs_delta, primary_ms, candidate_ms)
+                self._latency.setdefault(key, Histogram()).add(candidate_ms)
+                due = time.monotonic() - self._last_flush >= self.flush_seconds
+            if due:
+                # Long-lived thread: drop a connection the database has timed out
+                close_old_connections()
+                self.flush()
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Shadow evaluation of '{name}' failed: {str(e)}")
+
+    def flush(self):
+        """Add the accumulated comparisons to their ShadowEvaluation rows"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        for (name, primary_version, candidate_version), totals in pending.items():
+            try:
+                row, _ = ShadowEvaluation.objects.get_or_create(
+                    model_name=name, primary_version=primary_version, candidate_version=candidate_version)
+                ShadowEvaluation.objects.filter(pk=row.pk).update(
+                    calls=F('calls') + totals.calls,
+                    comparisons=F('comparisons') + totals.comparisons,
+                    agreements=F('agreements') + totals.agreements,
+                    abs_delta_sum=F('abs_delta_sum') + totals.abs_delta_sum,
+                    abs_delta_max=Greatest(F('abs_delta_max'), totals.abs_delta_max),
+                    primary_ms_sum=F('primary_ms_sum') + totals.primary_ms_sum,
+                    candidate_ms_sum=F('candidate_ms_sum') + totals.candidate_ms_sum,
+                    candidate_ms_max=Greatest(F('candidate_ms_max'), totals.candidate_ms_max),
+                    updated_at=timezone.now(),
+                )
+            except Exception as e:
+                logger.error(f"Saving shadow results for '{name}' failed: {str(e)}")
+                with self._lock:
+                    self._pending.setdefault((name, primary_version, candidate_version), _PairTotals()).merge(totals)
+
+    def stats(self):
+        with self._lock:
+            latency = {
+                f'{name}:{primary}->{candidate}': histogram.summary()
+                for (name, primary, candidate), histogram in self._latency.items()
+            }
+            unflushed = sum(totals.calls for totals in self._pending.values())
+        return {
+            'models': sorted(self.models),
+            'workers': self.workers,
+            'queue_depth': self.queue_depth,
+            'submitted': self.submitted,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'unflushed_calls': unflushed,
+            'candidate_latency': latency,
+        }
+
+
+shadow = ShadowEvaluator(
+    getattr(settings, 'PREDICTOR_SHADOW_MODELS', []),
+    workers=getattr(settings, 'PREDICTOR_SHADOW_WORKERS', 1),
+    queue_depth=getattr(settings, 'PREDICTOR_SHADOW_QUEUE_DEPTH', 32),
+    flush_seconds=getattr(settings, 'PREDICTOR_SHADOW_FLUSH_SECONDS', 30),
+)
+request_started.connect(shadow.request_started)
+request_finished.connect(shadow.request_finished)
@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import PredictionReport
+from .report_stats import invalidate_report_stats
+
+
+@receiver(post_save, sender=PredictionReport)
+def report_created(sender, instance, created, **kwargs):
+    # Status updates (PDF ready, email sent) do not change the counts
+    if created:
+        transaction.on_commit(lambda: invalidate_report_stats(instance.doctor_id))
+
+
+@receiver(post_delete, sender=PredictionReport)
+def report_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_report_stats(instance.doctor_id))
@@ -0,0 +1,119 @@
+# sweep.py
+"""
+What-if sweeps over a stored prediction's inputs.
+
+One or two input fields are varied over a range while every other input
+keeps the value stored with the prediction. The whole grid (plus the
+unchanged inputs, as row 0) is built as one raw matrix, encoded once and
+scored with a single predict_proba call, giving the positive-class
+probability at every point.
+
+The grid is capped at PREDICTOR_SWEEP_MAX_POINTS. Sweep points are
+hypothetical, so like cohort rescoring they go straight to the inference
+backend and skip the result cache, the drift monitor and shadow evaluation.
+"""
+import numpy as np
+from django.conf import settings
+
+from . import inference_pool
+
+DEFAULT_STEPS = 21
+
+
+class SweepError(Exception):
+    """Raised when the requested sweep is invalid"""
+
+
+def _number(params, key, default=None):
+    value = params.get(key)
+    if value in (None, ''):
+        if default is None:
+            raise SweepError(f"Missing parameter '{key}'")
+        return default
+    try:
+        number = float(value)
+    except ValueError:
+        raise SweepError(f"'{key}' must be a number")
+    if not np.isfinite(number):
+        raise SweepError(f"'{key}' must be a finite number")
+    return number
+
+
+def axis_values(pipeline, params, axis):
+    """(field, values) for one axis, from ?<axis>=field&<axis>_min=&<axis>_max=&<axis>_steps="""
+    field = params.get(axis)
+    input_field = next((f for f in pipeline.encoder.fields if f.name == field), None)
+    if input_field is None:
+        raise SweepError(f"'{axis}' must be one of: {', '.join(pipeline.fields)}")
+    if input_field.transform is not None:
+        raise SweepError(f"Field '{field}' cannot be swept")
+
+    if input_field.vocabulary is not None:
+        # Categorical: every code in the vocabulary, optionally narrowed by min/max
+        vocabulary = np.asarray(input_field.vocabulary, dtype=np.float64)
+        low = _number(params, f'{axis}_min', float(vocabulary.min()))
+        high = _number(params, f'{axis}_max', float(vocabulary.max()))
+        values = vocabulary[(vocabulary >= low) & (vocabulary <= high)]
+    else:
+        low, high = _number(params, f'{axis}_min'), _number(params, f'{axis}_max')
+        steps = _number(params, f'{axis}_steps', DEFAULT_STEPS)
+        if steps < 1 or steps != int(steps):
+            raise SweepError(f"'{axis}_steps' must be a positive whole number")
+        if int(steps) > getattr(settings, 'PREDICTOR_SWEEP_MAX_POINTS', 2500):
+            raise SweepError(f"'{axis}_steps' is larger than the sweep limit")
+        values = np.linspace(low, high, int(steps))
+        if field in pipeline.integer_fields:
+            values = np.unique(np.round(values))
+    if high < low:
+        raise SweepError(f"'{axis}_min' must not be greater than '{axis}_max'")
+    if not len(values):
+        raise SweepError(f"No values of '{field}' lie in the requested range")
+    return field, values
+
+
+def sweep(pipeline, prediction, params):
+    """
+    Positive-class probability over the grid described by ``params`` (x and
+    optionally y axes), with every other input taken from ``prediction``
+    """
+    axes = [axis_values(pipeline, params, 'x')]
+    if params.get('y'):
+        axes.append(axis_values(pipeline, params, 'y'))
+        if axes[0][0] == axes[1][0]:
+            raise SweepError("'x' and 'y' must be different fields")
+
+    shape = tuple(len(values) for _, values in reversed(axes))
+    points = int(np.prod(shape))
+    max_points = getattr(settings, 'PREDICTOR_SWEEP_MAX_POINTS', 2500)
+    if points > max_points:
+        raise SweepError(f"The sweep has {points} points; the limit is {max_points}")
+
+    encoder = pipeline.encoder
+    columns = pipeline.columns([prediction])
+    base = np.array([columns[name][0] for name in encoder.input_names])
+    raw = np.repeat(base[None, :], points + 1, axis=0)
+    # Row 0 keeps the stored inputs; x varies fastest, so the surface reshapes to (y, x)
+    x_field, x_values = axes[0]
+    raw[1:, encoder.input_names.index(x_field)] = np.tile(x_values, points // len(x_values))
+    if len(axes) == 2:
+        y_field, y_values = axes[1]
+        raw[1:, encoder.input_names.index(y_field)] = np.repeat(y_values, len(x_values))
+
+    features = np.nan_to_num(encoder.encode_raw(raw), nan=0.0, posinf=0.0, neginf=0.0)
+    proba, version = inference_pool.score(pipeline.model_name, features)
+    positive = np.round(np.asarray(proba, dtype=np.float64)[:, 1], 4)
+
+    result = {
+        'model_version': version,
+        'positive_label': pipeline.labels[1],
+        'threshold': pipeline.threshold_policy.threshold,
+        'current': {
+            'values': {field: float(base[encoder.input_names.index(field)]) for field, _ in axes},
+            'probability': float(positive[0]),
+        },
+        'x': {'field': x_field, 'values': x_values.tolist()},
+        'probability': positive[1:].reshape(shape).tolist(),
+    }
+    if len(axes) == 2:
+        result['y'] = {'field': y_field, 'values': y_values.tolist()}
+    return result
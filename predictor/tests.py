@@ -1,3 +1,709 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date, time as clock, timedelta
+from unittest import mock
 
-# Create your tests here.
+import joblib
+import numpy as np
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import Appointment, Patient, User
+from .artifacts import ArtifactError, ModelArtifact
+from .batch import BatchError, _extract_columns, parse_rows, run_batch
+from .cohort import score_model
+from .compiled import compile_model, parity_error, parity_samples
+from .drift import DriftMonitor, bin_counts, build_baseline, monitor as drift_monitor, pad_edges, psi
+from .encoding import FeatureEncoder, InputField
+from .explain import explain
+from . import inference_pool
+from .inference_pool import InferencePool, InferenceUnavailable
+from .forms import HeartDiseasePredictionForm
+from .jobs import backoff_delay, claim, claim_next, enqueue_report, process_job, requeue_stale
+from .models import HeartDiseasePrediction, PatientRiskSnapshot, PredictionReport, ReportJob
+from .pagination import decode_cursor, keyset_page
+from .panel import model_forms, panel_data, score_panel
+from .pipeline import PIPELINES, ThresholdPolicy
+from .registry import MODEL_SPECS, ModelRegistry, registry
+from .result_cache import ResultCache
+from .scheduler import MicroBatcher
+from .shadow import ShadowEvaluator
+from .sweep import SweepError, axis_values, sweep
+from .timeline import patient_timeline
+from .timing import Histogram, LatencyRecorder, RequestTimer, _current_timer, stage
+
+HEART_INPUTS = {
+    'age': 61, 'sex': 1, 'cp': 2, 'trestbps': 130, 'chol': 230, 'fbs': 0, 'restecg': 1,
+    'thalach': 150, 'exang': 0, 'oldpeak': 1.0, 'slope': 1, 'ca': 0, 'thal': 2,
+}
+
+
+def make_patient(email='doctor@example.com'):
+    doctor = User.objects.create_user(username=email, email=email, password='x',
+                                      first_name='Test', last_name='Doctor', is_doctor=True)
+    patient = Patient.objects.create(doctor=doctor, first_name='Test', last_name='Patient',
+                                     date_of_birth=date(1970, 1, 1), gender='M', contact_number='1',
+                                     address='-', email='patient@example.com')
+    return doctor, patient
+
+
+def make_heart_prediction(doctor, patient, **overrides):
+    values = dict(HEART_INPUTS, **overrides)
+    return HeartDiseasePrediction.objects.create(patient=patient, doctor=doctor, prediction='Heart Disease',
+                                                 confidence=70.0, **values)
+
+
+def loaded_or_skip(test, name):
+    try:
+        return registry.get(name)
+    except Exception as e:
+        test.skipTest(f"Model '{name}' is not available: {e}")
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        loaded_or_skip(self, 'diabetes')
+        self.models = ModelRegistry(MODEL_SPECS)
+
+    def test_model_is_loaded_once(self):
+        first = self.models.get('diabetes')
+        self.assertIs(self.models.get('diabetes'), first)
+        self.assertEqual(first.hits, 2)
+        self.assertEqual(self.models.status()['diabetes'], 'warm')
+        self.assertEqual(self.models.status()['breast_cancer'], 'cold')
+
+    def test_unload_notifies_listeners_and_reloads(self):
+        dropped = []
+        self.models.add_unload_listener(dropped.append)
+        first = self.models.get('diabetes')
+        self.models.unload('diabetes')
+        self.assertEqual(dropped, ['diabetes'])
+        self.assertFalse(self.models.is_loaded('diabetes'))
+        self.assertIsNot(self.models.get('diabetes'), first)
+
+    def test_unknown_model(self):
+        with self.assertRaises(KeyError):
+            self.models.get('spleen')
+
+
+class FeatureEncoderTests(SimpleTestCase):
+    def setUp(self):
+        self.encoder = FeatureEncoder([
+            InputField('age', kind='int'),
+            InputField('colour', vocabulary=[0, 1, 2]),
+            InputField('gender', transform=lambda v: 1.0 if v == 'Male' else 0.0, choices=['Male', 'Female']),
+        ], order=['gender', 'age', 'colour'])
+
+    def test_columns_follow_the_training_order(self):
+        self.assertEqual(self.encoder.feature_names, ['gender', 'age', 'colour_0', 'colour_1', 'colour_2'])
+        features = self.encoder.encode([{'age': 40, 'colour': 2, 'gender': 'Male'},
+                                         {'age': 50, 'colour': 0, 'gender': 'Female'}])
+        np.testing.assert_array_equal(features, [[1, 40, 0, 0, 1], [0, 50, 1, 0, 0]])
+
+    def test_single_row_results_are_not_shared(self):
+        first = self.encoder.encode([{'age': 40, 'colour': 1, 'gender': 'Male'}])
+        self.encoder.encode([{'age': 70, 'colour': 0, 'gender': 'Female'}])
+        np.testing.assert_array_equal(first, [[1, 40, 0, 1, 0]])
+
+    def test_unknown_category_encodes_as_zeros_and_is_reported(self):
+        rows = [{'age': 40, 'colour': 7, 'gender': 'Male'}]
+        np.testing.assert_array_equal(self.encoder.encode(rows), [[1, 40, 0, 0, 0]])
+        self.assertEqual(self.encoder.out_of_vocabulary(self.encoder.columns(rows)), {'colour': [0, 1, 2]})
+
+    def test_invalid_choices(self):
+        self.assertEqual(self.encoder.invalid_choices([{'gender': 'Male'}, {'gender': ' Female '}]), {})
+        self.assertEqual(self.encoder.invalid_choices([{'gender': 'male'}]), {'gender': ['Male', 'Female']})
+
+    def test_per_field_sums_one_hot_blocks(self):
+        np.testing.assert_array_equal(self.encoder.per_field(np.array([1.0, 2.0, 0.5, 0.25, 0.25])),
+                                      [2.0, 1.0, 1.0])
+
+    def test_drop_first_leaves_the_reference_code_all_zero(self):
+        encoder = FeatureEncoder([InputField('age'), InputField('thal', vocabulary=range(4), drop_first=True)])
+        self.assertEqual(encoder.feature_names, ['age', 'thal_1', 'thal_2', 'thal_3'])
+        features = encoder.encode([{'age': 40, 'thal': 0}, {'age': 50, 'thal': 3}])
+        np.testing.assert_array_equal(features, [[40, 0, 0, 0], [50, 0, 0, 1]])
+        self.assertEqual(encoder.out_of_vocabulary({'age': np.array([40.0]), 'thal': np.array([3.0])}), {})
+        self.assertEqual(encoder.out_of_vocabulary({'age': np.array([40.0]), 'thal': np.array([4.0])}),
+                         {'thal': [0, 1, 2, 3]})
+
+    def test_heart_encoder_matches_trained_columns(self):
+        pipeline = PIPELINES['heart_disease']
+        loaded = loaded_or_skip(self, 'heart_disease')
+        self.assertEqual(pipeline.feature_names, list(loaded.model.feature_names_in_))
+        features = pipeline.encode([dict(HEART_INPUTS, thal=3)])[0]
+        self.assertEqual(features[pipeline.feature_names.index('cp_2')], 1)
+        self.assertEqual(features[pipeline.feature_names.index('thal_3')], 1)
+        self.assertEqual(features[pipeline.feature_names.index('sex_1')], 1)
+        # 'Not Described' is a form choice, so batch rows accept it too
+        _extract_columns(pipeline, [dict(HEART_INPUTS, thal=3)])
+
+
+class ThresholdPolicyTests(SimpleTestCase):
+    def test_decide(self):
+        proba = np.array([[0.3, 0.7], [0.65, 0.35], [0.45, 0.55], [0.5, 0.5]])
+        is_positive, confidence = ThresholdPolicy(threshold=0.6).decide(proba)
+        self.assertEqual(is_positive.tolist(), [True, False, True, False])
+        self.assertEqual(confidence.tolist(), [70.0, 65.0, 55.0, 50.0])
+
+
+class BatchParsingTests(SimpleTestCase):
+    def test_parse_rows(self):
+        self.assertEqual(parse_rows(body='[{"a": 1}]'), [{'a': 1}])
+        for body in ('not json', '{"a": 1}', '[]'):
+            with self.subTest(body=body), self.assertRaises(BatchError):
+                parse_rows(body=body)
+
+    @override_settings(PREDICTOR_BATCH_MAX_ROWS=2)
+    def test_row_limit(self):
+        with self.assertRaises(BatchError):
+            parse_rows(body='[{}, {}, {}]')
+
+    def test_column_checks(self):
+        heart, liver = PIPELINES['heart_disease'], PIPELINES['liver_disease']
+        cases = [
+            (heart, {k: v for k, v in HEART_INPUTS.items() if k != 'chol'}, 'Missing column'),
+            (heart, dict(HEART_INPUTS, chol='high'), 'numeric'),
+            (heart, dict(HEART_INPUTS, cp=7), "Column 'cp' must be one of"),
+            (heart, dict(HEART_INPUTS, oldpeak=float('nan')), 'missing or infinite'),
+            (liver, {'gender': 'M'}, "Column 'gender' must be one of Male, Female"),
+            (heart, dict(HEART_INPUTS, age=430), "Row 1: column 'age' must be between 1 and 120"),
+            (heart, dict(HEART_INPUTS, chol=-5), "Row 1: column 'chol' must be at least 0"),
+        ]
+        for pipeline, row, message in cases:
+            with self.subTest(message=message):
+                with self.assertRaisesMessage(BatchError, message):
+                    _extract_columns(pipeline, [row])
+
+    def test_bounds_report_the_failing_row(self):
+        rows = [HEART_INPUTS, dict(HEART_INPUTS, trestbps=-1), dict(HEART_INPUTS, age=0)]
+        with self.assertRaisesMessage(BatchError, "Row 2: column 'trestbps'"):
+            _extract_columns(PIPELINES['heart_disease'], rows)
+
+    def test_form_enforces_the_same_bounds(self):
+        form = HeartDiseasePredictionForm(data=dict(HEART_INPUTS, age=430))
+        self.assertIn('age', form.errors)
+
+
+class BatchScoringTests(TestCase):
+    def test_run_batch_saves_every_row(self):
+        loaded_or_skip(self, 'heart_disease')
+        doctor, patient = make_patient()
+        rows = [dict(HEART_INPUTS, patient_id=patient.id, chol=200 + i) for i in range(3)]
+        predictions, proba = run_batch('heart_disease', rows, doctor)
+        self.assertEqual(proba.shape, (3, 2))
+        self.assertEqual(HeartDiseasePrediction.objects.count(), 3)
+        self.assertEqual(PredictionReport.objects.filter(prediction_type='heart_disease').count(), 3)
+        self.assertEqual([p.chol for p in predictions], [200.0, 201.0, 202.0])
+
+    def test_unknown_patient_is_rejected(self):
+        doctor, _ = make_patient()
+        _, other = make_patient('other@example.com')
+        with self.assertRaisesMessage(BatchError, 'Unknown patient ids'):
+            run_batch('heart_disease', [dict(HEART_INPUTS, patient_id=other.id)], doctor)
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_concurrent_rows_share_one_call(self):
+        calls = []
+
+        def score(model_name, features):
+            calls.append(len(features))
+            return np.column_stack([1 - features[:, 0], features[:, 0]]), 'v1'
+
+        batcher = MicroBatcher('diabetes', window_ms=200, max_batch_size=4)
+        results = {}
+        with mock.patch('predictor.inference_pool.score', score):
+            threads = [threading.Thread(target=lambda i=i: results.update({i: batcher.score([i / 10])}))
+                       for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(calls, [4])
+        for i, (row, version) in results.items():
+            self.assertAlmostEqual(float(row[1]), i / 10, places=6)
+            self.assertEqual(version, 'v1')
+
+    def test_timeout_is_unavailable(self):
+        def score(model_name, features):
+            time.sleep(0.5)
+            return np.zeros((len(features), 2)), 'v1'
+
+        batcher = MicroBatcher('diabetes', window_ms=1, timeout=0.05)
+        with mock.patch('predictor.inference_pool.score', score):
+            with self.assertRaises(InferenceUnavailable):
+                batcher.score([1.0])
+
+
+class ModelArtifactTests(SimpleTestCase):
+    def setUp(self):
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import StandardScaler
+
+        X = np.random.default_rng(0).normal(size=(40, 3))
+        y = (X[:, 0] > 0).astype(int)
+        self.scaler = StandardScaler().fit(X)
+        self.model = LogisticRegression().fit(self.scaler.transform(X), y)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_round_trip(self):
+        path = os.path.join(self.directory, 'toy.artifact.joblib')
+        ModelArtifact('toy', self.model, ['a', 'b', 'c'], scaler=self.scaler, version='v1').save(path)
+        loaded = ModelArtifact.load(path)
+        self.assertEqual((loaded.version, loaded.feature_names), ('v1', ['a', 'b', 'c']))
+        self.assertIsInstance(loaded.scaler.mean_, np.memmap)
+        self.assertIn('created_at', loaded.metadata)
+
+    def test_inconsistent_artifacts_are_rejected(self):
+        with self.assertRaisesMessage(ArtifactError, 'feature order lists 2'):
+            ModelArtifact('toy', self.model, ['a', 'b'], version='v1').validate()
+        with self.assertRaisesMessage(ArtifactError, 'has no version'):
+            ModelArtifact('toy', self.model, ['a', 'b', 'c']).validate()
+        path = os.path.join(self.directory, 'legacy.joblib')
+        joblib.dump(self.model, path)
+        with self.assertRaisesMessage(ArtifactError, 'Unsupported artifact schema'):
+            ModelArtifact.load(path)
+
+
+class ResultCacheTests(SimpleTestCase):
+    def test_keys(self):
+        results = ResultCache(max_size=10, ttl=60)
+        results.put('m', 'v1', np.array([0.0, 1.0]), np.array([0.2, 0.8]))
+        np.testing.assert_array_equal(results.get('m', 'v1', np.array([-0.0, 1.0])), [0.2, 0.8])
+        self.assertIsNone(results.get('m', 'v2', np.array([0.0, 1.0])))
+        self.assertIsNone(results.get('m', 'v1', np.array([0.0, 1.5])))
+
+    def test_lru_and_ttl(self):
+        results = ResultCache(max_size=2, ttl=60)
+        for i in range(3):
+            results.put('m', 'v', np.array([i]), np.array([0.5, 0.5]))
+        self.assertIsNone(results.get('m', 'v', np.array([0])))
+        self.assertEqual(results.evictions, 1)
+        expiring = ResultCache(max_size=2, ttl=-1)
+        expiring.put('m', 'v', np.array([0]), np.array([0.5, 0.5]))
+        self.assertIsNone(expiring.get('m', 'v', np.array([0])))
+
+    def test_process_backend_version_does_not_load_the_model(self):
+        pool = InferencePool(workers=1)
+        signature = registry.artifact_signature('heart_disease')
+        pool._served['heart_disease'] = (signature, 'v9')
+        with override_settings(PREDICTOR_INFERENCE_BACKEND='process'), \
+                mock.patch.object(inference_pool, '_pool', pool), \
+                mock.patch.object(registry, 'version', side_effect=AssertionError('model loaded')):
+            self.assertEqual(inference_pool.model_version('heart_disease'), 'v9')
+            pool._served['heart_disease'] = ('rebuilt', 'v8')
+            self.assertIsNone(inference_pool.model_version('heart_disease'))
+
+
+class InferencePoolTests(SimpleTestCase):
+    def test_saturated_pool_rejects_without_queueing(self):
+        pool = InferencePool(workers=1, queue_depth=0)
+        pool._slots.acquire()
+        with self.assertRaisesMessage(InferenceUnavailable, 'busy'):
+            pool.score('heart_disease', np.zeros((1, 22), dtype=np.float32))
+        self.assertEqual((pool.rejected, pool.submitted), (1, 0))
+        self.assertFalse(pool.stats()['started'])
+
+
+class TimingTests(SimpleTestCase):
+    def test_stages_add_up_only_inside_a_timed_request(self):
+        with stage('inference'):
+            pass
+        timer = RequestTimer('heart_disease')
+        token = _current_timer.set(timer)
+        try:
+            for _ in range(2):
+                with stage('inference'):
+                    time.sleep(0.01)
+        finally:
+            _current_timer.reset(token)
+        self.assertEqual(list(timer.stages), ['inference'])
+        self.assertGreaterEqual(timer.stages['inference'], 20)
+
+    def test_histogram_percentiles(self):
+        histogram = Histogram()
+        for value in [1.0] * 90 + [100.0] * 10:
+            histogram.add(value)
+        summary = histogram.summary()
+        self.assertLess(summary['p50_ms'], 1.3)
+        self.assertGreater(summary['p95_ms'], 80)
+        self.assertEqual(summary['max_ms'], 100.0)
+        recorder = LatencyRecorder(size=2)
+        for total in (1, 2, 3):
+            recorder.record('diabetes', {'inference': total / 2}, total)
+        self.assertEqual([entry['total_ms'] for entry in recorder.recent_entries(5)], [2, 3])
+        self.assertEqual(recorder.summary()['diabetes']['total']['count'], 3)
+
+
+@override_settings(PREDICTOR_REPORT_JOBS_EAGER=False)
+class ReportJobTests(TestCase):
+    def setUp(self):
+        self.doctor, self.patient = make_patient()
+        self.report = PredictionReport.objects.create(patient=self.patient, doctor=self.doctor,
+                                                      prediction_type='heart_disease', prediction_data={})
+
+    def test_enqueue_reuses_unfinished_job(self):
+        job = enqueue_report(self.report)
+        self.assertEqual(enqueue_report(self.report).id, job.id)
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.pdf_status, 'queued')
+
+    def test_recently_finished_job_is_reused(self):
+        job = enqueue_report(self.report)
+        ReportJob.objects.filter(id=job.id).update(status='succeeded', finished_at=timezone.now())
+        self.assertEqual(enqueue_report(self.report).id, job.id)
+        ReportJob.objects.filter(id=job.id).update(finished_at=timezone.now() - timedelta(hours=1))
+        self.assertNotEqual(enqueue_report(self.report).id, job.id)
+
+    def test_a_job_is_claimed_once_by_id(self):
+        job = enqueue_report(self.report)
+        self.assertEqual(claim(job.id, 'worker-1').locked_by, 'worker-1')
+        self.assertIsNone(claim(job.id, 'worker-2'))
+
+    @override_settings(PREDICTOR_REPORT_JOBS_EAGER=True)
+    def test_eager_jobs_are_claimed_before_running(self):
+        # The report points at no prediction, so the attempt fails and is rescheduled
+        job = enqueue_report(self.report)
+        self.assertEqual((job.status, job.attempts, job.locked_by), ('queued', 1, ''))
+        self.assertIn('DoesNotExist', job.last_error)
+
+    def test_a_job_is_claimed_once(self):
+        job = enqueue_report(self.report)
+        claimed = claim_next('worker-1')
+        self.assertEqual((claimed.id, claimed.status, claimed.attempts), (job.id, 'running', 1))
+        self.assertIsNone(claim_next('worker-2'))
+
+    def test_stale_jobs_are_requeued(self):
+        enqueue_report(self.report)
+        job = claim_next('worker-1')
+        ReportJob.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(stale_after=60), 1)
+        self.assertEqual(claim_next('worker-2').attempts, 2)
+
+    def test_failures_back_off_then_give_up(self):
+        # The report points at no prediction, so every attempt fails
+        job = enqueue_report(self.report)
+        ReportJob.objects.filter(id=job.id).update(max_attempts=2)
+        self.assertFalse(process_job(claim_next()))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIsNone(claim_next())
+
+        ReportJob.objects.filter(id=job.id).update(run_after=timezone.now())
+        self.assertFalse(process_job(claim_next()))
+        job.refresh_from_db()
+        self.report.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, self.report.pdf_status), ('failed', 2, 'failed'))
+        self.assertIn('DoesNotExist', job.last_error)
+
+    @override_settings(PREDICTOR_REPORT_JOB_BACKOFF_SECONDS=10, PREDICTOR_REPORT_JOB_MAX_BACKOFF_SECONDS=60)
+    def test_backoff_delay(self):
+        for attempts, low in ((1, 10), (2, 20), (3, 40), (10, 60)):
+            with self.subTest(attempts=attempts):
+                self.assertTrue(low <= backoff_delay(attempts) <= low * 1.25)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.doctor, self.patient = make_patient()
+        moment = timezone.now()
+        for i in range(7):
+            report = PredictionReport.objects.create(patient=self.patient, doctor=self.doctor,
+                                                     prediction_type='heart_disease', prediction_data={})
+            # Pairs of reports share a timestamp, so ties are settled by id
+            PredictionReport.objects.filter(id=report.id).update(created_at=moment - timedelta(minutes=i // 2))
+        self.expected = list(PredictionReport.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def test_forward_and_back(self):
+        queryset = PredictionReport.objects.filter(doctor=self.doctor)
+        pages = [keyset_page(queryset, 3)]
+        while pages[-1].has_next:
+            pages.append(keyset_page(queryset, 3, after=pages[-1].next_cursor))
+        self.assertEqual([r.id for page in pages for r in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertFalse(pages[0].has_previous)
+
+        back = keyset_page(queryset, 3, before=pages[2].previous_cursor)
+        self.assertEqual([r.id for r in back], self.expected[3:6])
+        self.assertTrue(back.has_previous)
+
+    def test_malformed_cursor_is_ignored(self):
+        self.assertIsNone(decode_cursor('not-a-cursor'))
+        page = keyset_page(PredictionReport.objects.all(), 3, after='not-a-cursor')
+        self.assertEqual([r.id for r in page], self.expected[:3])
+
+
+class PatientTimelineTests(TestCase):
+    def setUp(self):
+        self.doctor, self.patient = make_patient()
+        moment = timezone.now()
+        for i in range(3):
+            prediction = make_heart_prediction(self.doctor, self.patient)
+            HeartDiseasePrediction.objects.filter(id=prediction.id).update(created_at=moment - timedelta(hours=i))
+            appointment = Appointment.objects.create(doctor=self.doctor, patient=self.patient,
+                                                     appointment_date=date(2030, 1, 1 + i), appointment_time=clock(9),
+                                                     reason=f'Visit {i}')
+            # The same instant as a prediction: ordered by event type, then id
+            Appointment.objects.filter(id=appointment.id).update(created_at=moment - timedelta(hours=i))
+
+    def test_pages_cover_every_event_once_newest_first(self):
+        events, cursor = patient_timeline(self.patient.id, limit=4)
+        self.assertIsNotNone(cursor)
+        rest, cursor = patient_timeline(self.patient.id, limit=4, cursor=cursor)
+        self.assertIsNone(cursor)
+        events += rest
+        self.assertEqual(len(events), 6)
+        self.assertEqual(len({(e['type'], e['id']) for e in events}), 6)
+        self.assertEqual([e['at'] for e in events], sorted((e['at'] for e in events), reverse=True))
+        self.assertEqual([e['type'] for e in events[:2]], ['heart_disease', 'appointment'])
+        self.assertEqual(events[1]['scheduled_for'], '2030-01-01T09:00:00')
+        self.assertTrue(events[0]['url'])
+
+    def test_event_type_filter(self):
+        events, _ = patient_timeline(self.patient.id, event_types=['appointment'])
+        self.assertEqual({e['type'] for e in events}, {'appointment'})
+        self.assertEqual(len(events), 3)
+
+
+class HotReloadTests(SimpleTestCase):
+    def test_version_notices_a_rebuilt_artifact(self):
+        source = registry.artifact_path('heart_disease')
+        if not os.path.exists(source):
+            self.skipTest('No heart_disease artifact')
+        base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, base_dir)
+        with override_settings(BASE_DIR=base_dir, PREDICTOR_MODEL_WATCH_INTERVAL=5):
+            models = ModelRegistry(MODEL_SPECS)
+            path = models.artifact_path('heart_disease')
+            os.makedirs(os.path.dirname(path))
+            shutil.copy(source, path)
+            first = models.version('heart_disease')
+
+            artifact = ModelArtifact.load(path, mmap_mode=None)
+            artifact.version = 'rebuilt'
+            artifact.save(path)
+            models._models['heart_disease'].next_check = 0
+            # Only version() is called, as on a result-cache hit
+            deadline = time.monotonic() + 10
+            while models.version('heart_disease') == first and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(models.version('heart_disease'), 'rebuilt')
+
+
+class ShadowEvaluatorTests(SimpleTestCase):
+    def test_work_waits_for_the_end_of_the_request(self):
+        evaluator = ShadowEvaluator(['heart_disease'])
+        with mock.patch.object(evaluator, '_submit') as submit:
+            evaluator.request_started()
+            evaluator.observe(None, np.zeros((1, 2)), np.zeros((1, 2)), 'v1', 1.0)
+            submit.assert_not_called()
+            evaluator.request_finished()
+            self.assertEqual(submit.call_count, 1)
+            # Outside a request it is queued at once
+            evaluator.observe(None, np.zeros((1, 2)), np.zeros((1, 2)), 'v1', 1.0)
+            self.assertEqual(submit.call_count, 2)
+
+    def test_work_is_dropped_when_every_slot_is_taken(self):
+        evaluator = ShadowEvaluator(['heart_disease'], workers=1, queue_depth=0)
+        evaluator._get_executor()
+        evaluator._slots.acquire()
+        evaluator.observe(None, np.zeros((1, 2)), np.zeros((1, 2)), 'v1', 1.0)
+        self.assertEqual((evaluator.submitted, evaluator.dropped), (0, 1))
+
+
+class DriftTests(TestCase):
+    def tearDown(self):
+        drift_monitor.reset()
+
+    def test_binning_and_psi(self):
+        edges = pad_edges([[1.0, 2.0], [5.0]])
+        counts = bin_counts(edges, np.array([[0.5, 4.0], [1.0, 5.0], [3.0, 6.0]]))
+        self.assertEqual(counts.tolist(), [[1, 1, 1], [1, 2, 0]])
+        self.assertAlmostEqual(psi([10, 20, 30], [1, 2, 3]), 0.0)
+        self.assertGreater(psi([10, 20, 30], [30, 20, 10]), 0.25)
+
+    def test_observe_never_queries(self):
+        drift_monitor.reset()
+        features = np.zeros((1, 2))
+        with self.assertNumQueries(0):
+            drift_monitor.observe('test_model', features)
+        build_baseline('test_model', ['a', 'b'], np.random.default_rng(0).normal(size=(200, 2)), bins=4)
+        with self.assertNumQueries(0):
+            drift_monitor.observe('test_model', features)
+        self.assertEqual(drift_monitor.stats()['test_model']['unflushed'], 1)
+
+    def test_requests_that_score_nothing_do_not_flush(self):
+        monitor = DriftMonitor(flush_seconds=0)
+        with self.assertNumQueries(0):
+            monitor.flush_if_due()
+        monitor.observe('test_model', np.zeros((1, 2)))
+        with self.assertNumQueries(1):
+            monitor.flush_if_due()
+        with self.assertNumQueries(0):
+            monitor.flush_if_due()
+
+
+class CohortScoringTests(TestCase):
+    def test_latest_inputs_are_rescored_and_stale_snapshots_removed(self):
+        loaded_or_skip(self, 'heart_disease')
+        doctor, patient = make_patient()
+        make_heart_prediction(doctor, patient, chol=200)
+        latest = make_heart_prediction(doctor, patient, chol=300)
+        result = score_model('heart_disease')
+        self.assertEqual((result['patients'], result['removed']), (1, 0))
+        snapshot = PatientRiskSnapshot.objects.get(patient=patient)
+        self.assertEqual((snapshot.prediction_id, snapshot.model_version), (latest.id, result['version']))
+
+        HeartDiseasePrediction.objects.all().delete()
+        self.assertEqual(score_model('heart_disease')['removed'], 1)
+        self.assertFalse(PatientRiskSnapshot.objects.exists())
+
+
+class SweepTests(TestCase):
+    def setUp(self):
+        self.pipeline = PIPELINES['heart_disease']
+        loaded_or_skip(self, 'heart_disease')
+        self.doctor, self.patient = make_patient()
+        self.prediction = make_heart_prediction(self.doctor, self.patient)
+
+    def test_axis_values(self):
+        field, values = axis_values(self.pipeline, {'x': 'age', 'x_min': '40', 'x_max': '42', 'x_steps': '5'}, 'x')
+        self.assertEqual((field, values.tolist()), ('age', [40.0, 41.0, 42.0]))
+        field, values = axis_values(self.pipeline, {'x': 'cp', 'x_min': '1'}, 'x')
+        self.assertEqual(values.tolist(), [1.0, 2.0, 3.0])
+
+    def test_invalid_sweeps(self):
+        for params in ({'x': 'nope'}, {'x': 'age', 'x_min': '50'}, {'x': 'age', 'x_min': '60', 'x_max': '50'},
+                       {'x': 'age', 'x_min': '1', 'x_max': '2', 'x_steps': '0'},
+                       {'x': 'age', 'x_min': '1', 'x_max': '2', 'y': 'age', 'y_min': '1', 'y_max': '2'}):
+            with self.subTest(params=params), self.assertRaises(SweepError):
+                sweep(self.pipeline, self.prediction, params)
+
+    @override_settings(PREDICTOR_SWEEP_MAX_POINTS=20)
+    def test_point_limit(self):
+        with self.assertRaises(SweepError):
+            sweep(self.pipeline, self.prediction,
+                  {'x': 'age', 'x_min': '30', 'x_max': '70', 'x_steps': '5', 'y': 'chol', 'y_min': '150',
+                   'y_max': '300', 'y_steps': '5'})
+
+    def test_grid_matches_single_predictions(self):
+        result = sweep(self.pipeline, self.prediction,
+                       {'x': 'chol', 'x_min': '150', 'x_max': '300', 'x_steps': '4', 'y': 'cp'})
+        self.assertEqual(np.shape(result['probability']), (4, 4))
+        row = {field: getattr(self.prediction, field) for field in self.pipeline.fields}
+        proba, _ = self.pipeline.score(self.pipeline.encode([dict(row, cp=3, chol=200.0)]))
+        self.assertAlmostEqual(result['probability'][3][1], proba[0, 1], places=4)
+        self.assertAlmostEqual(result['current']['probability'],
+                               self.pipeline.score(self.pipeline.encode([row]))[0][0, 1], places=4)
+
+
+class ExplanationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.pipeline = PIPELINES['heart_disease']
+        self.loaded = loaded_or_skip(self, 'heart_disease')
+        self.doctor, self.patient = make_patient()
+
+    def test_explanation_adds_up_to_the_prediction(self):
+        prediction = make_heart_prediction(self.doctor, self.patient, model_version=self.loaded.version)
+        explanation = explain(self.pipeline, prediction)
+        self.assertFalse(explanation['version_mismatch'])
+        self.assertEqual(len(explanation['contributions']), len(self.pipeline.fields))
+        total = explanation['base_value'] + sum(item['contribution'] for item in explanation['contributions'])
+        self.assertAlmostEqual(total, explanation['output_value'], places=4)
+        proba, _ = self.pipeline.score(self.pipeline.encode([prediction]))
+        self.assertAlmostEqual(explanation['output_value'], proba[0, 1], places=4)
+
+    def test_other_model_version_is_flagged(self):
+        prediction = make_heart_prediction(self.doctor, self.patient, model_version='retired')
+        explanation = explain(self.pipeline, prediction)
+        self.assertTrue(explanation['version_mismatch'])
+        self.assertEqual(explanation['prediction_model_version'], 'retired')
+
+
+class RiskPanelTests(SimpleTestCase):
+    def test_gender_is_derived_from_sex(self):
+        self.assertEqual(panel_data(QueryDict('sex=1'))['gender'], 'Male')
+        self.assertEqual(panel_data(QueryDict('sex=0'))['gender'], 'Female')
+        self.assertEqual(panel_data(QueryDict('sex=0&gender=Male'))['gender'], 'Male')
+        self.assertNotIn('gender', panel_data(QueryDict('')))
+
+    def test_inputs_are_not_required_in_the_browser(self):
+        forms = model_forms(None)
+        self.assertNotIn('required', str(forms['heart_disease']['age']))
+        self.assertNotIn('required', str(forms['liver_disease']['total_bilirubin']))
+        bound = model_forms(None, panel_data(QueryDict('age=40')), selected=['diabetes'])['diabetes']
+        self.assertIn('glucose', bound.errors)
+
+    def test_models_are_scored_in_the_request_context(self):
+        evaluator = ShadowEvaluator(['heart_disease'])
+
+        def predict(name, instance):
+            with stage('inference'):
+                evaluator.observe(None, np.zeros((1, 2)), np.zeros((1, 2)), 'v1', 1.0)
+            return name
+
+        timer = RequestTimer('risk_panel')
+        token = _current_timer.set(timer)
+        try:
+            with mock.patch('predictor.panel._predict', predict), mock.patch.object(evaluator, '_submit') as submit:
+                evaluator.request_started()
+                results = score_panel({'diabetes': None, 'heart_disease': None})
+                submit.assert_not_called()
+                evaluator.request_finished()
+                self.assertEqual(submit.call_count, 2)
+        finally:
+            _current_timer.reset(token)
+        self.assertEqual(results, {'diabetes': 'diabetes', 'heart_disease': 'heart_disease'})
+        self.assertIn('inference', timer.stages)
+
+
+class CompiledParityTests(SimpleTestCase):
+    """The compiled NumPy evaluators must agree with the models they were compiled from"""
+    tolerance = 1e-5
+
+    def test_fresh_compilation_matches_every_model(self):
+        for name in MODEL_SPECS:
+            with self.subTest(model=name):
+                try:
+                    loaded = registry.load_legacy(name)
+                except Exception:
+                    continue
+                compiled = compile_model(loaded.model)
+                self.assertLessEqual(parity_error(loaded.model, compiled), self.tolerance)
+
+    def test_shipped_compiled_models_match(self):
+        for name in MODEL_SPECS:
+            with self.subTest(model=name):
+                try:
+                    loaded = registry.get(name)
+                except Exception:
+                    continue
+                if loaded.compiled is None:
+                    continue
+                self.assertLessEqual(parity_error(loaded.model, loaded.compiled), self.tolerance)
+
+    def test_contributions_add_up_to_the_model_output(self):
+        for name in MODEL_SPECS:
+            with self.subTest(model=name):
+                try:
+                    loaded = registry.get(name)
+                except Exception:
+                    continue
+                compiled = loaded.compiled or compile_model(loaded.model)
+                for x in parity_samples(compiled, 5, seed=1):
+                    base_value, contributions = compiled.contributions(x)
+                    positive = compiled.predict_proba(x[None, :])[0, 1]
+                    if compiled.kind == 'xgboost':
+                        expected = np.log(positive / (1 - positive))
+                    else:
+                        expected = positive
+                    self.assertAlmostEqual(base_value + contributions.sum(), expected, places=5)
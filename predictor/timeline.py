@@ -0,0 +1,123 @@
+# timeline.py
+"""
+A patient's history across the four prediction tables and appointments.
+
+Each source contributes a branch that selects only what the timeline
+shows, renamed to a shared set of columns (COLUMNS). The branches are
+combined with one UNION ALL, ordered newest first by (event_at,
+event_type, event_id), which is unique across sources. Paging is keyset
+based: the cursor condition is applied inside every branch, so each one
+seeks on its own created_at index before the union.
+"""
+from datetime import datetime
+
+from django.db.models import CharField, DateField, F, FloatField, Q, TextField, TimeField, Value
+from django.urls import reverse
+
+from accounts.models import Appointment
+from .pagination import decode_parts, encode_parts
+from .reports import REPORT_TYPES
+
+COLUMNS = ('event_type', 'event_id', 'event_at', 'summary', 'score', 'note',
+           'scheduled_date', 'scheduled_time')
+
+PREDICTION_SOURCES = {code: report_type.prediction_model for code, report_type in REPORT_TYPES.items()}
+EVENT_TYPES = sorted(list(PREDICTION_SOURCES) + ['appointment'])
+
+
+def _prediction_branch(event_type, patient_id):
+    model = PREDICTION_SOURCES[event_type]
+    return model.objects.filter(patient_id=patient_id).annotate(
+        event_type=Value(event_type, output_field=CharField()),
+        event_id=F('id'),
+        event_at=F('created_at'),
+        summary=F('prediction'),
+        score=F('confidence'),
+        note=Value('', output_field=TextField()),
+        scheduled_date=Value(None, output_field=DateField()),
+        scheduled_time=Value(None, output_field=TimeField()),
+    )
+
+
+def _appointment_branch(patient_id):
+    return Appointment.objects.filter(patient_id=patient_id).annotate(
+        event_type=Value('appointment', output_field=CharField()),
+        event_id=F('id'),
+        event_at=F('created_at'),
+        summary=F('status'),
+        score=Value(None, output_field=FloatField()),
+        note=F('reason'),
+        scheduled_date=F('appointment_date'),
+        scheduled_time=F('appointment_time'),
+    )
+
+
+def _after(queryset, event_type, cursor):
+    """Rows of one branch that sort after ``cursor`` in (event_at, event_type, event_id) descending"""
+    at, cursor_type, cursor_id = cursor
+    if event_type < cursor_type:
+        return queryset.filter(created_at__lte=at)
+    if event_type > cursor_type:
+        return queryset.filter(created_at__lt=at)
+    return queryset.filter(created_at__lte=at).filter(Q(created_at__lt=at) | Q(id__lt=cursor_id))
+
+
+def decode_timeline_cursor(cursor):
+    parts = decode_parts(cursor, 3)
+    if parts is None or parts[1] not in EVENT_TYPES:
+        return None
+    try:
+        return datetime.fromisoformat(parts[0]), parts[1], int(parts[2])
+    except ValueError:
+        return None
+
+
+def _event_url(event):
+    report_type = REPORT_TYPES.get(event['event_type'])
+    if report_type is None:
+        return None
+    return reverse(report_type.result_url, kwargs={'prediction_id': event['event_id']})
+
+
+def patient_timeline(patient_id, limit=20, cursor=None, event_types=None):
+    """
+    One page of the patient's events, newest first:
+    ``(events, next_cursor)``, where next_cursor is None on the last page.
+    """
+    event_types = [t for t in EVENT_TYPES if not event_types or t in event_types]
+    if not event_types:
+        return [], None
+    after = decode_timeline_cursor(cursor)
+
+    branches = []
+    for event_type in event_types:
+        if event_type == 'appointment':
+            branch = _appointment_branch(patient_id)
+        else:
+            branch = _prediction_branch(event_type, patient_id)
+        if after is not None:
+            branch = _after(branch, event_type, after)
+        branches.append(branch.order_by().values(*COLUMNS))
+
+    union = branches[0].union(*branches[1:], all=True) if len(branches) > 1 else branches[0]
+    rows = list(union.order_by('-event_at', '-event_type', '-event_id')[:limit + 1])
+
+    events = []
+    for row in rows[:limit]:
+        events.append({
+            'type': row['event_type'],
+            'id': row['event_id'],
+            'at': row['event_at'].isoformat(),
+            'summary': row['summary'],
+            'confidence': row['score'],
+            'note': row['note'] or None,
+            'scheduled_for': (f"{row['scheduled_date'].isoformat()}T{row['scheduled_time'].isoformat()}"
+                              if row['scheduled_date'] and row['scheduled_time'] else None),
+            'url': _event_url(row),
+        })
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_parts(last['event_at'].isoformat(), last['event_type'], last['event_id'])
+    return events, next_cursor
@@ -0,0 +1,182 @@
+# timing.py
+"""
+Per-stage latency instrumentation for prediction requests.
+
+A view decorated with ``@timed_prediction('heart_disease')`` gets a request
+timer; code anywhere below it marks stages with ``with stage('inference'):``
+(a no-op when no timer is active, e.g. in management commands). When the
+request finishes its stage durations are appended to a ring buffer and
+added to per-model, per-stage histograms, which the staff endpoint turns
+into p50/p95/p99. Stages may nest, so 'inference' includes 'model_fetch'.
+
+A sample of requests (PREDICTOR_TIMING_LOG_SAMPLE_RATE) is also written to
+the log as one JSON line.
+"""
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds, roughly 25% apart
+BUCKET_BOUNDS_MS = [round(0.05 * 1.25 ** i, 4) for i in range(64)]
+
+_current_timer = contextvars.ContextVar('prediction_timer', default=None)
+
+
+class RequestTimer:
+    def __init__(self, model):
+        self.model = model
+        self.started = time.perf_counter()
+        self.stages = {}
+        # Stages may be timed on helper threads (the risk panel)
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as stage ``name`` of the current prediction request"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+def timed_stage(name):
+    """Decorator form of stage()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value_ms):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (capped at the maximum seen)"""
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                if i < len(BUCKET_BOUNDS_MS):
+                    return round(min(BUCKET_BOUNDS_MS[i], self.max), 3)
+                break
+        return round(self.max, 3)
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count, 3) if self.count else None,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': round(self.max, 3),
+        }
+
+
+class LatencyRecorder:
+    def __init__(self, size=1000):
+        self.recent = deque(maxlen=size)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, model, stages, total_ms):
+        entry = {
+            'model': model,
+            'at': time.time(),
+            'total_ms': round(total_ms, 3),
+            'stages': {name: round(ms, 3) for name, ms in stages.items()},
+        }
+        with self._lock:
+            self.recent.append(entry)
+            for name, ms in list(stages.items()) + [('total', total_ms)]:
+                histogram = self._histograms.get((model, name))
+                if histogram is None:
+                    histogram = self._histograms[(model, name)] = Histogram()
+                histogram.add(ms)
+        return entry
+
+    def summary(self):
+        """{model: {stage: {count, mean, p50, p95, p99, max}}}"""
+        with self._lock:
+            result = {}
+            for (model, name), histogram in sorted(self._histograms.items()):
+                result.setdefault(model, {})[name] = histogram.summary()
+            return result
+
+    def recent_entries(self, limit):
+        with self._lock:
+            return list(self.recent)[-limit:] if limit > 0 else []
+
+    def reset(self):
+        with self._lock:
+            self.recent.clear()
+            self._histograms.clear()
+
+
+recorder = LatencyRecorder(size=getattr(settings, 'PREDICTOR_TIMING_BUFFER_SIZE', 1000))
+
+
+def _finish(timer):
+    entry = recorder.record(timer.model, timer.stages, timer.elapsed_ms())
+    if random.random() < getattr(settings, 'PREDICTOR_TIMING_LOG_SAMPLE_RATE', 0.01):
+        logger.info(json.dumps(dict(entry, event='prediction_timing')))
+
+
+def timed_prediction(model):
+    """Record per-stage timings for POST requests to a prediction view"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'POST':
+                return view(request, *args, **kwargs)
+
+            timer = RequestTimer(model)
+            token = _current_timer.set(timer)
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _current_timer.reset(token)
+                # POSTs that never reached a timed stage (e.g. patient selection) are skipped
+                if timer.stages:
+                    _finish(timer)
+        return wrapper
+    return decorator
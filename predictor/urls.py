@@ -14,6 +14,21 @@ urlpatterns = [
     path('breast-result/<int:prediction_id>/', views.prediction_result, name='prediction_result'),
     path('breast-generate-pdf/<int:prediction_id>/', views.generate_pdf_and_email, name='generate_pdf_email'),
     path('reports/', views.reports_view, name='reports_view'),
+    path('reports/export/', views.export_reports_zip, name='export_reports_zip'),
+    path('reports/<int:report_id>/pdf/', views.download_report_pdf, name='download_report_pdf'),
+    path('report-jobs/<int:job_id>/', views.report_job_status, name='report_job_status'),
+    path('patients/<int:patient_id>/timeline/', views.patient_timeline, name='patient_timeline'),
+    path('<str:prediction_type>/<int:prediction_id>/sweep/', views.prediction_sweep, name='prediction_sweep'),
+    path('<str:prediction_type>/<int:prediction_id>/explanation/', views.prediction_explanation, name='prediction_explanation'),
+    path('risk-panel/', views.risk_panel, name='risk_panel'),
+    path('risk-panel/result/', views.risk_panel_result, name='risk_panel_result'),
+    path('batch-predict/', views.batch_prediction, name='batch_prediction'),
+    path('batch-predict/<str:prediction_type>/', views.batch_prediction, name='batch_prediction'),
+    path('models/status/', views.model_registry_status, name='model_registry_status'),
+    path('models/latency/', views.prediction_latency, name='prediction_latency'),
+    path('models/shadow/', views.shadow_evaluation, name='shadow_evaluation'),
+    path('models/drift/', views.feature_drift, name='feature_drift'),
+    path('health/ready/', views.readiness, name='readiness'),
 
     # Liver Disease Prediction
     # Form for liver disease prediction
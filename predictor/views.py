@@ -1,58 +1,95 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.db.models import Q
-from django.core.paginator import Paginator
 from django.http import JsonResponse
-from django.http import HttpResponse
-from django.core.mail import EmailMessage
+from django.http import HttpResponse, StreamingHttpResponse, FileResponse, Http404
 from django.conf import settings
-from django.template.loader import render_to_string
-from django.core.cache import cache
-import json
 from django.urls import reverse
-import pickle
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, urlencode
 import numpy as np
 import os
-from io import BytesIO
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from accounts.models import Patient
-from .models import BreastCancerPrediction, PredictionReport,DiabetesPrediction,HeartDiseasePrediction
+from .models import BreastCancerPrediction, PredictionReport,DiabetesPrediction,HeartDiseasePrediction, ReportJob, ShadowEvaluation
 from .forms import PatientSelectionForm, BreastCancerPredictionForm,DiabetesPredictionForm,HeartDiseasePredictionForm
 from datetime import datetime
 import logging
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
 from .models import LiverDiseasePrediction
-from .forms import LiverDiseasePredictionForm
-import joblib
+from .forms import LiverDiseasePredictionForm, RiskPanelForm
+from .registry import registry
+from .result_cache import result_cache
+from .shadow import shadow
+from .drift import drift_report, monitor as drift_monitor
+from . import scheduler as inference_scheduler
+from .pipeline import PIPELINES
+from .inference_pool import InferenceUnavailable
+from .sweep import SweepError, sweep
+from .explain import ExplanationUnavailable, explain
+from . import inference_pool
+from .timing import recorder as latency_recorder, stage, timed_prediction
+from .jobs import enqueue_report, find_report, has_current_pdf, job_status
+from .reports import REPORT_TYPES
+from .export import stream_reports_zip
+from .pagination import keyset_page
+from . import panel, timeline
+from .report_stats import count_by_type, doctor_report_stats
+from .batch import BatchError, parse_rows, run_batch, stream_results_csv, template_csv
 
 logger = logging.getLogger(__name__)
 
-# Cache model loading for performance
-def get_cached_model():
-    """Load and cache the ML model for better performance"""
-    model = cache.get('breast_cancer_model')
-    if model is None:
-        try:
-            model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'breast_cancer', 'breast_cancer_prediction_xgb_model.pkl')
-            with open(model_path, 'rb') as f:
-                model = pickle.load(f)
-            cache.set('breast_cancer_model', model, 3600)  # Cache for 1 hour
-        except Exception as e:
-            logger.error(f"Model loading failed: {str(e)}")
-            raise
-    return model
+BUSY_MESSAGE = 'The prediction service is busy. Please try again in a moment.'
 
 def prediction(request):
     return render(request, 'predictions/predictors.html')
 
+@staff_member_required
+def model_registry_status(request):
+    """Registry stats (load time, size, hits), micro-batching histograms, cache and pool counters"""
+    return JsonResponse({
+        'models': registry.stats(),
+        'micro_batching': inference_scheduler.stats(),
+        'result_cache': result_cache.stats(),
+        'inference_pool': inference_pool.stats(),
+        'shadow': shadow.stats(),
+    })
+
+@staff_member_required
+def shadow_evaluation(request):
+    """Agreement, probability deltas and latency of each candidate model against the live one"""
+    shadow.flush()
+    return JsonResponse({
+        'pairs': [row.summary() for row in ShadowEvaluation.objects.order_by('model_name', '-updated_at')],
+        'process': shadow.stats(),
+    })
+
+@staff_member_required
+def feature_drift(request):
+    """PSI/KS drift of each model's inputs against its baseline; ?model= and ?days= narrow it"""
+    try:
+        days = max(int(request.GET.get('days', getattr(settings, 'PREDICTOR_DRIFT_WINDOW_DAYS', 7))), 1)
+    except ValueError:
+        return JsonResponse({'error': 'days must be a number'}, status=400)
+    names = [request.GET['model']] if request.GET.get('model') else list(PIPELINES)
+    drift_monitor.flush()
+    return JsonResponse({
+        'models': {name: drift_report(name, days=days) for name in names},
+        'process': drift_monitor.stats(),
+    })
+
+@staff_member_required
+def prediction_latency(request):
+    """p50/p95/p99 per stage for each prediction view; ?recent=N adds the last N requests"""
+    try:
+        recent = int(request.GET.get('recent', 0))
+    except ValueError:
+        recent = 0
+    data = {'stages': latency_recorder.summary()}
+    if recent:
+        data['recent'] = latency_recorder.recent_entries(recent)
+    return JsonResponse(data)
+
 @login_required
 def select_patient(request):
     if request.method == 'POST':
@@ -64,8 +101,6 @@ def select_patient(request):
         form = PatientSelectionForm(doctor=request.user)
     return render(request, 'predictions/select_patient.html', {'form': form})
 
-import numpy as np
-
 def convert_numpy_types(obj):
     if isinstance(obj, dict):
         return {k: convert_numpy_types(v) for k, v in obj.items()}
@@ -87,6 +122,7 @@ def make_json_serializable(obj):
     return obj
 
 @login_required
+@timed_prediction('breast_cancer')
 def breast_cancer_prediction(request, patient_id=None):
     """
     Handle breast cancer prediction with patient selection and analysis
@@ -138,45 +174,29 @@ def breast_cancer_prediction(request, patient_id=None):
             
             # Validate the form
             form = BreastCancerPredictionForm(request.POST)
-            if form.is_valid():
+            with stage('form_validation'):
+                is_valid = form.is_valid()
+            if is_valid:
                 # Create prediction object
                 prediction_obj = form.save(commit=False)
                 prediction_obj.patient = patient
                 prediction_obj.doctor = request.user
                 
                 try:
-                    # Use cached model for faster prediction
-                    model = get_cached_model()  # Specify model type
-                    if model is None:
-                        raise Exception("Breast cancer prediction model not available")
-                    
-                    # Prepare features efficiently
+                    # Single probability pass through the breast cancer pipeline
+                    result = PIPELINES['breast_cancer'].predict(prediction_obj)
                     features_dict = prediction_obj.get_features_dict()
-                    features = np.array(list(features_dict.values()), dtype=np.float32).reshape(1, -1)
-                    print(features)
-                    
-                    # Validate features (handle missing values)
-                    if np.any(np.isnan(features)) or np.any(np.isinf(features)):
-                        # Log warning about missing values
-                        logger.warning(f"Missing values detected in prediction for patient {patient.id}")
-                        # Handle missing values by replacing with 0 or median values
-                        features = np.nan_to_num(features, nan=0.0, posinf=0.0, neginf=0.0)
-                    
-                    # Make prediction
-                    pred = model.predict(features)[0]
-                    prob = model.predict_proba(features)[0]
                     
                     # Store prediction results
-                    prediction_obj.prediction = 'Malignant' if pred == 1 else 'Benign'
-                    prediction_obj.confidence = float(round(max(prob) * 100, 2))
-                    
-                    # Store individual probabilities if your model has them
-                    if len(prob) > 1:
-                        prediction_obj.malignant_probability = float(round(prob[1] * 100, 2))
-                        prediction_obj.benign_probability = float(round(prob[0] * 100, 2))
+                    prediction_obj.prediction = result.label
+                    prediction_obj.confidence = result.confidence
+                    prediction_obj.model_version = result.model_version or ''
+                    prediction_obj.malignant_probability = result.percent(1)
+                    prediction_obj.benign_probability = result.percent(0)
                     
                     # Save the prediction
-                    prediction_obj.save()
+                    with stage('save'):
+                        prediction_obj.save()
 
                     features_dict = convert_numpy_types(features_dict)
 
@@ -199,15 +219,17 @@ def breast_cancer_prediction(request, patient_id=None):
                         report_data['benign_probability'] = float(prediction_obj.benign_probability)
 
                     report_data_clean=make_json_serializable(report_data)
-                    report_data_json=json.dumps(report_data_clean)
                     
                     # Create prediction report
-                    PredictionReport.objects.create(
-                        patient=patient,
-                        doctor=request.user,
-                        prediction_type='breast_cancer',
-                        prediction_data=report_data_json
-                    )
+                    with stage('report'):
+                        PredictionReport.objects.create(
+                            patient=patient,
+                            doctor=request.user,
+                            prediction_type='breast_cancer',
+                            prediction_id=prediction_obj.id,
+                            model_version=prediction_obj.model_version,
+                            prediction_data=report_data_clean
+                        )
                     
                     # Handle AJAX request
                     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -221,13 +243,25 @@ def breast_cancer_prediction(request, patient_id=None):
                     # Add success message
                     messages.success(
                         request, 
-                        f'Breast cancer analysis completed for {patient.get_full_name()}. '
+                        f'Breast cancer analysis completed for {patient.first_name} {patient.last_name}. '
                         f'Prediction: {prediction_obj.prediction} ({prediction_obj.confidence}% confidence)'
                     )
                     
                     # Redirect to results page
                     return redirect('predictor:prediction_result', prediction_id=prediction_obj.id)
                     
+                except InferenceUnavailable as e:
+                    logger.warning(f"Breast cancer prediction rejected for patient {patient.id}: {str(e)}")
+                    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                        return JsonResponse({'error': BUSY_MESSAGE}, status=503)
+
+                    messages.error(request, BUSY_MESSAGE)
+                    return render(request, 'predictions/breast_cancer_form.html', {
+                        'form': form,
+                        'patients': patients,
+                        'selected_patient': patient,
+                    }, status=503)
+
                 except Exception as e:
                     logger.error(f"Prediction failed for patient {patient.id}: {str(e)}")
                     
@@ -290,7 +324,7 @@ def breast_cancer_prediction(request, patient_id=None):
         
         # If patient_id provided in URL, pre-select that patient
         if patient_id and selected_patient:
-            messages.info(request, f'Selected patient: {selected_patient.get_full_name()}')
+            messages.info(request, f'Selected patient: {selected_patient.first_name} {selected_patient.last_name}')
     
     return render(request, 'predictions/breast_cancer_form.html', {
         'form': form,
@@ -299,354 +333,78 @@ def breast_cancer_prediction(request, patient_id=None):
     })
 
 
-def save_pdf_to_media(buffer, filename, subfolder='reports'):
+def enqueue_report_response(request, prediction_type, prediction):
     """
-    Save PDF buffer into MEDIA_ROOT/subfolder and return the relative file path.
+    Queue the PDF (and email) for ``prediction`` and answer immediately:
+    JSON with the polling URL for AJAX callers, otherwise a page that polls.
     """
-    file_path = os.path.join(subfolder, filename)
-    default_storage.save(file_path, ContentFile(buffer.read()))
-    return file_path
+    try:
+        report = find_report(prediction_type, prediction)
+        # Nothing to email and the stored PDF is still current: serve it instead of rebuilding
+        if not REPORT_TYPES[prediction_type].sends_email and has_current_pdf(report, prediction):
+            download_url = reverse('predictor:download_report_pdf', kwargs={'report_id': report.id})
+            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                return JsonResponse({'report_id': report.id, 'status': 'succeeded', 'pdf_status': report.pdf_status,
+                                     'email_status': report.email_status, 'download_url': download_url})
+            return redirect(download_url)
+        job = enqueue_report(report)
+    except Exception as e:
+        logger.error(f"Queueing {prediction_type} report for prediction {prediction.id} failed: {str(e)}")
+        messages.error(request, 'Report generation failed. Please try again.')
+        return redirect(REPORT_TYPES[prediction_type].result_url, prediction_id=prediction.id)
+
+    status_url = reverse('predictor:report_job_status', kwargs={'job_id': job.id})
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse(dict(job_status(job), status_url=status_url), status=202)
+
+    return render(request, 'predictions/report_job.html', {
+        'job': job,
+        'prediction': prediction,
+        'status_url': status_url,
+        'download_url': reverse('predictor:download_report_pdf', kwargs={'report_id': job.report_id}),
+        'result_url': reverse(REPORT_TYPES[prediction_type].result_url, kwargs={'prediction_id': prediction.id}),
+    }, status=202)
+
+@login_required
+def report_job_status(request, job_id):
+    """Polled by the report page until the job succeeds or fails"""
+    job = get_object_or_404(ReportJob.objects.select_related('report'), id=job_id, report__doctor=request.user)
+    return JsonResponse(job_status(job))
+
+@login_required
+def download_report_pdf(request, report_id):
+    """Stream the stored PDF; answers 304 when the browser's copy (ETag / Last-Modified) is current"""
+    report = get_object_or_404(PredictionReport, id=report_id, doctor=request.user)
+    if not report.pdf_file:
+        raise Http404('The PDF for this report has not been generated yet')
+
+    etag = f'"{report.pdf_sha256}"' if report.pdf_sha256 else None
+    last_modified = int(report.pdf_generated_at.timestamp()) if report.pdf_generated_at else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        try:
+            pdf = report.pdf_file.open('rb')
+        except FileNotFoundError:
+            raise Http404('The PDF for this report is missing')
+        response = FileResponse(pdf, as_attachment=True,
+                                filename=os.path.basename(report.pdf_file.name), content_type='application/pdf')
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Patient data: browsers may keep a copy but must revalidate it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
 @login_required
 def prediction_result(request, prediction_id):
     prediction = get_object_or_404(BreastCancerPrediction, id=prediction_id, doctor=request.user)
     return render(request, 'predictions/result.html', {'prediction': prediction})
 
-def generate_dr_charaka_pdf(prediction, doctor_name):
-    """Generate comprehensive Dr. Charaka themed medical report"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#2E8B57')
-    )
-    
-    header_style = ParagraphStyle(
-        'CustomHeader',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=12,
-        textColor=colors.HexColor('#1B4D3E')
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=6,
-        alignment=TA_JUSTIFY
-    )
-    
-    # Build PDF content
-    story = []
-    
-    # Header with Dr. Charaka branding
-    story.append(Paragraph(" DR. CHARAKA MEDICAL AI DIAGNOSTICS", title_style))
-    story.append(Paragraph("<i>Ancient Wisdom • Modern Technology • Precise Healthcare</i>", 
-                          ParagraphStyle('subtitle', parent=styles['Normal'], fontSize=12, 
-                                       alignment=TA_CENTER, textColor=colors.grey, spaceAfter=20)))
-    
-    # Patient Information
-    story.append(Paragraph("PATIENT INFORMATION", header_style))
-    patient_data = [
-        ['Patient Name:', f"{prediction.patient.first_name} {prediction.patient.last_name}"],
-        ['Patient ID:', f"DC-{prediction.patient.id:06d}"],
-        ['Date of Analysis:', prediction.created_at.strftime('%B %d, %Y at %I:%M %p')],
-        ['Attending Physician:', f"Dr. {doctor_name}"],
-        ['Test Type:', 'Breast Cancer Risk Assessment'],
-        ['Report ID:', f"BC-{prediction.id:08d}"]
-    ]
-    
-    patient_table = Table(patient_data, colWidths=[2*inch, 4*inch])
-    patient_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E8F5E8')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D0E7D0')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    story.append(patient_table)
-    story.append(Spacer(1, 20))
-    
-    # About Breast Cancer
-    story.append(Paragraph("UNDERSTANDING BREAST CANCER", header_style))
-    story.append(Paragraph(
-        "Breast cancer occurs when cells in breast tissue grow uncontrollably. Early detection through "
-        "advanced AI analysis of cellular characteristics significantly improves treatment outcomes. "
-        "Our Dr. Charaka AI system analyzes multiple cellular parameters to assess malignancy risk.",
-        normal_style
-    ))
-    story.append(Spacer(1, 15))
-    
-    # # Clinical Parameters Analyzed
-    # story.append(Paragraph("CLINICAL PARAMETERS ANALYZED", header_style))
-    # features_dict = prediction.get_features_dict()
-    
-    # # Group parameters logically
-    # param_groups = {
-    #     'Nuclear Characteristics': ['radius_mean', 'texture_mean', 'perimeter_mean', 'area_mean', 'smoothness_mean'],
-    #     'Cellular Morphology': ['compactness_mean', 'concavity_mean', 'concave_points_mean', 'symmetry_mean', 'fractal_dimension_mean'],
-    #     'Variability Measures (SE)': [k for k in features_dict.keys() if '_se' in k],
-    #     'Extreme Values (Worst)': [k for k in features_dict.keys() if '_worst' in k]
-    # }
-    
-    # for group_name, params in param_groups.items():
-    #     if params:
-    #         story.append(Paragraph(f"<b>{group_name}:</b>", 
-    #                              ParagraphStyle('subheader', parent=normal_style, fontSize=12, 
-    #                                           textColor=colors.HexColor('#2E8B57'), spaceAfter=8)))
-            
-    #         group_data = []
-    #         for param in params:
-    #             if param in features_dict:
-    #                 param_display = param.replace('_', ' ').title()
-    #                 value = features_dict[param]
-    #                 group_data.append([param_display, f"{value:.4f}"])
-            
-    #         if group_data:
-    #             param_table = Table(group_data, colWidths=[3*inch, 1.5*inch])
-    #             param_table.setStyle(TableStyle([
-    #                 ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F0F8F0')),
-    #                 ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-    #                 ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-    #                 ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-    #                 ('FONTSIZE', (0, 0), (-1, -1), 9),
-    #                 ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#E0E0E0')),
-    #             ]))
-    #             story.append(param_table)
-    #             story.append(Spacer(1, 10))
-    
-    # Analysis Results
-    story.append(Paragraph("ANALYSIS RESULTS", header_style))
-    
-    result_color = colors.HexColor('#228B22') if prediction.prediction == 'Benign' else colors.HexColor('#DC143C')
-    result_bg = colors.HexColor('#F0FFF0') if prediction.prediction == 'Benign' else colors.HexColor('#FFF0F0')
-    
-    result_data = [
-        ['Assessment Result:', prediction.prediction],
-        ['Confidence Level:', f"{prediction.confidence:.1f}%"],
-        ['Risk Category:', 'Low Risk' if prediction.prediction == 'Benign' else 'High Risk - Requires Further Evaluation']
-    ]
-    
-    result_table = Table(result_data, colWidths=[2.5*inch, 3.5*inch])
-    result_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), result_bg),
-        ('TEXTCOLOR', (1, 0), (1, 0), result_color),
-        ('FONTNAME', (1, 0), (1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (1, 0), (1, 0), 12),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D0D0D0')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    story.append(result_table)
-    story.append(Spacer(1, 20))
-    
-    # Clinical Interpretation
-    story.append(Paragraph("CLINICAL INTERPRETATION", header_style))
-    
-    if prediction.prediction == 'Benign':
-        interpretation = (
-            f"Based on the comprehensive analysis of cellular characteristics, the tissue sample shows "
-            f"<b>benign patterns</b> with {prediction.confidence:.1f}% confidence. The analyzed parameters "
-            f"including nuclear morphology, cellular texture, and structural features are consistent with "
-            f"non-malignant tissue. This indicates a lower likelihood of cancerous cells."
-        )
-    else:
-        interpretation = (
-            f"The analysis reveals <b>malignant characteristics</b> with {prediction.confidence:.1f}% confidence. "
-            f"The cellular parameters show patterns associated with cancerous tissue, including irregular "
-            f"nuclear features and abnormal cellular architecture. <b>Immediate consultation with an oncologist "
-            f"is strongly recommended for further evaluation and treatment planning.</b>"
-        )
-    
-    story.append(Paragraph(interpretation, normal_style))
-    story.append(Spacer(1, 15))
-    
-    # Recommendations
-    story.append(Paragraph("RECOMMENDATIONS", header_style))
-    if prediction.prediction == 'Benign':
-        recommendations = [
-            "Continue regular screening as per standard guidelines",
-            "Maintain healthy lifestyle with balanced diet and exercise",
-            "Follow up with routine mammography as recommended by your physician",
-            "Monitor for any changes and report unusual symptoms promptly"
-        ]
-    else:
-        recommendations = [
-            "URGENT: Schedule immediate consultation with oncologist",
-            "Additional imaging studies (MRI, CT) may be required",
-            "Multidisciplinary team evaluation recommended",
-            "Discuss treatment options including surgery, chemotherapy, or radiation",
-            "Genetic counseling may be beneficial",
-            "Emotional support and counseling services available"
-        ]
-    
-    for i, rec in enumerate(recommendations, 1):
-        story.append(Paragraph(f"{i}. {rec}", normal_style))
-    
-    story.append(Spacer(1, 30))
-    
-    # Footer
-    footer_style = ParagraphStyle(
-        'footer',
-        parent=styles['Normal'],
-        fontSize=9,
-        alignment=TA_CENTER,
-        textColor=colors.grey
-    )
-    
-    story.append(Paragraph("=" * 80, footer_style))
-    story.append(Paragraph(
-        f"Report generated by Dr. Charaka AI System • {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} • "
-        f"This report should be interpreted by qualified medical professionals only",
-        footer_style
-    ))
-    
-    # Build PDF
-    doc.build(story)
-    return buffer
-
 @login_required
 def generate_pdf_and_email(request, prediction_id):
     prediction = get_object_or_404(BreastCancerPrediction, id=prediction_id, doctor=request.user)
-    doctor_name = f"{request.user.first_name} {request.user.last_name}"
-    
-    try:
-        # Generate comprehensive PDF
-        buffer = generate_dr_charaka_pdf(prediction, doctor_name)
-        
-        # Send email if patient email exists
-        if prediction.patient.email:
-            try:
-                # Create beautiful HTML email
-                email_context = {
-                    'patient_name': prediction.patient.first_name,
-                    'doctor_name': doctor_name,
-                    'result': prediction.prediction,
-                    'confidence': prediction.confidence,
-                    'date': prediction.created_at.strftime('%B %d, %Y'),
-                    'is_benign': prediction.prediction == 'Benign'
-                }
-                
-                html_content = f"""
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <meta charset="utf-8">
-                    <style>
-                        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height: 1.6; color: #333; }}
-                        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                        .header {{ background: linear-gradient(135deg, #2E8B57, #228B22); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-                        .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
-                        .result-box {{ background: {'#e8f5e8' if prediction.prediction == 'Benign' else '#ffe8e8'}; 
-                                      border-left: 5px solid {'#228B22' if prediction.prediction == 'Benign' else '#DC143C'}; 
-                                      padding: 20px; margin: 20px 0; }}
-                        .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 30px; }}
-                        .logo {{ font-size: 24px; font-weight: bold; }}
-                        .highlight {{ color: {'#228B22' if prediction.prediction == 'Benign' else '#DC143C'}; font-weight: bold; }}
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="header">
-                            <div class="logo">DR. CHARAKA</div>
-                            <p>Medical AI Diagnostics</p>
-                        </div>
-                        <div class="content">
-                            <h2>Dear {prediction.patient.first_name},</h2>
-                            <p>Your breast cancer screening analysis has been completed by our advanced AI diagnostic system.</p>
-                            
-                            <div class="result-box">
-                                <h3>Analysis Results</h3>
-                                <p><strong>Result:</strong> <span class="highlight">{prediction.prediction}</span></p>
-                                <p><strong>Confidence:</strong> {prediction.confidence:.1f}%</p>
-                                <p><strong>Analysis Date:</strong> {prediction.created_at.strftime('%B %d, %Y')}</p>
-                                <p><strong>Attending Physician:</strong> Dr. {doctor_name}</p>
-                            </div>
-                            
-                            <p>Please find your detailed medical report attached to this email. The report contains comprehensive analysis of all parameters and clinical recommendations.</p>
-                            
-                            <p>{'We are pleased to inform you that the analysis indicates benign tissue characteristics.' if prediction.prediction == 'Benign' else 'The analysis requires immediate attention. Please contact your physician urgently to discuss the results and next steps.'}</p>
-                            
-                            <p><strong>Important:</strong> This analysis should be reviewed with your healthcare provider for proper medical interpretation and follow-up care.</p>
-                            
-                            <p>If you have any questions, please don't hesitate to contact our clinic.</p>
-                            
-                            <p>Best regards,<br>
-                            <strong>Dr. {doctor_name}</strong><br>
-                            Dr. Charaka Medical AI Diagnostics</p>
-                        </div>
-                        <div class="footer">
-                            <p>This is an automated message from Dr. Charaka AI System.<br>
-                            Please do not reply to this email. Contact your healthcare provider for medical questions.</p>
-                        </div>
-                    </div>
-                </body>
-                </html>
-                """
-                
-                email = EmailMessage(
-                    subject=f'Dr. Charaka - Medical Analysis Report for {prediction.patient.first_name}',
-                    body=html_content,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    to=[prediction.patient.email]
-                )
-                email.content_subtype = "html"
-                
-                buffer.seek(0)
-                email.attach(f'DrCharaka_Report_{prediction.patient.last_name}_{prediction.id}.pdf', 
-                           buffer.read(), 'application/pdf')
-                email.send()
-                
-                # Update report status
-                report = PredictionReport.objects.filter(
-                    prediction_data__prediction_id=prediction.id
-                ).first()
-                if report:
-                    report.pdf_generated = True
-                    report.email_sent = True
-                    report.save()
-                
-                messages.success(request, 'Professional medical report generated and emailed successfully!')
-                
-            except Exception as e:
-                logger.error(f"Email failed for prediction {prediction_id}: {str(e)}")
-                messages.error(request, 'Report generated but email delivery failed. Please check patient email.')
-        else:
-            messages.warning(request, 'Report generated but patient email not available for delivery.')
-        
-        # Save PDF to media storage
-        buffer.seek(0)
-        filename = f'DrCharaka_Report_{prediction.patient.last_name}_{prediction.id}.pdf'
-        saved_file_path = save_pdf_to_media(buffer, filename)
-
-        # Update PredictionReport with saved PDF path
-        report = PredictionReport.objects.filter(prediction_data__prediction_id=prediction.id).first()
-        if report:
-         report.pdf_file.name = saved_file_path
-         report.save()
-       
-        # Return PDF for download
-        buffer.seek(0)
-        response = HttpResponse(buffer.read(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="DrCharaka_Report_{prediction.patient.last_name}_{prediction.id}.pdf"'
-        return response
-        
-    except Exception as e:
-        logger.error(f"PDF generation failed for prediction {prediction_id}: {str(e)}")
-        messages.error(request, 'Report generation failed. Please try again.')
-        return redirect('predictor:prediction_result', prediction_id=prediction_id)
-    
+    return enqueue_report_response(request, 'breast_cancer', prediction)
 
 
 @login_required
@@ -654,35 +412,61 @@ def reports_view(request):
     """
     Display all prediction reports with filtering capabilities
     """
-    # Get all reports for the current doctor
-    reports = PredictionReport.objects.filter(doctor=request.user).order_by('-created_at')
+    # Get all reports for the current doctor, filtered by the query string
+    reports, current_filters = filter_reports(request)
     
-    # Get all patients for filter dropdown
-    patients = Patient.objects.filter(
-        Q(prediction_reports__doctor=request.user) |
-        Q(breast_cancer_predictions__doctor=request.user)
-    ).distinct().order_by('first_name', 'last_name')
+    # Doctor-wide statistics and the patient dropdown are cached per doctor
+    stats = doctor_report_stats(request.user.id)
+    if any(current_filters.values()):
+        total_reports, reports_by_type = count_by_type(reports)
+    else:
+        total_reports, reports_by_type = stats['total_reports'], stats['reports_by_type']
     
-    # Apply filters
-    patient_filter = request.GET.get('patient')
-    prediction_type_filter = request.GET.get('prediction_type')
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
+    # Keyset pagination on (created_at, id): 10 reports per page
+    page = keyset_page(reports.select_related('patient'), per_page=10,
+                       after=request.GET.get('after'), before=request.GET.get('before'))
     
-    if patient_filter:
-        reports = reports.filter(patient_id=patient_filter)
+    context = {
+        'reports': page,
+        'patients': stats['patients'],
+        'prediction_types': PredictionReport.PREDICTION_TYPES,
+        'total_reports': total_reports,
+        'total_patients': stats['total_patients'],
+        'reports_by_type': reports_by_type,
+        'current_filters': current_filters,
+    }
     
-    if prediction_type_filter:
-        reports = reports.filter(prediction_type=prediction_type_filter)
+    return render(request, 'predictions/reports.html', context)
+
+def filter_reports(request):
+    """
+    The current doctor's reports narrowed by the reports page filters
+    (patient, prediction_type, date_from, date_to, search); returns the
+    queryset and the filter values.
+    """
+    reports = PredictionReport.objects.filter(doctor=request.user)
+    filters = {
+        'patient': request.GET.get('patient'),
+        'prediction_type': request.GET.get('prediction_type'),
+        'date_from': request.GET.get('date_from'),
+        'date_to': request.GET.get('date_to'),
+        'search': request.GET.get('search'),
+    }
+    
+    if filters['patient']:
+        reports = reports.filter(patient_id=filters['patient'])
     
-    if date_from:
-        reports = reports.filter(created_at__date__gte=date_from)
+    if filters['prediction_type']:
+        reports = reports.filter(prediction_type=filters['prediction_type'])
     
-    if date_to:
-        reports = reports.filter(created_at__date__lte=date_to)
+    if filters['date_from']:
+        reports = reports.filter(created_at__date__gte=filters['date_from'])
+    
+    if filters['date_to']:
+        reports = reports.filter(created_at__date__lte=filters['date_to'])
     
     # Search functionality
-    search_query = request.GET.get('search')
+    search_query = filters['search']
     if search_query:
         reports = reports.filter(
             Q(patient__first_name__icontains=search_query) |
@@ -690,43 +474,89 @@ def reports_view(request):
             Q(patient__email__icontains=search_query) |
             Q(prediction_type__icontains=search_query)
         )
-    
-    # Pagination
-    paginator = Paginator(reports, 10)  # Show 10 reports per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    
-    # Get prediction types for filter
-    prediction_types = PredictionReport.PREDICTION_TYPES
-    
-    # Statistics
-    total_reports = reports.count()
-    total_patients = patients.count()
-    
-    # Reports by type count
-    reports_by_type = {}
-    for pred_type, display_name in prediction_types:
-        count = reports.filter(prediction_type=pred_type).count()
-        if count > 0:
-            reports_by_type[display_name] = count
-    
-    context = {
-        'reports': page_obj,
-        'patients': patients,
-        'prediction_types': prediction_types,
-        'total_reports': total_reports,
-        'total_patients': total_patients,
-        'reports_by_type': reports_by_type,
-        'current_filters': {
-            'patient': patient_filter,
-            'prediction_type': prediction_type_filter,
-            'date_from': date_from,
-            'date_to': date_to,
-            'search': search_query,
-        }
-    }
-    
-    return render(request, 'predictions/reports.html', context)
+    return reports, filters
+
+@login_required
+def export_reports_zip(request):
+    """
+    Download the PDFs of every report matching the reports page filters as
+    one ZIP, streamed as it is built. Missing PDFs are generated on the way.
+    """
+    reports, _ = filter_reports(request)
+    if not reports.exists():
+        messages.info(request, 'No reports match these filters.')
+        return redirect(f"{reverse('predictor:reports_view')}?{request.GET.urlencode()}")
+    
+    response = StreamingHttpResponse(stream_reports_zip(reports.order_by('created_at', 'id')),
+                                     content_type='application/zip')
+    response['Content-Disposition'] = (
+        f'attachment; filename="DrCharaka_Reports_{datetime.now().strftime("%Y%m%d_%H%M%S")}.zip"'
+    )
+    return response
+
+@login_required
+def patient_timeline(request, patient_id):
+    """
+    JSON timeline of a patient's predictions and appointments, newest first.
+    ?limit= (max 100), ?cursor= from the previous page's next_cursor and
+    ?types= (comma-separated) to restrict the sources.
+    """
+    patient = get_object_or_404(Patient, id=patient_id, doctor=request.user)
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be a number'}, status=400)
+    types = request.GET.get('types')
+    events, next_cursor = timeline.patient_timeline(
+        patient.id, limit=limit, cursor=request.GET.get('cursor'),
+        event_types=types.split(',') if types else None,
+    )
+    return JsonResponse({
+        'patient_id': patient.id,
+        'events': events,
+        'next_cursor': next_cursor,
+        'has_more': next_cursor is not None,
+    })
+
+@login_required
+def prediction_sweep(request, prediction_type, prediction_id):
+    """
+    What-if probability surface for a stored prediction: ?x=field&x_min=&x_max=&x_steps=
+    and optionally the same for y. The whole grid is scored in one call.
+    """
+    if prediction_type not in PIPELINES:
+        return JsonResponse({'error': f"Unknown prediction type '{prediction_type}'"}, status=400)
+    pipeline = PIPELINES[prediction_type]
+    prediction = get_object_or_404(pipeline.prediction_model, id=prediction_id, doctor=request.user)
+    try:
+        surface = sweep(pipeline, prediction, request.GET)
+    except SweepError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except InferenceUnavailable as e:
+        logger.warning(f"Sweep for {prediction_type} prediction {prediction_id} rejected: {str(e)}")
+        response = JsonResponse({'error': BUSY_MESSAGE}, status=503)
+        response['Retry-After'] = '5'
+        return response
+    except Exception as e:
+        logger.error(f"Sweep for {prediction_type} prediction {prediction_id} failed: {str(e)}")
+        return JsonResponse({'error': 'Sweep failed. Please try again.'}, status=500)
+    return JsonResponse(dict(surface, prediction_id=prediction.id, type=prediction_type))
+
+@login_required
+def prediction_explanation(request, prediction_type, prediction_id):
+    """Per-feature contributions to a stored prediction, for the result page's explanation panel"""
+    if prediction_type not in PIPELINES:
+        return JsonResponse({'error': f"Unknown prediction type '{prediction_type}'"}, status=400)
+    pipeline = PIPELINES[prediction_type]
+    prediction = get_object_or_404(pipeline.prediction_model, id=prediction_id, doctor=request.user)
+    try:
+        explanation = explain(pipeline, prediction)
+    except ExplanationUnavailable as e:
+        return JsonResponse({'error': f"No explanation is available for this model: {str(e)}"}, status=404)
+    except Exception as e:
+        logger.error(f"Explaining {prediction_type} prediction {prediction_id} failed: {str(e)}")
+        return JsonResponse({'error': 'Explanation failed. Please try again.'}, status=500)
+    return JsonResponse(dict(explanation, prediction_id=prediction.id, type=prediction_type))
 
 @login_required
 def get_report_details(request, report_id):
@@ -748,8 +578,11 @@ def get_report_details(request, report_id):
                 'prediction_type': report.get_prediction_type_display(),
                 'prediction_data': prediction_data,
                 'created_at': report.created_at.strftime('%B %d, %Y at %I:%M %p'),
+                'model_version': report.model_version or None,
                 'pdf_generated': report.pdf_generated,
                 'email_sent': report.email_sent,
+                'pdf_status': report.pdf_status,
+                'email_status': report.email_status,
                 'pdf_url': report.pdf_file.url if report.pdf_file else None
             }
         }
@@ -762,57 +595,9 @@ def get_report_details(request, report_id):
             'error': str(e)
         })
  
-def get_cached_liver_model():
-    """Load and cache the liver disease ML model for better performance"""
-    model = cache.get('liver_disease_model')
-    if model is None:
-        try:
-            model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'liver_disease_predictor', 'predictor_done.pkl')
-            
-            # Load the dictionary containing model and scaler
-            with open(model_path, "rb") as f:
-                data = joblib.load(f)
-            
-            # Extract model from dictionary and cache it
-            model = data["model"]
-            cache.set('liver_disease_model', model, 3600)  # Cache for 1 hour
-            
-            logger.info("Liver disease model loaded and cached successfully")
-            
-        except Exception as e:
-            logger.error(f"Liver model loading failed: {str(e)}")
-            raise
-    return model
-
-def get_cached_liver_model_with_scaler():
-    """Load model and scaler if available"""
-    model = cache.get('liver_disease_model')
-    scaler = cache.get('liver_disease_scaler')
-    
-    if model is None:
-        try:
-            model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'liver_disease_predictor', 'predictor_done.pkl')
-            
-            # Load the dictionary containing model and scaler
-            with open(model_path, "rb") as f:
-                data = joblib.load(f)
-            
-            # Extract model and scaler from dictionary
-            model = data["model"]
-            scaler = data.get("scaler")  # Optional, if you saved it
-            
-            cache.set('liver_disease_model', model, 3600)
-            if scaler:
-                cache.set('liver_disease_scaler', scaler, 3600)
-                
-        except Exception as e:
-            logger.error(f"Model loading failed: {str(e)}")
-            raise
-    
-    return model, scaler
-
 # Remove the complex prediction function - keeping it simple and matching your original pattern
 @login_required
+@timed_prediction('liver_disease')
 def liver_disease_prediction(request, patient_id=None):
     # If no patient_id is provided, show patient selection
     if not patient_id:
@@ -830,85 +615,50 @@ def liver_disease_prediction(request, patient_id=None):
     
     # If patient_id is provided, show the prediction form
     patient = get_object_or_404(Patient, id=patient_id, doctor=request.user)
+    status = 200
     
     if request.method == 'POST' and 'predict' in request.POST:
         form = LiverDiseasePredictionForm(request.POST)
-        if form.is_valid():
+        with stage('form_validation'):
+            is_valid = form.is_valid()
+        if is_valid:
             prediction_obj = form.save(commit=False)
             prediction_obj.patient = patient
             prediction_obj.doctor = request.user
             
             try:
-                model, scaler = get_cached_liver_model_with_scaler()
-                
-                # Prepare features in the correct order
-                features = np.array([
-                    float(prediction_obj.age),
-                    1.0 if prediction_obj.gender == 'Male' else 0.0,
-                    float(prediction_obj.total_bilirubin),
-                    float(prediction_obj.direct_bilirubin),
-                    float(prediction_obj.alkaline_phosphotase),
-                    float(prediction_obj.alamine_aminotransferase),
-                    float(prediction_obj.aspartate_aminotransferase),
-                    float(prediction_obj.total_protiens),
-                    float(prediction_obj.albumin),
-                    float(prediction_obj.albumin_and_globulin_ratio)
-                ], dtype=np.float32).reshape(1, -1)
+                pipeline = PIPELINES['liver_disease']
+                result = pipeline.predict(prediction_obj)
                 
-                # Apply scaling if scaler exists
-                if scaler:
-                    features = scaler.transform(features)
-                
-                # Make prediction
-                prediction = model.predict(features)
-                result = 'Disease' if prediction[0] == 1 else 'No Disease'
-                
-                # Get probabilities with threshold logic
-                if hasattr(model, 'predict_proba'):
-                    proba = model.predict_proba(features)[0]
-                    disease_probability = proba[1]
-                    no_disease_probability = proba[0]
-                    
-                    # Apply 0.6/0.4 threshold logic
-                    if disease_probability >= 0.6:
-                        final_prediction = 'Disease'
-                        confidence = round(disease_probability * 100, 2)
-                    elif no_disease_probability >= 0.6:
-                        final_prediction = 'No Disease'
-                        confidence = round(no_disease_probability * 100, 2)
-                    else:
-                        final_prediction = result
-                        confidence = round(max(proba) * 100, 2)
-                else:
-                    final_prediction = result
-                    confidence = 85.0 if result == 'Disease' else 80.0
-                    proba = [0.2, 0.8] if result == 'Disease' else [0.8, 0.2]
-                
-                prediction_obj.prediction = final_prediction
-                prediction_obj.confidence = confidence
-                prediction_obj.save()
+                prediction_obj.prediction = result.label
+                prediction_obj.confidence = result.confidence
+                prediction_obj.model_version = result.model_version or ''
+                with stage('save'):
+                    prediction_obj.save()
                 
                 # Create report entry
-                PredictionReport.objects.create(
-                    patient=patient,
-                    doctor=request.user,
-                    prediction_type='liver_disease',
-                    prediction_data={
-                        'prediction': str(prediction_obj.prediction),
-                        'confidence': float(prediction_obj.confidence),
-                        'prediction_id': prediction_obj.id,
-                        'raw_probabilities': proba.tolist() if hasattr(model, 'predict_proba') else proba,
-                        'features': dict(zip([
-                            'age', 'gender', 'total_bilirubin', 'direct_bilirubin',
-                            'alkaline_phosphotase', 'alamine_aminotransferase',
-                            'aspartate_aminotransferase', 'total_protiens',
-                            'albumin', 'albumin_and_globulin_ratio'
-                        ], features.flatten().tolist()))
-                    }
-                )
+                with stage('report'):
+                    PredictionReport.objects.create(
+                        patient=patient,
+                        doctor=request.user,
+                        prediction_type='liver_disease',
+                        prediction_id=prediction_obj.id,
+                        model_version=prediction_obj.model_version,
+                        prediction_data={
+                            'prediction': str(prediction_obj.prediction),
+                            'confidence': float(prediction_obj.confidence),
+                            'prediction_id': prediction_obj.id,
+                            'raw_probabilities': result.probabilities.tolist(),
+                            'features': pipeline.raw_features(prediction_obj)
+                        }
+                    )
                 
                 return redirect('predictor:liver_prediction_result', prediction_id=prediction_obj.id)
                 
+            except InferenceUnavailable as e:
+                logger.warning(f"Liver prediction rejected for patient {patient_id}: {str(e)}")
+                messages.error(request, BUSY_MESSAGE)
+                status = 503
             except Exception as e:
                 logger.error(f"Liver prediction failed for patient {patient_id}: {str(e)}")
                 messages.error(request, 'Liver analysis failed. Please try again.')
@@ -919,20 +669,14 @@ def liver_disease_prediction(request, patient_id=None):
         'form': form,
         'patient': patient,
         'show_patient_selection': False
-    })
+    }, status=status)
 
 def test_liver_model_with_known_healthy_data():
     """Test with obviously healthy values"""
     try:
-        model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'liver_disease_predictor', 'predictor_done.pkl')
-        
-        # Load the dictionary containing model and scaler
-        with open(model_path, "rb") as f:
-            data = joblib.load(f)
-        
         # Get model and scaler
-        model = data["model"]
-        scaler = data.get("scaler")  # Optional, if you saved it
+        loaded = registry.get('liver_disease')
+        model, scaler = loaded.model, loaded.scaler
         
         # Obviously healthy values (matching your test pattern)
         healthy_data = np.array([[
@@ -977,453 +721,60 @@ def liver_prediction_result(request, prediction_id):
     prediction = get_object_or_404(LiverDiseasePrediction, id=prediction_id, doctor=request.user)
     return render(request, 'predictions/liver_result.html', {'prediction': prediction})
 
-def generate_liver_pdf(prediction, doctor_name):
-    """Generate comprehensive Dr. Charaka themed liver disease report"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#4169E1')
-    )
-    
-    header_style = ParagraphStyle(
-        'CustomHeader',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=12,
-        textColor=colors.HexColor('#1E3A8A')
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=6,
-        alignment=TA_JUSTIFY
-    )
-    
-    # Build PDF content
-    story = []
-    
-    # Header with Dr. Charaka branding
-    story.append(Paragraph("🏥 DR. CHARAKA LIVER HEALTH ASSESSMENT", title_style))
-    story.append(Paragraph("<i>Advanced AI Diagnostics • Liver Function Analysis • Comprehensive Care</i>", 
-                          ParagraphStyle('subtitle', parent=styles['Normal'], fontSize=12, 
-                                       alignment=TA_CENTER, textColor=colors.grey, spaceAfter=20)))
-    
-    # Patient Information
-    story.append(Paragraph("PATIENT INFORMATION", header_style))
-    patient_data = [
-        ['Patient Name:', f"{prediction.patient.first_name} {prediction.patient.last_name}"],
-        ['Patient ID:', f"DC-{prediction.patient.id:06d}"],
-        ['Date of Analysis:', prediction.created_at.strftime('%B %d, %Y at %I:%M %p')],
-        ['Attending Physician:', f"Dr. {doctor_name}"],
-        ['Test Type:', 'Liver Disease Risk Assessment'],
-        ['Report ID:', f"LD-{prediction.id:08d}"],
-        ['Age:', f"{prediction.age} years"],
-        ['Gender:', prediction.gender]
-    ]
-    
-    patient_table = Table(patient_data, colWidths=[2*inch, 4*inch])
-    patient_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E8F2FF')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D0E7FF')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    story.append(patient_table)
-    story.append(Spacer(1, 20))
-    
-    # About Liver Disease
-    story.append(Paragraph("UNDERSTANDING LIVER DISEASE", header_style))
-    story.append(Paragraph(
-        "Liver disease encompasses various conditions affecting liver function, including hepatitis, "
-        "cirrhosis, fatty liver disease, and other hepatic disorders. Early detection through "
-        "comprehensive laboratory analysis is crucial for effective treatment and management. "
-        "Our Dr. Charaka AI system analyzes multiple liver function parameters to assess disease risk.",
-        normal_style
-    ))
-    story.append(Spacer(1, 15))
-    
-    # # Laboratory Parameters
-    # story.append(Paragraph("LABORATORY PARAMETERS ANALYZED", header_style))
-    # features_dict = prediction.get_features_dict()
-    
-    # # Group parameters logically
-    # param_groups = {
-    #     'Bilirubin Levels': ['total_bilirubin', 'direct_bilirubin'],
-    #     'Liver Enzymes': ['alkaline_phosphotase', 'alamine_aminotransferase', 'aspartate_aminotransferase'],
-    #     'Protein Markers': ['total_protiens', 'albumin', 'albumin_and_globulin_ratio'],
-    #     'Demographics': ['age', 'gender']
-    # }
-    
-    # for group_name, params in param_groups.items():
-    #     if params:
-    #         story.append(Paragraph(f"<b>{group_name}:</b>", 
-    #                              ParagraphStyle('subheader', parent=normal_style, fontSize=12, 
-    #                                           textColor=colors.HexColor('#4169E1'), spaceAfter=8)))
-            
-    #         group_data = []
-    #         for param in params:
-    #             if param in features_dict:
-    #                 param_display = param.replace('_', ' ').title()
-    #                 value = features_dict[param]
-    #                 if param == 'gender':
-    #                     group_data.append([param_display, str(value)])
-    #                 else:
-    #                     group_data.append([param_display, f"{value:.2f}"])
-            
-    #         if group_data:
-    #             param_table = Table(group_data, colWidths=[3*inch, 1.5*inch])
-    #             param_table.setStyle(TableStyle([
-    #                 ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F0F8FF')),
-    #                 ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-    #                 ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-    #                 ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-    #                 ('FONTSIZE', (0, 0), (-1, -1), 9),
-    #                 ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#E0E0E0')),
-    #             ]))
-    #             story.append(param_table)
-    #             story.append(Spacer(1, 10))
-    
-    # Analysis Results
-    story.append(Paragraph("ANALYSIS RESULTS", header_style))
-    
-    result_color = colors.HexColor('#228B22') if prediction.prediction == 'No Disease' else colors.HexColor('#DC143C')
-    result_bg = colors.HexColor('#F0FFF0') if prediction.prediction == 'No Disease' else colors.HexColor('#FFF0F0')
-    
-    result_data = [
-        ['Assessment Result:', prediction.prediction],
-        ['Confidence Level:', f"{prediction.confidence:.1f}%"],
-        ['Risk Category:', 'Normal Liver Function' if prediction.prediction == 'No Disease' else 'Abnormal - Requires Medical Attention']
-    ]
-    
-    result_table = Table(result_data, colWidths=[2.5*inch, 3.5*inch])
-    result_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), result_bg),
-        ('TEXTCOLOR', (1, 0), (1, 0), result_color),
-        ('FONTNAME', (1, 0), (1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (1, 0), (1, 0), 12),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D0D0D0')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    story.append(result_table)
-    story.append(Spacer(1, 20))
-    
-    # Clinical Interpretation
-    story.append(Paragraph("CLINICAL INTERPRETATION", header_style))
-    
-    if prediction.prediction == 'No Disease':
-        interpretation = (
-            f"Based on the comprehensive analysis of liver function parameters, the results indicate "
-            f"<b>normal liver function</b> with {prediction.confidence:.1f}% confidence. The analyzed "
-            f"laboratory values including bilirubin levels, liver enzymes, and protein markers are "
-            f"within expected ranges, suggesting healthy liver function."
-        )
-    else:
-        interpretation = (
-            f"The analysis reveals <b>abnormal liver function patterns</b> with {prediction.confidence:.1f}% confidence. "
-            f"The laboratory parameters show deviations from normal ranges that may indicate liver disease "
-            f"or dysfunction. <b>Immediate medical consultation is strongly recommended for further "
-            f"evaluation, additional testing, and appropriate treatment planning.</b>"
-        )
-    
-    story.append(Paragraph(interpretation, normal_style))
-    story.append(Spacer(1, 15))
-    
-    # Recommendations
-    story.append(Paragraph("RECOMMENDATIONS", header_style))
-    if prediction.prediction == 'No Disease':
-        recommendations = [
-            "Continue maintaining healthy lifestyle with balanced diet",
-            "Regular monitoring of liver function as per physician's advice",
-            "Avoid excessive alcohol consumption and hepatotoxic substances",
-            "Maintain healthy weight and regular exercise routine",
-            "Follow up with routine liver function tests as recommended"
-        ]
-    else:
-        recommendations = [
-            "URGENT: Schedule immediate consultation with hepatologist/gastroenterologist",
-            "Additional liver function tests and imaging studies may be required",
-            "Avoid alcohol and hepatotoxic medications until further evaluation",
-            "Consider dietary modifications and lifestyle changes",
-            "Monitor for symptoms like jaundice, abdominal pain, or fatigue",
-            "Family history and genetic counseling may be beneficial"
-        ]
-    
-    for i, rec in enumerate(recommendations, 1):
-        story.append(Paragraph(f"{i}. {rec}", normal_style))
-    
-    story.append(Spacer(1, 30))
-    
-    # Footer
-    footer_style = ParagraphStyle(
-        'footer',
-        parent=styles['Normal'],
-        fontSize=9,
-        alignment=TA_CENTER,
-        textColor=colors.grey
-    )
-    
-    story.append(Paragraph("=" * 80, footer_style))
-    story.append(Paragraph(
-        f"Report generated by Dr. Charaka AI System • {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} • "
-        f"This report should be interpreted by qualified medical professionals only",
-        footer_style
-    ))
-    
-    # Build PDF
-    doc.build(story)
-    return buffer
-
 @login_required
 def generate_liver_pdf_and_email(request, prediction_id):
-
     prediction = get_object_or_404(LiverDiseasePrediction, id=prediction_id, doctor=request.user)
-    doctor_name = f"{request.user.first_name} {request.user.last_name}"
-    
-    try:
-        # Generate comprehensive PDF
-        buffer = generate_liver_pdf(prediction, doctor_name)
-        
-        # Send email if patient email exists
-        if prediction.patient.email:
-            try:
-                # Create beautiful HTML email
-                email_context = {
-                    'patient_name': prediction.patient.first_name,
-                    'doctor_name': doctor_name,
-                    'result': prediction.prediction,
-                    'confidence': prediction.confidence,
-                    'date': prediction.created_at.strftime('%B %d, %Y'),
-                    'is_normal': prediction.prediction == 'No Disease'
-                }
-                
-                html_content = f"""
-                <!DOCTYPE html>
-                <html>
-                <head>
-                    <meta charset="utf-8">
-                    <style>
-                        body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; line-height: 1.6; color: #333; }}
-                        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                        .header {{ background: linear-gradient(135deg, #4169E1, #1E90FF); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-                        .content {{ background: #f9f9f9; padding: 30px; border-radius: 0 0 10px 10px; }}
-                        .result-box {{ background: {'#e8f5e8' if prediction.prediction == 'No Disease' else '#ffe8e8'}; 
-                                      border-left: 5px solid {'#228B22' if prediction.prediction == 'No Disease' else '#DC143C'}; 
-                                      padding: 20px; margin: 20px 0; }}
-                        .footer {{ text-align: center; color: #666; font-size: 12px; margin-top: 30px; }}
-                        .logo {{ font-size: 24px; font-weight: bold; }}
-                        .highlight {{ color: {'#228B22' if prediction.prediction == 'No Disease' else '#DC143C'}; font-weight: bold; }}
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="header">
-                            <div class="logo">🏥 DR. CHARAKA</div>
-                            <p>Medical AI Diagnostics - Liver Health Assessment</p>
-                        </div>
-                        <div class="content">
-                            <h2>Dear {prediction.patient.first_name},</h2>
-                            <p>Your liver function screening analysis has been completed by our advanced AI diagnostic system.</p>
-                            
-                            <div class="result-box">
-                                <h3>Analysis Results</h3>
-                                <p><strong>Result:</strong> <span class="highlight">{prediction.prediction}</span></p>
-                                <p><strong>Confidence:</strong> {prediction.confidence:.1f}%</p>
-                                <p><strong>Analysis Date:</strong> {prediction.created_at.strftime('%B %d, %Y')}</p>
-                                <p><strong>Attending Physician:</strong> Dr. {doctor_name}</p>
-                            </div>
-                            
-                            <p>Please find your detailed liver function report attached to this email. The report contains comprehensive analysis of all laboratory parameters and clinical recommendations.</p>
-                            
-                            <p>{'Your liver function appears to be normal based on the analyzed parameters.' if prediction.prediction == 'No Disease' else 'The analysis indicates abnormal liver function patterns that require immediate medical attention. Please contact your physician urgently.'}</p>
-                            
-                            <p><strong>Important:</strong> This analysis should be reviewed with your healthcare provider for proper medical interpretation and follow-up care.</p>
-                            
-                            <p>If you have any questions, please don't hesitate to contact our clinic.</p>
-                            
-                            <p>Best regards,<br>
-                            <strong>Dr. {doctor_name}</strong><br>
-                            Dr. Charaka Medical AI Diagnostics</p>
-                        </div>
-                        <div class="footer">
-                            <p>This is an automated message from Dr. Charaka AI System.<br>
-                            Please do not reply to this email. Contact your healthcare provider for medical questions.</p>
-                        </div>
-                    </div>
-                </body>
-                </html>
-                """
-                
-                email = EmailMessage(
-                    subject=f'Dr. Charaka - Liver Function Analysis Report for {prediction.patient.first_name}',
-                    body=html_content,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    to=[prediction.patient.email]
-                )
-                email.content_subtype = "html"
-                
-                buffer.seek(0)
-                email.attach(f'DrCharaka_LiverReport_{prediction.patient.last_name}_{prediction.id}.pdf', 
-                           buffer.read(), 'application/pdf')
-                email.send()
-                
-                # Update report status
-                report = PredictionReport.objects.filter(
-                    prediction_data__prediction_id=prediction.id,
-                    prediction_type='liver_disease'
-                ).first()
-                if report:
-                    report.pdf_generated = True
-                    report.email_sent = True
-                    report.save()
-                
-                messages.success(request, 'Professional liver function report generated and emailed successfully!')
-                
-            except Exception as e:
-                logger.error(f"Email failed for liver prediction {prediction_id}: {str(e)}")
-                messages.error(request, 'Report generated but email delivery failed. Please check patient email.')
-        else:
-            messages.warning(request, 'Report generated but patient email not available for delivery.')
-        
-        # Save PDF to media storage
-        buffer.seek(0)
-        filename = f'DrCharaka_LiverReport_{prediction.patient.last_name}_{prediction.id}.pdf'
-        saved_file_path = save_pdf_to_media(buffer, filename, subfolder='liver_reports')
-
-        # Update PredictionReport with saved PDF path
-        report = PredictionReport.objects.filter(
-            prediction_data__prediction_id=prediction.id,
-            prediction_type='liver_disease'
-        ).first()
-        if report:
-            report.pdf_file.name = saved_file_path
-            report.save()
-       
-        # Return PDF for download
-        buffer.seek(0)
-        response = HttpResponse(buffer.read(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="DrCharaka_LiverReport_{prediction.patient.last_name}_{prediction.id}.pdf"'
-        return response
-        
-    except Exception as e:
-        logger.error(f"Liver PDF generation failed for prediction {prediction_id}: {str(e)}")
-        messages.error(request, 'Report generation failed. Please try again.')
-        return redirect('predictor:liver_prediction_result', prediction_id=prediction_id)
-    
-# Modified function for loading XGBoost model (no scaler needed)
-def get_cached_diabetes_model():
-    """Load diabetes XGBoost model from cache or file"""
-    cache_key = 'diabetes_xgb_model'
-    cached_model = cache.get(cache_key)
-    
-    if cached_model:
-        return cached_model
-    
-    try:
-        model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'diabetes predictor', 'diabetes_prediction_xgb_model.pkl')
-        
-        with open(model_path, "rb") as f:
-            model = joblib.load(f)
-        
-        # Cache for 1 hour
-        cache.set(cache_key, model, 3600)
-        
-        return model
-        
-    except Exception as e:
-        logger.error(f"Failed to load diabetes model: {str(e)}")
-        raise
+    return enqueue_report_response(request, 'liver_disease', prediction)
+
 
 @login_required
+@timed_prediction('diabetes')
 def diabetes_prediction(request):
+    status = 200
     if request.method == 'POST':
         form = DiabetesPredictionForm(doctor=request.user, data=request.POST)
-        if form.is_valid():
+        with stage('form_validation'):
+            is_valid = form.is_valid()
+        if is_valid:
             prediction_obj = form.save(commit=False)
             prediction_obj.doctor = request.user
             
             try:
-                model = get_cached_diabetes_model()  # No scaler needed for XGBoost
-                
-                # Prepare features in the correct order (no scaling needed)
-                features = np.array([
-                    float(prediction_obj.pregnancies),
-                    float(prediction_obj.glucose),
-                    float(prediction_obj.blood_pressure),
-                    float(prediction_obj.skin_thickness),
-                    float(prediction_obj.insulin),
-                    float(prediction_obj.bmi),
-                    float(prediction_obj.diabetes_pedigree_function),
-                    float(prediction_obj.age)
-                ], dtype=np.float32).reshape(1, -1)
-                
-                # Make prediction with XGBoost (no scaling required)
-                prediction = model.predict(features)
-                result = 'Diabetes' if prediction[0] == 1 else 'No Diabetes'
-                
-                # Get probabilities with threshold logic
-                if hasattr(model, 'predict_proba'):
-                    proba = model.predict_proba(features)[0]
-                    diabetes_probability = proba[1]  # Diabetes probability
-                    no_diabetes_probability = proba[0]  # No diabetes probability
-                    
-                    # Apply 0.6/0.4 threshold logic
-                    if diabetes_probability >= 0.6:
-                        final_prediction = 'Diabetes'
-                        confidence = round(diabetes_probability * 100, 2)
-                    elif no_diabetes_probability >= 0.6:
-                        final_prediction = 'No Diabetes'
-                        confidence = round(no_diabetes_probability * 100, 2)
-                    else:
-                        # Borderline cases - use original prediction but flag as low confidence
-                        final_prediction = result
-                        confidence = round(max(proba) * 100, 2)
-                else:
-                    # Fallback if no predict_proba
-                    final_prediction = result
-                    confidence = 85.0 if result == 'Diabetes' else 80.0
-                    proba = [0.2, 0.8] if result == 'Diabetes' else [0.8, 0.2]
-                
-                prediction_obj.prediction = final_prediction
-                prediction_obj.confidence = confidence
-                prediction_obj.save()
+                # One probability pass; concurrent requests share a batched call
+                pipeline = PIPELINES['diabetes']
+                result = pipeline.predict(prediction_obj)
+                
+                prediction_obj.prediction = result.label
+                prediction_obj.confidence = result.confidence
+                prediction_obj.model_version = result.model_version or ''
+                with stage('save'):
+                    prediction_obj.save()
                 
                 # Create report entry
-                PredictionReport.objects.create(
-                    patient=prediction_obj.patient,
-                    doctor=request.user,
-                    prediction_type='diabetes',
-                    prediction_data={
-                        'prediction': str(prediction_obj.prediction),
-                        'confidence': float(prediction_obj.confidence),
-                        'prediction_id': prediction_obj.id,
-                        'raw_probabilities': proba.tolist() if hasattr(model, 'predict_proba') else proba,
-                        'features': dict(zip([
-                            'pregnancies', 'glucose', 'blood_pressure', 'skin_thickness',
-                            'insulin', 'bmi', 'diabetes_pedigree_function', 'age'
-                        ], features.flatten().tolist()))
-                    }
-                )
+                with stage('report'):
+                    PredictionReport.objects.create(
+                        patient=prediction_obj.patient,
+                        doctor=request.user,
+                        prediction_type='diabetes',
+                        prediction_id=prediction_obj.id,
+                        model_version=prediction_obj.model_version,
+                        prediction_data={
+                            'prediction': str(prediction_obj.prediction),
+                            'confidence': float(prediction_obj.confidence),
+                            'prediction_id': prediction_obj.id,
+                            'raw_probabilities': result.probabilities.tolist(),
+                            'features': pipeline.raw_features(prediction_obj)
+                        }
+                    )
                 
                 return redirect('predictor:diabetes_prediction_result', prediction_id=prediction_obj.id)
                 
+            except InferenceUnavailable as e:
+                logger.warning(f"Diabetes prediction rejected: {str(e)}")
+                messages.error(request, BUSY_MESSAGE)
+                status = 503
             except Exception as e:
                 logger.error(f"Diabetes prediction failed: {str(e)}")
-                print(f"Error details: {str(e)}")
                 messages.error(request, f'Diabetes analysis failed. Please try again.')
     
     else:
@@ -1431,280 +782,68 @@ def diabetes_prediction(request):
     
     return render(request, 'predictions/diabetes_form.html', {
         'form': form
-    })
+    }, status=status)
 
 @login_required
 def diabetes_prediction_result(request, prediction_id):
     prediction = get_object_or_404(DiabetesPrediction, id=prediction_id, doctor=request.user)
     return render(request, 'predictions/diabetes_result.html', {'prediction': prediction})
 
-def generate_diabetes_pdf(prediction, doctor_name):
-    """Generate comprehensive Dr. Charaka themed diabetes report"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#4169E1')
-    )
-    
-    header_style = ParagraphStyle(
-        'CustomHeader',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=12,
-        textColor=colors.HexColor('#1E3A8A')
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=6,
-        alignment=TA_JUSTIFY
-    )
-    
-    # Build PDF content
-    story = []
-    
-    # Header with Dr. Charaka branding
-    story.append(Paragraph("🏥 DR. CHARAKA DIABETES RISK ASSESSMENT", title_style))
-    story.append(Paragraph("<i>Advanced AI Diagnostics • Diabetes Risk Analysis • Comprehensive Care</i>", 
-                          ParagraphStyle('subtitle', parent=styles['Normal'], fontSize=12, 
-                                       alignment=TA_CENTER, textColor=colors.grey, spaceAfter=20)))
-    
-    # Patient Information
-    story.append(Paragraph("PATIENT INFORMATION", header_style))
-    patient_data = [
-        ['Patient Name:', f"{prediction.patient.first_name} {prediction.patient.last_name}"],
-        ['Patient ID:', f"DC-{prediction.patient.id:06d}"],
-        ['Date of Analysis:', prediction.created_at.strftime('%B %d, %Y at %I:%M %p')],
-        ['Attending Physician:', f"Dr. {doctor_name}"],
-        ['Test Type:', 'Diabetes Risk Assessment'],
-        ['Report ID:', f"DB-{prediction.id:08d}"],
-        ['Age:', f"{prediction.age} years"],
-        ['BMI:', f"{prediction.bmi}"]
-    ]
-    
-    patient_table = Table(patient_data, colWidths=[2*inch, 4*inch])
-    patient_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E8F2FF')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D0E7FF')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    story.append(patient_table)
-    story.append(Spacer(1, 20))
-    
-    # Analysis Results
-    story.append(Paragraph("ANALYSIS RESULTS", header_style))
-    
-    result_color = colors.HexColor('#228B22') if prediction.prediction == 'No Diabetes' else colors.HexColor('#DC143C')
-    result_bg = colors.HexColor('#F0FFF0') if prediction.prediction == 'No Diabetes' else colors.HexColor('#FFF0F0')
-    
-    result_data = [
-        ['Assessment Result:', prediction.prediction],
-        ['Confidence Level:', f"{prediction.confidence:.1f}%"],
-        ['Risk Category:', 'Normal - Low Risk' if prediction.prediction == 'No Diabetes' else 'High Risk - Medical Attention Required']
-    ]
-    
-    result_table = Table(result_data, colWidths=[2.5*inch, 3.5*inch])
-    result_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), result_bg),
-        ('TEXTCOLOR', (1, 0), (1, 0), result_color),
-        ('FONTNAME', (1, 0), (1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (1, 0), (1, 0), 12),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D0D0D0')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    story.append(result_table)
-    story.append(Spacer(1, 20))
-    
-    # Build PDF
-    doc.build(story)
-    return buffer
-
 @login_required
 def generate_diabetes_pdf_and_email(request, prediction_id):
     prediction = get_object_or_404(DiabetesPrediction, id=prediction_id, doctor=request.user)
-    
-    try:
-        # Generate PDF
-        pdf_buffer = generate_diabetes_pdf(prediction, request.user.get_full_name() or request.user.username)
-        
-        # Save PDF to model
-        pdf_filename = f"diabetes_report_{prediction.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        
-        # Create report entry
-        report, created = PredictionReport.objects.get_or_create(
-            patient=prediction.patient,
-            doctor=request.user,
-            prediction_type='diabetes',
-            defaults={
-                'prediction_data': {
-                    'prediction': prediction.prediction,
-                    'confidence': prediction.confidence,
-                    'prediction_id': prediction.id
-                }
-            }
-        )
-        
-        # Save PDF file
-        report.pdf_file.save(
-            pdf_filename,
-            ContentFile(pdf_buffer.getvalue())
-        )
-        report.pdf_generated = True
-        report.save()
-        
-        messages.success(request, 'PDF report generated successfully!')
-        
-        # Return PDF response
-        response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{pdf_filename}"'
-        return response
-        
-    except Exception as e:
-        logger.error(f"PDF generation failed for diabetes prediction {prediction_id}: {str(e)}")
-        messages.error(request, 'Failed to generate PDF report. Please try again.')
-        return redirect('predictor:diabetes_prediction_result', prediction_id=prediction_id)
+    return enqueue_report_response(request, 'diabetes', prediction)
 
 
-def get_cached_heart_disease_model():
-    """Load heart disease model from cache or file"""
-    cache_key = 'heart_disease_model'
-    cached_model = cache.get(cache_key)
-    
-    if cached_model:
-        return cached_model
-    
-    try:
-        # Adjust this path according to your model location
-        model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'heart_disease', 'heart_disease_random_forest_model.pkl')
-        
-        with open(model_path, "rb") as f:
-            model = joblib.load(f)
-        
-        # Cache for 1 hour
-        cache.set(cache_key, model, 3600)
-        
-        return model
-        
-    except Exception as e:
-        logger.error(f"Failed to load heart disease model: {str(e)}")
-        raise
-
 @login_required
+@timed_prediction('heart_disease')
 def heart_disease_prediction(request):
+    status = 200
     if request.method == 'POST':
         form = HeartDiseasePredictionForm(doctor=request.user, data=request.POST)
-        if form.is_valid():
+        with stage('form_validation'):
+            is_valid = form.is_valid()
+        if is_valid:
             prediction_obj = form.save(commit=False)
             prediction_obj.doctor = request.user
 
             try:
-                model = get_cached_heart_disease_model()
-
-                # Extract raw form values (convert categorical string values to integers)
-                age = float(prediction_obj.age)
-                sex = int(prediction_obj.sex)
-                cp = int(prediction_obj.cp)
-                trestbps = float(prediction_obj.trestbps)
-                chol = float(prediction_obj.chol)
-                fbs = int(prediction_obj.fbs)
-                restecg = int(prediction_obj.restecg)
-                thalach = float(prediction_obj.thalach)
-                exang = int(prediction_obj.exang)
-                oldpeak = float(prediction_obj.oldpeak)
-                slope = int(prediction_obj.slope)
-                ca = float(prediction_obj.ca)
-                thal = int(prediction_obj.thal)
-
-                # Manual one-hot encoding
-                cp_encoded = [1 if cp == i else 0 for i in range(4)]
-                restecg_encoded = [1 if restecg == i else 0 for i in range(3)]
-                slope_encoded = [1 if slope == i else 0 for i in range(3)]
-                thal_encoded = [1 if thal == i else 0 for i in range(3)]
-
-                # Prepare final feature array (numeric + encoded categorical)
-                features = np.array([
-                    age, sex, trestbps, chol, fbs, thalach, exang, oldpeak, ca
-                ] + cp_encoded + restecg_encoded + slope_encoded + thal_encoded, dtype=np.float32).reshape(1, -1)
-
-                # Sanity check - features shape must match model input
-                assert features.shape[1] == 22, "Feature shape mismatch!"
-
-                # Prediction
-                prediction = model.predict(features)
-                result = 'Heart Disease' if prediction[0] == 1 else 'No Heart Disease'
-
-                if hasattr(model, 'predict_proba'):
-                    proba = model.predict_proba(features)[0]
-                    heart_disease_probability = proba[1]
-                    no_heart_disease_probability = proba[0]
-
-                    if heart_disease_probability >= 0.6:
-                        final_prediction = 'Heart Disease'
-                        confidence = round(heart_disease_probability * 100, 2)
-                    elif no_heart_disease_probability >= 0.6:
-                        final_prediction = 'No Heart Disease'
-                        confidence = round(no_heart_disease_probability * 100, 2)
-                    else:
-                        final_prediction = result
-                        confidence = round(max(proba) * 100, 2)
-                else:
-                    final_prediction = result
-                    confidence = 85.0 if result == 'Heart Disease' else 80.0
-                    proba = [0.2, 0.8] if result == 'Heart Disease' else [0.8, 0.2]
-
-                prediction_obj.prediction = final_prediction
-                prediction_obj.confidence = confidence
-                prediction_obj.save()
+                # Encoding, one-hot expansion and the single probability pass
+                # all live in the heart disease pipeline
+                pipeline = PIPELINES['heart_disease']
+                result = pipeline.predict(prediction_obj)
+
+                prediction_obj.prediction = result.label
+                prediction_obj.confidence = result.confidence
+                prediction_obj.model_version = result.model_version or ''
+                with stage('save'):
+                    prediction_obj.save()
 
                 # Create report
-                PredictionReport.objects.create(
-                    patient=prediction_obj.patient,
-                    doctor=request.user,
-                    prediction_type='heart_disease',
-                    prediction_data={
-                        'prediction': str(prediction_obj.prediction),
-                        'confidence': float(prediction_obj.confidence),
-                        'prediction_id': prediction_obj.id,
-                        'raw_probabilities': proba.tolist() if hasattr(model, 'predict_proba') else proba,
-                        'features': {
-                            'age': age,
-                            'sex': sex,
-                            'trestbps': trestbps,
-                            'chol': chol,
-                            'fbs': fbs,
-                            'thalach': thalach,
-                            'exang': exang,
-                            'oldpeak': oldpeak,
-                            'ca': ca,
-                            'cp': cp,
-                            'restecg': restecg,
-                            'slope': slope,
-                            'thal': thal
+                with stage('report'):
+                    PredictionReport.objects.create(
+                        patient=prediction_obj.patient,
+                        doctor=request.user,
+                        prediction_type='heart_disease',
+                        prediction_id=prediction_obj.id,
+                        model_version=prediction_obj.model_version,
+                        prediction_data={
+                            'prediction': str(prediction_obj.prediction),
+                            'confidence': float(prediction_obj.confidence),
+                            'prediction_id': prediction_obj.id,
+                            'raw_probabilities': result.probabilities.tolist(),
+                            'features': pipeline.raw_features(prediction_obj)
                         }
-                    }
-                )
+                    )
 
                 return redirect('predictor:heart_disease_prediction_result', prediction_id=prediction_obj.id)
 
+            except InferenceUnavailable as e:
+                logger.warning(f"Heart disease prediction rejected: {str(e)}")
+                messages.error(request, BUSY_MESSAGE)
+                status = 503
             except Exception as e:
                 logger.error(f"Heart disease prediction failed: {str(e)}")
-                print(f"Error details: {str(e)}")
                 messages.error(request, f'Heart disease analysis failed. Please try again.')
 
     else:
@@ -1712,153 +851,146 @@ def heart_disease_prediction(request):
 
     return render(request, 'predictions/heart_disease_form.html', {
         'form': form
-    })
+    }, status=status)
 
 @login_required
 def heart_disease_prediction_result(request, prediction_id):
     prediction = get_object_or_404(HeartDiseasePrediction, id=prediction_id, doctor=request.user)
     return render(request, 'predictions/heart_disease_result.html', {'prediction': prediction})
 
-def generate_heart_disease_pdf(prediction, doctor_name):
-    """Generate comprehensive Dr. Charaka themed heart disease report"""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
-    
-    # Styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor('#4169E1')
-    )
-    
-    header_style = ParagraphStyle(
-        'CustomHeader',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=12,
-        textColor=colors.HexColor('#1E3A8A')
-    )
-    
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=6,
-        alignment=TA_JUSTIFY
-    )
-    
-    # Build PDF content
-    story = []
-    
-    # Header with Dr. Charaka branding
-    story.append(Paragraph("DR. CHARAKA HEART DISEASE RISK ASSESSMENT", title_style))
-    story.append(Paragraph("<i>Advanced AI Diagnostics • Cardiovascular Risk Analysis • Comprehensive Care</i>", 
-                          ParagraphStyle('subtitle', parent=styles['Normal'], fontSize=12, 
-                                       alignment=TA_CENTER, textColor=colors.grey, spaceAfter=20)))
-    
-    # Patient Information
-    story.append(Paragraph("PATIENT INFORMATION", header_style))
-    patient_data = [
-        ['Patient Name:', f"{prediction.patient.first_name} {prediction.patient.last_name}"],
-        ['Patient ID:', f"DC-{prediction.patient.id:06d}"],
-        ['Date of Analysis:', prediction.created_at.strftime('%B %d, %Y at %I:%M %p')],
-        ['Attending Physician:', f"Dr. {doctor_name}"],
-        ['Test Type:', 'Heart Disease Risk Assessment'],
-        ['Report ID:', f"HD-{prediction.id:08d}"],
-        ['Age:', f"{prediction.age} years"],
-        ['Gender:', 'Male' if prediction.sex == 1 else 'Female'],
-        ['Max Heart Rate:', f"{prediction.thalach} bpm"],
-        ['Cholesterol:', f"{prediction.chol} mg/dl"]
-    ]
-    
-    patient_table = Table(patient_data, colWidths=[2*inch, 4*inch])
-    patient_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E8F2FF')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D0E7FF')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    story.append(patient_table)
-    story.append(Spacer(1, 20))
-    
-    # Analysis Results
-    story.append(Paragraph("ANALYSIS RESULTS", header_style))
-    
-    result_color = colors.HexColor('#228B22') if prediction.prediction == 'No Heart Disease' else colors.HexColor('#DC143C')
-    result_bg = colors.HexColor('#F0FFF0') if prediction.prediction == 'No Heart Disease' else colors.HexColor('#FFF0F0')
-    
-    result_data = [
-        ['Assessment Result:', prediction.prediction],
-        ['Confidence Level:', f"{prediction.confidence:.1f}%"],
-        ['Risk Category:', 'Normal - Low Risk' if prediction.prediction == 'No Heart Disease' else 'High Risk - Medical Attention Required']
-    ]
-    
-    result_table = Table(result_data, colWidths=[2.5*inch, 3.5*inch])
-    result_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, -1), result_bg),
-        ('TEXTCOLOR', (1, 0), (1, 0), result_color),
-        ('FONTNAME', (1, 0), (1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (1, 0), (1, 0), 12),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#D0D0D0')),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    story.append(result_table)
-    story.append(Spacer(1, 20))
-    
-    # Build PDF
-    doc.build(story)
-    return buffer
-
 @login_required
 def generate_heart_disease_pdf_and_email(request, prediction_id):
     prediction = get_object_or_404(HeartDiseasePrediction, id=prediction_id, doctor=request.user)
-    
+    return enqueue_report_response(request, 'heart_disease', prediction)
+
+
+@login_required
+@timed_prediction('risk_panel')
+def risk_panel(request):
+    """
+    Screen one patient with several models from a single form. The selected
+    models are scored concurrently and their results saved together.
+    """
+    status = 200
+    if request.method == 'POST':
+        is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+        panel_form = RiskPanelForm(doctor=request.user, models=panel.PANEL_LABELS.items(), data=request.POST)
+        selected = [name for name in panel.PANEL_FORMS if name in request.POST.getlist('models')]
+        forms = panel.model_forms(request.user, panel.panel_data(request.POST), selected)
+        with stage('form_validation'):
+            is_valid = all([form.is_valid() for form in [panel_form] + [forms[name] for name in selected]])
+
+        if is_valid:
+            patient = panel_form.cleaned_data['patient']
+            instances = {}
+            for name in selected:
+                instances[name] = forms[name].save(commit=False)
+                instances[name].patient = patient
+                instances[name].doctor = request.user
+
+            with stage('inference'):
+                results = panel.score_panel(instances)
+            failed = [name for name, result in results.items() if isinstance(result, Exception)]
+            saved = None
+            if len(failed) < len(results):
+                try:
+                    with stage('save'):
+                        saved = panel.save_panel(instances, results, request.user)
+                except Exception as e:
+                    logger.error(f"Saving risk panel for patient {patient.id} failed: {str(e)}")
+
+            if saved is not None:
+                if is_ajax:
+                    return JsonResponse({'patient_id': patient.id, 'results': panel.panel_report(saved, failed)})
+                query = {name: instance.id for name, instance in saved.items()}
+                if failed:
+                    query['failed'] = ','.join(failed)
+                return redirect(f"{reverse('predictor:risk_panel_result')}?{urlencode(query)}")
+
+            busy = len(failed) == len(results) and all(isinstance(results[name], InferenceUnavailable) for name in failed)
+            error_message, status = (BUSY_MESSAGE, 503) if busy else ('Risk panel analysis failed. Please try again.', 500)
+            if is_ajax:
+                return JsonResponse({'error': error_message}, status=status)
+        else:
+            if is_ajax:
+                errors = dict(panel_form.errors)
+                for name in selected:
+                    errors.update(forms[name].errors)
+                return JsonResponse({'error': 'Invalid form data', 'errors': errors}, status=400)
+            error_message = 'Please correct the form errors below.'
+        messages.error(request, error_message)
+    else:
+        panel_form = RiskPanelForm(doctor=request.user, models=panel.PANEL_LABELS.items(),
+                                   initial={'patient': request.GET.get('patient')})
+        forms = panel.model_forms(request.user)
+
+    return render(request, 'predictions/risk_panel_form.html', {
+        'form': panel_form,
+        'sections': panel.form_sections(forms),
+    }, status=status)
+
+@login_required
+def risk_panel_result(request):
+    """The consolidated report of one risk panel: ?<model>=<prediction id> for each model, ?failed= for the rest"""
+    predictions = {}
+    for name in panel.PANEL_FORMS:
+        if request.GET.get(name, '').isdigit():
+            predictions[name] = get_object_or_404(PIPELINES[name].prediction_model,
+                                                  id=int(request.GET[name]), doctor=request.user)
+    if not predictions:
+        raise Http404('No risk panel results')
+    failed = request.GET.get('failed', '').split(',')
+    return render(request, 'predictions/risk_panel_result.html', {
+        'patient': next(iter(predictions.values())).patient,
+        'results': panel.panel_report(predictions, failed),
+    })
+
+@login_required
+def batch_prediction(request, prediction_type=None):
+    """
+    Score a whole cohort at once. POST a CSV file (field "file") or a JSON
+    array of rows; GET returns an empty CSV with the expected columns.
+    """
+    prediction_type = prediction_type or request.POST.get('prediction_type') or request.GET.get('prediction_type')
+    if prediction_type not in PIPELINES:
+        return JsonResponse({'error': f"Unknown prediction type '{prediction_type}'"}, status=400)
+
+    if request.method != 'POST':
+        response = HttpResponse(template_csv(prediction_type), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{prediction_type}_batch_template.csv"'
+        return response
+
     try:
-        # Generate PDF
-        pdf_buffer = generate_heart_disease_pdf(prediction, request.user.get_full_name() or request.user.username)
-        
-        # Save PDF to model
-        pdf_filename = f"heart_disease_report_{prediction.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        
-        # Create report entry
-        report, created = PredictionReport.objects.get_or_create(
-            patient=prediction.patient,
-            doctor=request.user,
-            prediction_type='heart_disease',
-            defaults={
-                'prediction_data': {
-                    'prediction': prediction.prediction,
-                    'confidence': prediction.confidence,
-                    'prediction_id': prediction.id
-                }
-            }
-        )
-        
-        # Save PDF file
-        report.pdf_file.save(
-            pdf_filename,
-            ContentFile(pdf_buffer.getvalue())
-        )
-        report.pdf_generated = True
-        report.save()
-        
-        messages.success(request, 'PDF report generated successfully!')
-        
-        # Return PDF response
-        response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{pdf_filename}"'
+        rows = parse_rows(uploaded_file=request.FILES.get('file'),
+                          body=request.body if request.content_type == 'application/json' else None)
+        predictions, proba = run_batch(prediction_type, rows, request.user)
+    except BatchError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except InferenceUnavailable as e:
+        logger.warning(f"Batch {prediction_type} prediction rejected: {str(e)}")
+        response = JsonResponse({'error': BUSY_MESSAGE}, status=503)
+        response['Retry-After'] = '5'
         return response
-        
     except Exception as e:
-        logger.error(f"PDF generation failed for heart disease prediction {prediction_id}: {str(e)}")
-        messages.error(request, 'Failed to generate PDF report. Please try again.')
-        return redirect('predictor:heart_disease_prediction_result', prediction_id=prediction_id)
\ No newline at end of file
+        logger.error(f"Batch {prediction_type} prediction failed: {str(e)}")
+        return JsonResponse({'error': 'Batch analysis failed. Please try again.'}, status=500)
+
+    response = StreamingHttpResponse(stream_results_csv(predictions, proba), content_type='text/csv')
+    response['Content-Disposition'] = (
+        f'attachment; filename="{prediction_type}_batch_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    )
+    return response
+
+
+def readiness(request):
+    """
+    Readiness probe: 200 once every available model is loaded in this
+    process, 503 while any is still cold.
+    """
+    status = registry.status()
+    ready = 'cold' not in status.values()
+    return JsonResponse({
+        'ready': ready,
+        'models': status,
+        'errors': registry.errors(),
+    }, status=200 if ready else 503)